@@ -0,0 +1,420 @@
+"""
+Потоковая аналитика записанных партий Змейки.
+
+Конвейер состоит из генераторов. Источник отдает такты порциями
+фиксированного размера в формате snake_storage.TICK_RECORD, а SessionStats
+обновляет по каждой порции накопленную статистику векторно, средствами
+NumPy:
+
+    * распределение очков — длины змейки в конце партии;
+    * яблоки в минуту игрового времени (SPEED тактов в секунду);
+    * распределение числа тактов между яблоками;
+    * тепловая карта посещений ячеек головой;
+    * причины конца партии: укус себя, заполнение поля или обрыв записи.
+
+Источники — хранилище snake_storage (такты читаются представлениями
+поверх mmap, файл не загружается целиком) и записи snake_replay
+(партия воспроизводится без отрисовки). Память ограничена размером
+порции и размерами поля, а не длиной потока, поэтому конвейер справляется
+с потоками в гигабайты.
+
+Статистики объединяются через merge. analyze_store с workers > 1 делит
+хранилище по границам партий на диапазоны, считает их в пуле процессов
+и объединяет результаты в порядке диапазонов; итог тот же, что и при
+последовательном подсчете.
+
+    python snake_analytics.py store episodes/ --workers 4
+    python snake_analytics.py replay game.snkr --heatmap heatmap.npy
+"""
+
+
+import argparse
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from snake_replay import new_game, read_header, read_ticks
+from snake_storage import (
+    EVENTS, TICK_RECORD, EpisodeStore, fill_record
+)
+from the_snake import COLLISION, DIRECTIONS, EAT, SPEED, WIN, World, step
+
+# Размер порции тактов:
+CHUNK_TICKS = 1 << 16
+
+# Промежутки между яблоками длиннее этого числа тактов попадают
+# в последнюю ячейку гистограммы:
+MAX_GAP = 1 << 12
+
+# На сколько диапазонов делить хранилище на каждый процесс пула:
+RANGES_PER_WORKER = 4
+
+_EAT = EVENTS.index(EAT)
+_COLLISION = EVENTS.index(COLLISION)
+_WIN = EVENTS.index(WIN)
+
+
+def _add_counts(histogram, counts):
+    """Складывает гистограммы, расширяя первую; возвращает сумму."""
+    if len(counts) > len(histogram):
+        counts = counts.copy()
+        counts[:len(histogram)] += histogram
+        return counts
+    histogram[:len(counts)] += counts
+    return histogram
+
+
+def _percentile(histogram, share):
+    """Возвращает значение, не больше которого доля share выборки."""
+    total = histogram.sum()
+    if not total:
+        return 0
+    cumulative = np.cumsum(histogram)
+    return int(np.searchsorted(cumulative, share * total))
+
+
+def _mean(histogram):
+    """Возвращает среднее значение выборки, заданной гистограммой."""
+    total = histogram.sum()
+    if not total:
+        return 0.0
+    return float(np.dot(np.arange(len(histogram)), histogram) / total)
+
+
+class SessionStats:
+    """
+    Накопленная статистика потока тактов.
+
+    Атрибуты
+    ---------
+    world : World
+                игровой мир записанных партий
+    ticks : int
+                число обработанных тактов
+    apples : int
+                число съеденных яблок
+    scores : numpy.ndarray
+                число партий по длине змейки в конце партии
+    gaps : numpy.ndarray
+                число яблок по числу тактов с предыдущего яблока или
+                начала партии; последняя ячейка — MAX_GAP и больше
+    heatmap : numpy.ndarray
+                число тактов, в которые голова была в ячейке, по строкам
+    deaths : dict
+                число партий по причине конца: collision, win,
+                unfinished
+    """
+
+    def __init__(self, world=None):
+        """Создает пустую статистику партий в мире world."""
+        self.world = World() if world is None else world
+        self.ticks = 0
+        self.apples = 0
+        self.scores = np.zeros(0, dtype=np.int64)
+        self.gaps = np.zeros(MAX_GAP + 1, dtype=np.int64)
+        self.heatmap = np.zeros(
+            (self.world.height, self.world.width), dtype=np.int64)
+        self.deaths = {'collision': 0, 'win': 0, 'unfinished': 0}
+        # Состояние на границе порций: длина змейки на последнем такте,
+        # номер такта последнего яблока или конца партии и признак
+        # незаконченной партии.
+        self._last_length = 1
+        self._last_mark = -1
+        self._open = False
+
+    def update(self, ticks, ends=None):
+        """
+        Учитывает порцию тактов, идущую за предыдущими.
+
+        Параметры
+        ----------
+        ticks : numpy.ndarray[TICK_RECORD]
+                такты порции
+        ends : numpy.ndarray[bool], optional
+                последние такты партий; по умолчанию партия кончается
+                на событиях COLLISION и WIN
+
+        ----------
+        Вызывает ValueError, если голова выходит за мир статистики:
+        такты записаны в мире большего размера.
+        """
+        if not len(ticks):
+            return
+        world = self.world
+        if (ticks['head_x'].max() >= world.width
+                or ticks['head_y'].max() >= world.height):
+            raise ValueError(
+                f'Голова змейки вне мира {world.width}x{world.height}: '
+                'такты записаны в мире другого размера.')
+        events = ticks['event']
+        reset = (events == _COLLISION) | (events == _WIN)
+        if ends is None:
+            ends = reset
+        eaten = events == _EAT
+
+        cells = (ticks['head_y'].astype(np.intp) * self.world.width
+                 + ticks['head_x'])
+        self.heatmap += np.bincount(
+            cells, minlength=self.world.cells).reshape(self.heatmap.shape)
+
+        # На тактах COLLISION и WIN записано состояние после сброса,
+        # поэтому очки партии — длина змейки на предыдущем такте.
+        # Партия, запись которой просто прервалась, сброса не знает.
+        lengths = ticks['length'].astype(np.int64)
+        previous = np.empty_like(lengths)
+        previous[0] = self._last_length
+        previous[1:] = np.where(ends[:-1], 1, lengths[:-1])
+        self.scores = _add_counts(self.scores, np.bincount(
+            np.where(reset, previous, lengths)[ends]))
+        self.deaths['collision'] += int(np.count_nonzero(
+            ends & (events == _COLLISION)))
+        self.deaths['win'] += int(np.count_nonzero(ends & (events == _WIN)))
+        self.deaths['unfinished'] += int(np.count_nonzero(ends & ~reset))
+
+        marks = np.flatnonzero(eaten | ends)
+        if len(marks):
+            gaps = np.diff(marks + self.ticks, prepend=self._last_mark)
+            self.gaps += np.bincount(
+                np.minimum(gaps[eaten[marks]], MAX_GAP),
+                minlength=MAX_GAP + 1)
+            self._last_mark = int(marks[-1]) + self.ticks
+
+        self.apples += int(np.count_nonzero(eaten))
+        self._last_length = 1 if ends[-1] else int(lengths[-1])
+        self._open = not ends[-1]
+        self.ticks += len(ticks)
+
+    def merge(self, other):
+        """
+        Добавляет статистику other, посчитанную по следующему потоку.
+
+        ----------
+        Текущий поток должен кончаться, а other — начинаться на границе
+        партий. Возвращает саму статистику.
+        """
+        offset = self.ticks
+        self.ticks += other.ticks
+        self.apples += other.apples
+        self.scores = _add_counts(self.scores, other.scores)
+        self.gaps += other.gaps
+        self.heatmap += other.heatmap
+        for cause, count in other.deaths.items():
+            self.deaths[cause] += count
+        if other.ticks:
+            self._last_length = other._last_length
+            self._open = other._open
+        if other._last_mark >= 0:
+            self._last_mark = other._last_mark + offset
+        return self
+
+    @property
+    def episodes(self):
+        """Возвращает число партий, включая незаконченную последнюю."""
+        return int(self.scores.sum()) + self._open
+
+    def apples_per_minute(self, speed=SPEED):
+        """Возвращает яблоки в минуту игры со скоростью speed тактов/с."""
+        if not self.ticks:
+            return 0.0
+        return self.apples * speed * 60 / self.ticks
+
+    def summary(self, speed=SPEED):
+        """Возвращает сводку статистики словарем, пригодным для JSON."""
+        scores = self.scores
+        return {
+            'ticks': self.ticks,
+            'episodes': self.episodes,
+            'apples': self.apples,
+            'apples_per_minute': round(self.apples_per_minute(speed), 3),
+            'score': {
+                'mean': round(_mean(scores), 3),
+                'median': _percentile(scores, 0.5),
+                'p90': _percentile(scores, 0.9),
+                'max': int(np.flatnonzero(scores)[-1]) if scores.any() else 0,
+            },
+            'ticks_between_apples': {
+                'mean': round(_mean(self.gaps), 3),
+                'median': _percentile(self.gaps, 0.5),
+                'p90': _percentile(self.gaps, 0.9),
+            },
+            'coverage': round(
+                int(np.count_nonzero(self.heatmap)) / self.world.cells, 4),
+            'deaths': dict(self.deaths, unfinished=(
+                self.deaths['unfinished'] + self._open)),
+        }
+
+
+def analyze(chunks, stats=None):
+    """
+    Пропускает поток порций через статистику и возвращает ее.
+
+    ----------
+    chunks перебирает пары (такты, последние такты партий или None).
+    """
+    if stats is None:
+        stats = SessionStats()
+    for ticks, ends in chunks:
+        stats.update(ticks, ends)
+    return stats
+
+
+def store_chunks(store, start=0, stop=None, chunk_ticks=CHUNK_TICKS):
+    """
+    Перебирает такты хранилища store с start до stop порциями.
+
+    ----------
+    Такты — представления поверх mmap без копирования; границы партий
+    берутся из индекса хранилища. Такты после последней партии индекса
+    принадлежат партии, которая еще записывается.
+    """
+    if stop is None:
+        stop = len(store.ticks)
+    episodes = store.episodes
+    last = (episodes['start'] + episodes['count']).astype(np.int64) - 1
+    for begin in range(start, stop, chunk_ticks):
+        end = min(begin + chunk_ticks, stop)
+        ends = np.zeros(end - begin, dtype=bool)
+        low, high = np.searchsorted(last, (begin, end))
+        ends[last[low:high] - begin] = True
+        yield store.ticks[begin:end], ends
+
+
+def replay_chunks(replay_file, snake, apple, chunk_ticks=CHUNK_TICKS):
+    """
+    Воспроизводит такты записи replay_file порциями TICK_RECORD.
+
+    ----------
+    Заголовок уже прочитан, snake и apple созданы по нему. Буфер порции
+    один на весь поток: порцию нужно обработать до следующей.
+    """
+    directions = DIRECTIONS + (None,)
+    buffer = np.zeros(chunk_ticks, dtype=TICK_RECORD)
+    filled = 0
+    for codes in read_ticks(replay_file):
+        for code in codes:
+            event = step(snake, apple, directions[code])
+            fill_record(buffer[filled], snake, apple, event)
+            filled += 1
+            if filled == chunk_ticks:
+                yield buffer, None
+                filled = 0
+    if filled:
+        yield buffer[:filled], None
+
+
+def analyze_replay(path, chunk_ticks=CHUNK_TICKS):
+    """Возвращает статистику партии из записи snake_replay."""
+    with open(path, 'rb') as replay_file:
+        seed, world = read_header(replay_file)
+        snake, apple = new_game(seed, world)
+        return analyze(
+            replay_chunks(replay_file, snake, apple, chunk_ticks),
+            SessionStats(world))
+
+
+def split_store(store, parts):
+    """
+    Делит такты хранилища на parts диапазонов по границам партий.
+
+    ----------
+    Возвращает список пар (start, stop); диапазоны идут подряд и
+    покрывают все такты. Диапазонов может оказаться меньше parts.
+    """
+    total = len(store.ticks)
+    starts = store.episodes['start'].astype(np.int64)
+    bounds = [0]
+    for part in range(1, parts):
+        index = np.searchsorted(starts, total * part // parts)
+        if index < len(starts) and bounds[-1] < starts[index] < total:
+            bounds.append(int(starts[index]))
+    bounds.append(total)
+    return list(zip(bounds, bounds[1:]))
+
+
+def _analyze_range(directory, start, stop, world, chunk_ticks):
+    """Считает статистику диапазона тактов хранилища в процессе пула."""
+    with EpisodeStore(directory) as store:
+        return analyze(
+            store_chunks(store, start, stop, chunk_ticks),
+            SessionStats(world))
+
+
+def _store_world(store, world):
+    """Возвращает мир для статистики хранилища store."""
+    if store.world is None:
+        return World() if world is None else world
+    if world is None:
+        return store.world
+    if (world.width, world.height) != (store.world.width, store.world.height):
+        raise ValueError(
+            f'Хранилище записано в мире {store.world.width}x'
+            f'{store.world.height}, а не {world.width}x{world.height}.')
+    return world
+
+
+def analyze_store(directory, world=None, workers=1,
+                  chunk_ticks=CHUNK_TICKS):
+    """
+    Возвращает статистику всех партий хранилища directory.
+
+    ----------
+    При workers > 1 диапазоны хранилища считаются в пуле из workers
+    процессов; каждый процесс сам отображает хранилище в память, так что
+    такты между процессами не передаются.
+
+    По умолчанию берется мир, записанный в хранилище. Вызывает
+    ValueError, если world другого размера, чем мир хранилища.
+    """
+    with EpisodeStore(directory) as store:
+        world = _store_world(store, world)
+        if workers > 1:
+            ranges = split_store(store, workers * RANGES_PER_WORKER)
+    if workers <= 1:
+        return _analyze_range(directory, 0, None, world, chunk_ticks)
+    stats = SessionStats(world)
+    with ProcessPoolExecutor(workers) as pool:
+        futures = [
+            pool.submit(
+                _analyze_range, directory, start, stop, world, chunk_ticks)
+            for start, stop in ranges
+        ]
+        for future in futures:
+            stats.merge(future.result())
+    return stats
+
+
+def main():
+    """Печатает сводку статистики хранилища партий или записи партии."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    store_parser = subparsers.add_parser('store', help='хранилище партий')
+    store_parser.add_argument('directory')
+    store_parser.add_argument('--workers', type=int, default=1)
+    store_parser.add_argument('--width', type=int,
+                              help='ширина мира; по умолчанию из хранилища')
+    store_parser.add_argument('--height', type=int,
+                              help='высота мира; по умолчанию из хранилища')
+    replay_parser = subparsers.add_parser('replay', help='запись партии')
+    replay_parser.add_argument('path')
+    for subparser in (store_parser, replay_parser):
+        subparser.add_argument('--speed', type=int, default=SPEED,
+                               help='тактов в секунду для яблок в минуту')
+        subparser.add_argument('--heatmap',
+                               help='сохранить тепловую карту в файл .npy')
+    args = parser.parse_args()
+    if args.command == 'store':
+        world = None
+        if args.width is not None or args.height is not None:
+            world = World(args.width or World().width,
+                          args.height or World().height)
+        stats = analyze_store(args.directory, world, args.workers)
+    else:
+        stats = analyze_replay(args.path)
+    if args.heatmap:
+        np.save(args.heatmap, stats.heatmap)
+    print(json.dumps(stats.summary(args.speed), ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
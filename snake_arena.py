@@ -0,0 +1,290 @@
+"""
+Арена: много змеек и яблок на одном тороидальном поле.
+
+Змейки арены — это Snake из модуля the_snake с теми же правилами
+движения сквозь границы и сброса, но их тела (SnakeBody) делят общие
+счетчики сегментов и общий индекс свободных ячеек. Поэтому проверка
+столкновений не сравнивает змеек попарно: голова разбилась, если в ее
+ячейке больше одного сегмента любой змейки. Так одной проверкой за O(1)
+находятся укус себя, удар в чужое тело и встреча голов, а такт арены
+стоит O(числа змеек) независимо от их длины.
+
+Такт арены:
+
+    1. каждая змейка выбирает направление (очередь ввода или политика)
+       и делает шаг;
+    2. змейки, в ячейке головы которых больше одного сегмента,
+       разбиваются — все одновременно, после движения всех змеек;
+    3. уцелевшая змейка, голова которой на яблоке, растет; яблоко
+       появляется в случайной свободной ячейке;
+    4. разбившиеся змейки начинают заново в случайной свободной ячейке.
+
+    python snake_arena.py --snakes 200 --apples 50 --width 200 --height 200
+    python snake_arena.py --play --snakes 20
+"""
+
+
+import argparse
+import random
+import time
+
+from the_snake import (
+    APPLE_COLOR, DIRECTIONS, SNAKE_COLOR, SPEED, BoardFull, FreeCells, Snake,
+    SnakeBody, World, cell_counts, draw_cell, get_clock, get_screen,
+    handle_keys, is_reversal, lazy_import, setup_input, surfaces
+)
+
+pygame = lazy_import('pygame')
+
+# Вероятность случайного поворота змейки под управлением wander:
+TURN_PROBABILITY = 0.1
+
+# Цвет змеек под управлением политики:
+ARENA_SNAKE_COLOR = (255, 200, 0)
+
+
+def wander(arena, snake):
+    """
+    Политика по умолчанию: случайные повороты с обходом препятствий.
+
+    ----------
+    Змейка иногда поворачивает случайно и выбирает направление без
+    разворота, в котором следующая ячейка свободна, если такое есть.
+    """
+    preferred = snake.direction
+    if snake.rng.random() < TURN_PROBABILITY:
+        preferred = snake.rng.choice(DIRECTIONS)
+    for direction in (preferred,) + DIRECTIONS:
+        if not is_reversal(direction, snake.direction) and (
+            arena.is_free(arena.next_cell(snake, direction))
+        ):
+            return direction
+    return None
+
+
+class ArenaSnake(Snake):
+    """
+    Змейка арены.
+
+    Атрибуты
+    ---------
+    arena : Arena
+                арена змейки
+    policy : callable или None
+                policy(arena, snake) возвращает направление или None;
+                None — змейкой управляет только очередь ввода
+    """
+
+    __slots__ = ('arena', 'policy')
+
+    def __init__(self, arena, policy=None):
+        """Создает змейку на общем поле арены в случайной ячейке."""
+        self.arena = arena
+        self.policy = policy
+        self.body = SnakeBody(
+            (), arena.free_cells, arena.world, arena.counts)
+        super().__init__(arena.rng, arena.world)
+        self.body_color = ARENA_SNAKE_COLOR
+
+    def start_position(self):
+        """Возвращает случайную свободную ячейку общего поля."""
+        y, x = divmod(
+            self.arena.free_cells.choice_cell(self.rng), self.world.width)
+        return x, y
+
+
+class Arena:
+    """
+    Много змеек и яблок на общем поле.
+
+    Атрибуты
+    ---------
+    world : World
+                игровой мир
+    counts : array('H') или Counter
+                число сегментов всех змеек в каждой ячейке
+    free_cells : FreeCells
+                ячейки без змеек и яблок
+    snakes : list[ArenaSnake]
+                змейки арены
+    apples : list[int]
+                номера ячеек с яблоками
+    ticks : int
+                число выполненных тактов
+    """
+
+    __slots__ = (
+        'world', 'rng', 'counts', 'free_cells', 'snakes', 'apples',
+        '_apple_slots', 'ticks',
+    )
+
+    def __init__(self, n_snakes, n_apples, world=None, rng=None,
+                 policy=wander):
+        """
+        Устанавливает все необходимые атрибуты объекта Arena.
+
+        Параметры
+        ----------
+        n_snakes, n_apples : int
+                число змеек и яблок
+        world : World, optional
+                игровой мир, по умолчанию поле размером с окно
+        rng : random.Random, optional
+                генератор случайных чисел; по умолчанию модуль random
+        policy : callable, optional
+                политика управления змейками, по умолчанию wander
+        """
+        self.world = World() if world is None else world
+        self.rng = random if rng is None else rng
+        self.counts = cell_counts(self.world.cells)
+        self.free_cells = FreeCells(self.world.width, self.world.height)
+        self.snakes = [ArenaSnake(self, policy) for _ in range(n_snakes)]
+        self.apples = []
+        self._apple_slots = {}  # Номер ячейки -> индекс в apples
+        self.ticks = 0
+        for _ in range(n_apples):
+            self.place_apple()
+
+    def add_snake(self, policy=None):
+        """Добавляет змейку в случайную свободную ячейку и возвращает ее."""
+        snake = ArenaSnake(self, policy)
+        self.snakes.append(snake)
+        return snake
+
+    def remove_snake(self, snake):
+        """Убирает змейку с арены, освобождая ее ячейки."""
+        self.snakes.remove(snake)
+        snake.body.clear()
+
+    def next_cell(self, snake, direction):
+        """Возвращает номер ячейки, куда шагнет голова в direction."""
+        width = self.world.width
+        head_y, head_x = divmod(snake.body.head_cell, width)
+        return ((head_y + direction[1]) % self.world.height * width
+                + (head_x + direction[0]) % width)
+
+    def is_free(self, number):
+        """Проверяет, нет ли в ячейке сегментов змеек."""
+        return not self.counts[number]
+
+    def place_apple(self):
+        """
+        Кладет яблоко в случайную свободную ячейку.
+
+        ----------
+        Возвращает False, если свободных ячеек нет.
+        """
+        try:
+            number = self.free_cells.choice_cell(self.rng)
+        except BoardFull:
+            return False
+        self.free_cells.discard_cell(number)
+        self._apple_slots[number] = len(self.apples)
+        self.apples.append(number)
+        return True
+
+    def _take_apple(self, number):
+        """Убирает яблоко из ячейки number; ячейку занимает змейка."""
+        slot = self._apple_slots.pop(number)
+        last = self.apples.pop()
+        if slot < len(self.apples):
+            self.apples[slot] = last
+            self._apple_slots[last] = slot
+
+    def step(self):
+        """
+        Выполняет один такт арены.
+
+        ----------
+        Возвращает список змеек, разбившихся на этом такте; они уже
+        начали заново.
+        """
+        for snake in self.snakes:
+            direction = snake.next_turn()
+            if direction is None and snake.policy is not None:
+                direction = snake.policy(self, snake)
+            if direction is not None and not is_reversal(
+                    direction, snake.direction):
+                snake.direction = direction
+            snake.move()
+        counts = self.counts
+        crashed = [
+            snake for snake in self.snakes
+            if counts[snake.body.head_cell] > 1
+        ]
+        apple_slots = self._apple_slots
+        for snake in self.snakes:
+            head = snake.body.head_cell
+            if head in apple_slots:
+                self._take_apple(head)
+                if counts[head] == 1:
+                    snake.length += 1  # Разбившаяся змейка не растет
+                self.place_apple()
+        for snake in crashed:
+            snake.reset()
+        self.ticks += 1
+        return crashed
+
+    def draw(self, surface=None):
+        """Отрисовывает арену целиком."""
+        if surface is None:
+            surface = get_screen()
+        surface.blit(surfaces.background(surface.get_size()), (0, 0))
+        width = self.world.width
+        for number in self.apples:
+            draw_cell((number % width, number // width), APPLE_COLOR,
+                      surface)
+        for snake in self.snakes:
+            snake.draw(surface)
+
+
+def measure_throughput(n_snakes, n_apples, ticks, world, seed=0):
+    """Возвращает число тактов змеек в секунду без отрисовки."""
+    arena = Arena(n_snakes, n_apples, world, random.Random(seed))
+    start = time.perf_counter()
+    for _ in range(ticks):
+        arena.step()
+    return n_snakes * ticks / (time.perf_counter() - start)
+
+
+def play(arena, speed=SPEED):
+    """Показывает арену в окне; первой змейкой управляет игрок."""
+    pygame.init()
+    setup_input()
+    player = arena.snakes[0]
+    player.policy = None
+    player.body_color = SNAKE_COLOR
+    clock = get_clock()
+    while True:
+        clock.tick(speed)
+        handle_keys(player)
+        arena.step()
+        arena.draw()
+        pygame.display.update()
+
+
+def main():
+    """Измеряет скорость арены или запускает ее в окне."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--snakes', type=int, default=200)
+    parser.add_argument('--apples', type=int, default=50)
+    parser.add_argument('--ticks', type=int, default=1000)
+    parser.add_argument('--width', type=int, default=None)
+    parser.add_argument('--height', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--play', action='store_true',
+                        help='показать арену в окне')
+    args = parser.parse_args()
+    default = World()
+    world = World(args.width or default.width, args.height or default.height)
+    if args.play:
+        if not world.fits_screen():
+            parser.error('Для игры в окне мир должен помещаться в окно.')
+        play(Arena(args.snakes, args.apples, world, random.Random(args.seed)))
+    rate = measure_throughput(
+        args.snakes, args.apples, args.ticks, world, args.seed)
+    print(f'{rate:,.0f} тактов змеек в секунду')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,338 @@
+"""
+Автопилот Змейки.
+
+Autopilot ведет змейку через тот же интерфейс, что и игрок: перед тактом
+он записывает поворот в Snake.next_direction. Основа безопасности —
+гамильтонов цикл тороидального поля: цикл проходит через каждую ячейку
+по одному разу, и змейка, идущая по нему, никогда не укусит себя и
+заполнит все поле.
+
+Чтобы не обходить все поле ради каждого яблока, змейка срезает путь:
+переходит в соседнюю ячейку дальше по циклу, но не ближе к хвосту, чем
+позволяет запас свободных ячеек. Тело тогда остается упорядоченным по
+циклу, и путь по циклу от головы до хвоста всегда свободен — это и есть
+проверка достижимости хвоста, которая стоит O(1). Какую ячейку выбрать,
+подсказывает кратчайший путь до яблока, найденный A* по свободным
+ячейкам. Путь кэшируется и пересчитывается только для нового яблока или
+когда его перегородило тело; пока змейка идет по нему, такт стоит O(1).
+
+    python snake_autopilot.py --width 32 --height 24
+    python snake_autopilot.py --play
+"""
+
+
+import argparse
+import functools
+import heapq
+import random
+import time
+from array import array
+from collections import deque
+
+from the_snake import (
+    COLLISION, DIRECTIONS, WIN, Apple, Snake, World, main as play, step
+)
+
+# Сколько ячеек может раскрыть A* при поиске пути до яблока:
+SEARCH_LIMIT = 4096
+
+# Запас ячеек между головой и хвостом при срезании пути по циклу:
+SAFETY_MARGIN = 3
+
+
+@functools.lru_cache(maxsize=8)
+def hamiltonian_cycle(width, height):
+    """
+    Возвращает гамильтонов цикл тора width x height.
+
+    ----------
+    array('I') номеров ячеек y * width + x в порядке обхода; соседние
+    ячейки массива, как и последняя с первой, смежны на торе.
+    Для четного числа строк строится «гребенка»: строки обходятся
+    змейкой от столбца 1, а столбец 0 ведет обратно. Для нечетного
+    числа строк и четного числа столбцов поле транспонируется. Если
+    оба размера нечетны, последняя строка вставляется в гребенку
+    через переход по границе тора.
+    """
+    if width == 1 or height == 1:
+        return array('I', range(width * height))
+    if height % 2 and not width % 2:
+        transposed = hamiltonian_cycle(height, width)
+        return array('I', (
+            (cell % height) * width + cell // height for cell in transposed))
+    rows = height - height % 2
+    cycle = array('I')
+    for y in range(rows):
+        if y == 0:
+            columns = range(width)
+        elif y % 2:
+            columns = range(width - 1, 0, -1)
+        else:
+            columns = range(1, width)
+        for x in columns:
+            cycle.append(y * width + x)
+            if y == rows - 1 and x == width - 1 and rows < height:
+                # Ныряем в последнюю строку и возвращаемся через границу
+                cycle.extend(
+                    (height - 1) * width + (width - 1 + i) % width
+                    for i in range(width))
+    cycle.extend(y * width for y in range(rows - 1, 0, -1))
+    return cycle
+
+
+@functools.lru_cache(maxsize=8)
+def cycle_order(width, height):
+    """
+    Возвращает порядок обхода гамильтонова цикла.
+
+    ----------
+    array('I') с номером каждой ячейки в цикле и bytearray с номером
+    направления в DIRECTIONS, ведущего из ячейки в следующую по циклу.
+    """
+    cycle = hamiltonian_cycle(width, height)
+    order = array('I', bytes(4 * len(cycle)))
+    turns = bytearray(len(cycle))
+    codes = {
+        ((dx % width) + (dy % height) * width): code
+        for code, (dx, dy) in enumerate(DIRECTIONS)
+    }
+    for index, cell in enumerate(cycle):
+        order[cell] = index
+        following = cycle[(index + 1) % len(cycle)]
+        y, x = divmod(cell, width)
+        next_y, next_x = divmod(following, width)
+        turns[cell] = codes.get(
+            (next_x - x) % width + (next_y - y) % height * width, 0)
+    return order, turns
+
+
+class Autopilot:
+    """
+    Автопилот змейки.
+
+    Атрибуты
+    ---------
+    snake : Snake
+                змейка, которой управляет автопилот
+    apple : Apple
+                яблоко, к которому ведет автопилот
+    searches : int
+                сколько раз выполнялся поиск пути A*
+    """
+
+    def __init__(self, snake, apple):
+        """
+        Устанавливает все необходимые атрибуты объекта Autopilot.
+
+        Параметры
+        ----------
+        snake : Snake
+                змейка
+        apple : Apple
+                яблоко
+        """
+        self.snake = snake
+        self.apple = apple
+        self.searches = 0
+        world = snake.world
+        self._width = world.width
+        self._height = world.height
+        self._cells = world.cells
+        self._order, self._turns = cycle_order(world.width, world.height)
+        self._path = deque()
+        self._goal = None
+
+    def steer(self):
+        """
+        Записывает поворот следующего такта в snake.next_direction.
+
+        ----------
+        Направление записывается и тогда, когда змейка идет прямо:
+        next_direction важнее очереди ввода, поэтому нажатая стрелка
+        не перебивает автопилот.
+        """
+        self.snake.next_direction = self.decide()
+
+    def decide(self):
+        """Возвращает направление для следующего такта."""
+        body = self.snake.body
+        head = body.head_cell
+        x, y = self.apple.position
+        goal = y * self._width + x
+        jump = self._allowed_jump(body, head, goal)
+        if jump == 1:
+            # Без срезов путь не нужен: змейка идет по циклу
+            direction = DIRECTIONS[self._turns[head]]
+            width, height = self._width, self._height
+            y, x = divmod(head, width)
+            following = ((y + direction[1]) % height * width
+                         + (x + direction[0]) % width)
+            if not body.cell_count(following):
+                return direction
+            target = None
+        else:
+            target = self._path_step(body, head, goal, jump)
+        if target is None:
+            target = self._cycle_step(body, head, jump)
+        for direction, cell in zip(DIRECTIONS, self._neighbours(head)):
+            if cell == target:
+                return direction
+        return self.snake.direction
+
+    def _neighbours(self, cell):
+        """Возвращает соседей ячейки в порядке DIRECTIONS."""
+        width, height = self._width, self._height
+        y, x = divmod(cell, width)
+        row = y * width
+        return (
+            (y - 1) % height * width + x,
+            (y + 1) % height * width + x,
+            row + (x - 1) % width,
+            row + (x + 1) % width,
+        )
+
+    def _distance(self, start, cell):
+        """Возвращает расстояние от start до cell вперед по циклу."""
+        order = self._order
+        return (order[cell] - order[start]) % self._cells
+
+    def _allowed_jump(self, body, head, goal):
+        """
+        Возвращает, на сколько ячеек цикла можно продвинуться за такт.
+
+        ----------
+        Прыжок не должен приблизить голову к хвосту ближе, чем на длину
+        змейки с запасом: змейка может вырасти, пока хвост догоняет.
+        Когда свободна меньше половины поля, змейка идет строго по циклу.
+        """
+        length = self.snake.length
+        empty = self._cells - length - 1
+        if empty < self._cells // 2:
+            return 1
+        to_tail = self._distance(head, body.tail_cell) or self._cells
+        to_goal = self._distance(head, goal)
+        jump = to_tail - length - SAFETY_MARGIN
+        if to_goal < to_tail:
+            jump -= 1  # Яблоко по пути: змейка вырастет
+            if (to_tail - to_goal) * 4 > empty:
+                jump -= 10
+        return max(1, min(jump, to_goal))
+
+    def _path_step(self, body, head, goal, jump):
+        """
+        Возвращает следующую ячейку кэшированного пути до яблока.
+
+        ----------
+        None, если пути нет или шаг по нему нарушает порядок цикла.
+        """
+        path = self._path
+        if path and path[0] == head:
+            path.popleft()  # Змейка сделала шаг по пути
+        if goal != self._goal or (path and body.cell_count(path[0])):
+            self._goal = goal
+            self._path = path = self._search(body, head, goal)
+        if not path:
+            return None
+        target = path[0]
+        if target not in self._neighbours(head):
+            path.clear()  # Змейка сошла с пути; ждем следующего яблока
+            return None
+        if 0 < self._distance(head, target) <= jump:
+            return target
+        return None
+
+    def _cycle_step(self, body, head, jump):
+        """Возвращает самую дальнюю по циклу свободную соседнюю ячейку."""
+        best, best_distance, fallback = None, 0, None
+        for cell in self._neighbours(head):
+            if body.cell_count(cell):
+                continue
+            distance = self._distance(head, cell)
+            if distance > jump:
+                fallback = cell  # Тело не по циклу: хоть какой-то ход
+            elif distance > best_distance:
+                best, best_distance = cell, distance
+        return fallback if best is None else best
+
+    def _search(self, body, start, goal):
+        """
+        Ищет кратчайший путь от start до goal по свободным ячейкам (A*).
+
+        ----------
+        Возвращает deque ячеек пути без start или пустую deque, если путь
+        не найден за SEARCH_LIMIT раскрытых ячеек.
+        """
+        self.searches += 1
+        width, height = self._width, self._height
+        goal_y, goal_x = divmod(goal, width)
+
+        def estimate(cell):
+            y, x = divmod(cell, width)
+            dx, dy = abs(x - goal_x), abs(y - goal_y)
+            return min(dx, width - dx) + min(dy, height - dy)
+
+        came_from = {start: start}
+        frontier = [(estimate(start), 0, start)]
+        expanded = 0
+        while frontier and expanded < SEARCH_LIMIT:
+            _, cost, cell = heapq.heappop(frontier)
+            if cell == goal:
+                path = deque()
+                while cell != start:
+                    path.appendleft(cell)
+                    cell = came_from[cell]
+                return path
+            expanded += 1
+            for neighbour in self._neighbours(cell):
+                if neighbour in came_from or body.cell_count(neighbour):
+                    continue
+                came_from[neighbour] = cell
+                heapq.heappush(frontier, (
+                    cost + 1 + estimate(neighbour), cost + 1, neighbour))
+        return deque()
+
+
+def soak(world, seed=0, max_ticks=None):
+    """
+    Играет автопилотом без отрисовки, пока змейка не заполнит поле.
+
+    ----------
+    Возвращает число тактов, число укусов и время игры в секундах.
+    max_ticks ограничивает игру; по умолчанию — квадрат числа ячеек.
+    """
+    rng = random.Random(seed)
+    snake = Snake(rng, world)
+    apple = Apple(snake.positions, rng, world)
+    pilot = Autopilot(snake, apple)
+    if max_ticks is None:
+        max_ticks = world.cells ** 2
+    collisions = 0
+    start = time.perf_counter()
+    for ticks in range(1, max_ticks + 1):
+        pilot.steer()
+        event = step(snake, apple)
+        if event == WIN:
+            break
+        collisions += event == COLLISION
+    return ticks, collisions, time.perf_counter() - start
+
+
+def main():
+    """Прогоняет автопилот до заполнения поля или показывает его игру."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--width', type=int, default=World().width)
+    parser.add_argument('--height', type=int, default=World().height)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--play', action='store_true',
+                        help='показать игру автопилота в окне')
+    args = parser.parse_args()
+    world = World(args.width, args.height)
+    if args.play:
+        play(random.Random(args.seed), world=world, autopilot=Autopilot)
+        return
+    ticks, collisions, seconds = soak(world, args.seed)
+    print(f'{ticks:,} тактов, укусов: {collisions}, {seconds:.2f} с')
+
+
+if __name__ == '__main__':
+    main()
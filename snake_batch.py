@@ -0,0 +1,302 @@
+"""
+Пакетная симуляция Змейки на NumPy.
+
+Модуль хранит состояние N независимых игр в массивах NumPy и продвигает
+их все одним вызовом step. Правила те же, что у Snake и Apple из модуля
+the_snake: змейка проходит сквозь границы поля, при укусе начинает игру
+заново, а съев яблоко, растет на один сегмент. Если змейка заполнила все
+поле, игра тоже начинается заново.
+
+Позиции хранятся как номера ячеек: cell = y * width + x.
+"""
+
+
+import argparse
+import time
+
+import numpy as np
+
+from the_snake import (
+    COLLISION, DIRECTIONS, EAT, GRID_HEIGHT, GRID_WIDTH, MOVE, WIN
+)
+
+# Действие -1 сохраняет текущее направление:
+NO_ACTION = -1
+DIRECTION_DX = np.array([dx for dx, _ in DIRECTIONS], dtype=np.int64)
+DIRECTION_DY = np.array([dy for _, dy in DIRECTIONS], dtype=np.int64)
+OPPOSITE = np.array(
+    [DIRECTIONS.index((-dx, -dy)) for dx, dy in DIRECTIONS], dtype=np.int8
+)
+
+# Коды событий в массиве, который возвращает step:
+EVENTS = (MOVE, EAT, COLLISION, WIN)
+MOVE_CODE, EAT_CODE, COLLISION_CODE, WIN_CODE = range(len(EVENTS))
+
+# Сколько раз пробовать случайную ячейку, прежде чем искать свободные:
+APPLE_ATTEMPTS = 8
+
+_SPLITMIX_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+_XORSHIFT_MULTIPLIER = np.uint64(0x2545F4914F6CDD1D)
+
+
+def seed_states(seed, n_games, game_offset=0):
+    """
+    Возвращает начальные состояния генераторов для n_games игр.
+
+    Состояния получаются из seed и номера игры через splitmix64, поэтому
+    игры с одинаковым seed и номером воспроизводимы. game_offset — номер
+    первой игры, если пакет является частью большего набора игр.
+    """
+    numbers = np.arange(
+        game_offset + 1, game_offset + n_games + 1, dtype=np.uint64)
+    state = np.uint64(seed) + numbers * _SPLITMIX_GAMMA
+    state = (state ^ (state >> np.uint64(30))) * np.uint64(
+        0xBF58476D1CE4E5B9)
+    state = (state ^ (state >> np.uint64(27))) * np.uint64(
+        0x94D049BB133111EB)
+    state ^= state >> np.uint64(31)
+    state[state == 0] = _SPLITMIX_GAMMA  # xorshift не работает с нулем
+    return state
+
+
+def _aligned(nbytes):
+    """Округляет размер вверх до 8 байт."""
+    return -(-nbytes // 8) * 8
+
+
+class BatchSnake:
+    """
+    Пакет из N игр Змейка в массивах NumPy.
+
+    Атрибуты
+    ---------
+    body : numpy.ndarray[int32] формы (N, cells + 1)
+                кольцевые буферы тел змеек, номер ячейки на сегмент
+    head_index : numpy.ndarray[int64]
+                индекс головы в кольцевом буфере
+    size : numpy.ndarray[int64]
+                текущее число сегментов
+    length : numpy.ndarray[int64]
+                длина змейки, до которой растет тело
+    direction : numpy.ndarray[int8]
+                номер направления в DIRECTIONS
+    occupancy : numpy.ndarray[uint8] формы (N, height, width)
+                число сегментов в каждой ячейке
+    apple : numpy.ndarray[int64]
+                ячейка яблока
+    rng_state : numpy.ndarray[uint64]
+                состояние генератора xorshift64* каждой игры
+
+    Все массивы можно разместить в одном внешнем буфере (например,
+    multiprocessing.shared_memory), тогда другие процессы читают
+    состояние игр без копирования через BatchSnake.attach.
+    """
+
+    def __init__(self, n_games, width=GRID_WIDTH, height=GRID_HEIGHT,
+                 seed=0, buffer=None, game_offset=0):
+        """
+        Устанавливает все необходимые атрибуты объекта BatchSnake.
+
+        Параметры
+        ----------
+        n_games : int
+                число игр в пакете
+        width, height : int
+                размеры поля в ячейках
+        seed : int
+                начальное значение генераторов случайных чисел
+        buffer : буфер, optional
+                память размером не меньше state_nbytes для массивов
+        game_offset : int
+                номер первой игры пакета среди всех игр с этим seed
+        """
+        self._configure(n_games, width, height)
+        self._allocate(buffer)
+        self.rng_state[:] = seed_states(seed, n_games, game_offset)
+        self.reset(self.games)
+
+    @classmethod
+    def attach(cls, buffer, n_games, width=GRID_WIDTH, height=GRID_HEIGHT):
+        """Возвращает пакет поверх уже заполненного буфера, не сбрасывая."""
+        batch = cls.__new__(cls)
+        batch._configure(n_games, width, height)
+        batch._allocate(buffer)
+        return batch
+
+    @staticmethod
+    def state_layout(n_games, width, height):
+        """Возвращает имена, типы и формы массивов состояния."""
+        return (
+            ('body', np.int32, (n_games, width * height + 1)),
+            ('head_index', np.int64, (n_games,)),
+            ('size', np.int64, (n_games,)),
+            ('length', np.int64, (n_games,)),
+            ('apple', np.int64, (n_games,)),
+            ('rng_state', np.uint64, (n_games,)),
+            ('direction', np.int8, (n_games,)),
+            ('occupancy', np.uint8, (n_games, height, width)),
+        )
+
+    @classmethod
+    def state_nbytes(cls, n_games, width=GRID_WIDTH, height=GRID_HEIGHT):
+        """Возвращает размер буфера для состояния n_games игр."""
+        return sum(
+            _aligned(np.dtype(dtype).itemsize * int(np.prod(shape)))
+            for _, dtype, shape in cls.state_layout(n_games, width, height)
+        )
+
+    def _configure(self, n_games, width, height):
+        """Запоминает размеры пакета и поля."""
+        self.n_games = n_games
+        self.width = width
+        self.height = height
+        self.cells = width * height
+        self.center = height // 2 * width + width // 2
+        self.games = np.arange(n_games)
+
+    def _allocate(self, buffer):
+        """Создает массивы состояния в buffer или в собственной памяти."""
+        offset = 0
+        layout = self.state_layout(self.n_games, self.width, self.height)
+        for name, dtype, shape in layout:
+            if buffer is None:
+                array = np.zeros(shape, dtype=dtype)
+            else:
+                array = np.ndarray(shape, dtype, buffer, offset)
+                offset += _aligned(array.nbytes)
+            setattr(self, name, array)
+
+    @property
+    def cells_occupancy(self):
+        """Занятость ячеек в виде (N, cells) без копирования."""
+        return self.occupancy.reshape(self.n_games, self.cells)
+
+    def random(self, games, bound):
+        """Возвращает по случайному числу из [0, bound) для игр games."""
+        state = self.rng_state[games]
+        state ^= state >> np.uint64(12)
+        state ^= state << np.uint64(25)
+        state ^= state >> np.uint64(27)
+        self.rng_state[games] = state
+        return ((state * _XORSHIFT_MULTIPLIER) >> np.uint64(11)) % np.uint64(
+            bound)
+
+    def heads(self):
+        """Возвращает ячейки голов всех змеек."""
+        return self.body[self.games, self.head_index].astype(np.int64)
+
+    def reset(self, games):
+        """Начинает игры games заново, как Snake.reset и новое яблоко."""
+        if not len(games):
+            return
+        self.cells_occupancy[games] = 0
+        self.head_index[games] = 0
+        self.body[games, 0] = self.center
+        self.cells_occupancy[games, self.center] = 1
+        self.size[games] = 1
+        self.length[games] = 1
+        self.direction[games] = self.random(games, len(DIRECTIONS))
+        self.place_apples(games)
+
+    def place_apples(self, games):
+        """
+        Ставит яблоки в свободные ячейки игр games.
+
+        Сначала пробует несколько случайных ячеек сразу для всех игр,
+        а для оставшихся выбирает из списка свободных ячеек.
+        """
+        occupancy = self.cells_occupancy
+        for _ in range(APPLE_ATTEMPTS):
+            if not len(games):
+                return
+            cells = self.random(games, self.cells).astype(np.int64)
+            free = occupancy[games, cells] == 0
+            self.apple[games[free]] = cells[free]
+            games = games[~free]
+        for game in games:
+            free_cells = np.flatnonzero(occupancy[game] == 0)
+            index = self.random(np.array([game]), len(free_cells))[0]
+            self.apple[game] = free_cells[index]
+
+    def step(self, actions=None):
+        """
+        Выполняет один такт во всех играх.
+
+        Параметры
+        ----------
+        actions : numpy.ndarray[int], optional
+                номер нового направления для каждой игры или NO_ACTION;
+                разворот на 180° игнорируется
+
+        ----------
+        Возвращает массив кодов событий (MOVE_CODE, EAT_CODE,
+        COLLISION_CODE, WIN_CODE), по одному на игру.
+        """
+        games = self.games
+        if actions is not None:
+            actions = np.asarray(actions)
+            turn = (actions != NO_ACTION) & (
+                actions != OPPOSITE[self.direction])
+            self.direction[turn] = actions[turn]
+        head = self.heads()
+        head_x = (head % self.width + DIRECTION_DX[self.direction]) \
+            % self.width
+        head_y = (head // self.width + DIRECTION_DY[self.direction]) \
+            % self.height
+        new_head = head_y * self.width + head_x
+        capacity = self.body.shape[1]
+        occupancy = self.cells_occupancy
+        # Вставляем новую голову
+        self.head_index += 1
+        self.head_index %= capacity
+        self.body[games, self.head_index] = new_head
+        occupancy[games, new_head] += 1
+        self.size += 1
+        # Удаляем хвост там, где длина змейки превышена
+        shrink = games[self.size > self.length]
+        tail_index = (self.head_index[shrink] - self.size[shrink] + 1) \
+            % capacity
+        occupancy[shrink, self.body[shrink, tail_index]] -= 1
+        self.size[shrink] -= 1
+        # Укус и поедание яблока
+        events = np.full(self.n_games, MOVE_CODE, dtype=np.int8)
+        collision = occupancy[games, new_head] > 1
+        eat = ~collision & (new_head == self.apple)
+        events[collision] = COLLISION_CODE
+        events[eat] = EAT_CODE
+        self.length[eat] += 1
+        win = eat & (self.size == self.cells)
+        events[win] = WIN_CODE
+        self.place_apples(games[eat & ~win])
+        self.reset(games[collision | win])
+        return events
+
+
+def measure_throughput(n_games, ticks, width=GRID_WIDTH,
+                       height=GRID_HEIGHT, seed=0):
+    """Возвращает скорость симуляции в игровых тактах в секунду."""
+    batch = BatchSnake(n_games, width, height, seed)
+    actions = np.random.default_rng(seed).integers(
+        NO_ACTION, len(DIRECTIONS), size=(ticks, n_games))
+    start = time.perf_counter()
+    for tick_actions in actions:
+        batch.step(tick_actions)
+    return n_games * ticks / (time.perf_counter() - start)
+
+
+def main():
+    """Измеряет скорость пакетной симуляции."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--games', type=int, default=4096)
+    parser.add_argument('--ticks', type=int, default=1000)
+    parser.add_argument('--width', type=int, default=GRID_WIDTH)
+    parser.add_argument('--height', type=int, default=GRID_HEIGHT)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    rate = measure_throughput(
+        args.games, args.ticks, args.width, args.height, args.seed)
+    print(f'{rate:,.0f} игровых тактов в секунду')
+
+
+if __name__ == '__main__':
+    main()
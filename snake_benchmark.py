@@ -0,0 +1,329 @@
+"""
+Набор бенчмарков основных операций Змейки.
+
+Измеряется время одной операции в наносекундах для:
+
+    snake_move, snake_self_collection, apple_randomize_position,
+    snake_draw, apple_draw, headless_frame  — объекты модуля the_snake
+                                              на поле GRID_WIDTH x GRID_HEIGHT
+    world_move, world_randomize_position,   — змейка, яблоко и кадр с
+    viewport_frame                            прокруткой в мирах до 1000x1000
+    body_move, free_cell_choice             — структуры SnakeBody и
+                                              FreeCells на полях до 1000x1000
+    batch_step                              — пакетный движок snake_batch
+    arena_step                              — такт арены snake_arena на
+                                              одну змейку
+    snapshot_capture, snapshot_to_bytes,    — снимки snake_snapshot и
+    snapshot_pickle                           pickle того же состояния
+
+Длина змейки меняется от 1 до всего поля. Отрисовка измеряется на
+драйвере SDL dummy. Результаты пишутся в JSON и могут сравниваться с
+сохраненной базой: операция, ставшая медленнее базы больше чем на
+допуск, считается регрессией, и скрипт завершается с кодом 1.
+
+    python snake_benchmark.py --output bench.json
+    python snake_benchmark.py --baseline bench.json --tolerance 0.25
+"""
+
+
+import argparse
+import json
+import os
+import pickle
+import platform
+import random
+import sys
+import time
+from collections import deque
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import the_snake  # noqa: E402
+from snake_arena import Arena  # noqa: E402
+from snake_batch import BatchSnake  # noqa: E402
+from snake_snapshot import Checkpoints  # noqa: E402
+
+# Размеры полей для структур данных и пакетного движка:
+GRID_SIZES = ((32, 24), (100, 100), (1000, 1000))
+
+# Доли поля, занятые змейкой, для выбора позиции яблока:
+FILL_RATIOS = (0.0, 0.5, 0.9, 0.99)
+
+# Число змеек на арене 200x200:
+ARENA_SNAKES = (10, 100, 1000)
+
+# Сколько раз повторять замер; берется лучший результат:
+REPEATS = 5
+
+
+def serpentine(width, height):
+    """Возвращает обход поля змейкой: соседние ячейки списка смежны."""
+    return [
+        (x, y)
+        for y in range(height)
+        for x in (range(width) if y % 2 == 0 else range(width - 1, -1, -1))
+    ]
+
+
+def step_direction(cell, following, world):
+    """Возвращает направление шага из cell в соседнюю ячейку following."""
+    return (
+        (following[0] - cell[0] + 1) % world.width - 1,
+        (following[1] - cell[1] + 1) % world.height - 1,
+    )
+
+
+def board_lengths(cells):
+    """Возвращает длины змейки от 1 до всего поля."""
+    return sorted({1, cells // 10, cells // 2, cells - 1, cells} - {0})
+
+
+def measure(operation, number, setup=None):
+    """Возвращает лучшее время одной операции в наносекундах."""
+    best = float('inf')
+    for _ in range(REPEATS):
+        if setup is not None:
+            setup()
+        start = time.perf_counter_ns()
+        for _ in range(number):
+            operation()
+        best = min(best, (time.perf_counter_ns() - start) / number)
+    return best
+
+
+def make_snake(length, world=None):
+    """
+    Возвращает змейку длины length, уложенную по миру зигзагом.
+
+    ----------
+    Змейка смотрит вдоль зигзага, поэтому первый ход ведет в свободную
+    ячейку, а не в собственное тело.
+    """
+    if world is None:
+        world = the_snake.World()
+    path = serpentine(world.width, world.height)
+    snake = the_snake.Snake(world=world)
+    snake.positions = path[length - 1::-1]
+    snake.length = length
+    snake.direction = the_snake.RIGHT
+    if length < len(path):
+        snake.direction = step_direction(
+            path[length - 1], path[length], world)
+    return snake
+
+
+def bench_snake(cells):
+    """Измеряет методы Snake и Apple на поле модуля the_snake."""
+    for length in board_lengths(cells):
+        snake = make_snake(length)
+        params = {'length': length, 'grid': [
+            the_snake.GRID_WIDTH, the_snake.GRID_HEIGHT]}
+        yield 'snake_move', params, measure(snake.move, 10_000)
+        yield 'snake_self_collection', params, measure(
+            snake.self_collection, 10_000)
+        yield 'snake_draw', params, measure(snake.draw, 20)
+    for ratio in FILL_RATIOS + (1 - 1 / cells,):
+        snake = make_snake(max(1, int(ratio * cells)))
+        apple = the_snake.Apple(snake.positions)
+        yield 'apple_randomize_position', {'fill': round(ratio, 4)}, measure(
+            lambda: apple.randomize_position(snake.positions), 10_000)
+    apple = the_snake.Apple()
+    yield 'apple_draw', {}, measure(apple.draw, 1000)
+
+
+def make_frame():
+    """
+    Возвращает змейку, яблоко и кадр игры без окна.
+
+    ----------
+    Змейка в полполя идет по зигзагу, замкнутому через границу поля
+    (GRID_HEIGHT четна), и не кусает себя, сколько бы кадров ни прошло.
+    """
+    snake = make_snake(the_snake.GRID_WIDTH * the_snake.GRID_HEIGHT // 2)
+    apple = the_snake.Apple(snake.positions)
+    renderer = the_snake.Renderer(the_snake.get_screen())
+    renderer.draw(apple, snake)
+    path = serpentine(the_snake.GRID_WIDTH, the_snake.GRID_HEIGHT)
+    heading = {
+        cell: step_direction(cell, following, snake.world)
+        for cell, following in zip(path, path[1:] + path[:1])
+    }
+
+    def frame():
+        snake.direction = heading[snake.get_head_position()]
+        the_snake.run_tick(snake, apple)
+        renderer.draw(apple, snake)
+
+    return snake, apple, frame
+
+
+def bench_frame():
+    """Измеряет кадр игры без окна: такт и отрисовку изменений."""
+    snake, apple, frame = make_frame()
+    yield 'headless_frame', {'dirty': True}, measure(frame, 1000)
+
+
+def bench_world(width, height):
+    """Измеряет змейку, яблоко и кадр с прокруткой в мире width x height."""
+    world = the_snake.World(width, height)
+    for length in board_lengths(world.cells)[:-1]:
+        snake = make_snake(length, world)
+        apple = the_snake.Apple(snake.positions, world=world)
+        params = {'length': length, 'grid': [width, height]}
+        yield 'world_move', params, measure(snake.move, 10_000)
+        yield 'world_randomize_position', params, measure(
+            lambda: apple.randomize_position(snake.positions), 10_000)
+    snake = make_snake(world.cells // 2, world)
+    apple = the_snake.Apple(snake.positions, world=world)
+    renderer = the_snake.ViewportRenderer(the_snake.get_screen())
+    renderer.draw(apple, snake)
+
+    def frame():
+        the_snake.run_tick(snake, apple)
+        renderer.draw(apple, snake)
+
+    yield 'viewport_frame', {'grid': [width, height]}, measure(frame, 200)
+
+
+def bench_structures(width, height):
+    """Измеряет SnakeBody и FreeCells на поле width x height."""
+    path = serpentine(width, height)
+    for length in board_lengths(width * height)[:-1]:
+        free_cells = the_snake.FreeCells(width, height)
+        body = the_snake.SnakeBody(path[length - 1::-1], free_cells)
+        loop = deque(path[length:] + path[:length])
+
+        def move():
+            body.push_head(loop[0])
+            loop.rotate(-1)
+            body.pop_tail()
+            body.head_overlaps()
+
+        params = {'length': length, 'grid': [width, height]}
+        yield 'body_move', params, measure(move, 10_000)
+        yield 'free_cell_choice', params, measure(free_cells.choice, 10_000)
+
+
+def bench_batch(width, height):
+    """Измеряет такт пакетного движка на поле width x height."""
+    n_games = max(1, min(1024, 4_000_000 // (width * height)))
+    batch = BatchSnake(n_games, width, height)
+    yield 'batch_step', {'games': n_games, 'grid': [width, height]}, (
+        measure(batch.step, 50) / n_games)
+
+
+def bench_arena(width=200, height=200):
+    """Измеряет такт арены в пересчете на одну змейку."""
+    world = the_snake.World(width, height)
+    for n_snakes in ARENA_SNAKES:
+        arena = Arena(n_snakes, n_snakes // 4, world, random.Random(0))
+        for _ in range(100):
+            arena.step()  # Змейки успевают подрасти
+        yield 'arena_step', {'snakes': n_snakes, 'grid': [width, height]}, (
+            measure(arena.step, 50) / n_snakes)
+
+
+def bench_snapshot(width, height):
+    """Измеряет снимки состояния игры в мире width x height."""
+    world = the_snake.World(width, height)
+    for length in board_lengths(world.cells)[:-1]:
+        snake = make_snake(length, world)
+        apple = the_snake.Apple(snake.positions, world=world)
+        checkpoints = Checkpoints(snake, apple, limit=1000)
+
+        def capture():
+            snake.move()
+            checkpoints.capture()
+
+        params = {'length': length, 'grid': [width, height]}
+        yield 'snapshot_capture', params, measure(capture, 1000)
+        snapshot = checkpoints[-1]
+        yield 'snapshot_to_bytes', params, measure(snapshot.to_bytes, 100)
+        state = (list(snake.positions), snake.direction, snake.length,
+                 apple.position, random.getstate())
+        yield 'snapshot_pickle', params, measure(
+            lambda: pickle.dumps(state), 100)
+
+
+def run_benchmarks(grid_sizes=GRID_SIZES):
+    """Выполняет все бенчмарки и возвращает список результатов."""
+    the_snake.pygame.init()
+    suites = [
+        bench_snake(the_snake.GRID_WIDTH * the_snake.GRID_HEIGHT),
+        bench_frame(),
+        bench_arena(),
+    ]
+    for width, height in grid_sizes:
+        suites += [
+            bench_world(width, height),
+            bench_structures(width, height),
+            bench_batch(width, height),
+            bench_snapshot(width, height),
+        ]
+    results = []
+    for suite in suites:
+        for name, params, ns_per_op in suite:
+            results.append(
+                {'name': name, 'params': params, 'ns_per_op': ns_per_op})
+            print(f'{result_key(results[-1]):<60} {ns_per_op:>14,.0f} нс')
+    return results
+
+
+def result_key(result):
+    """Возвращает ключ результата для сравнения с базой."""
+    params = ','.join(
+        f'{name}={value}' for name, value in sorted(result['params'].items()))
+    return f'{result["name"]}[{params}]'
+
+
+def compare(results, baseline, tolerance):
+    """
+    Сравнивает результаты с базой.
+
+    ----------
+    Возвращает список регрессий: (ключ, время базы, новое время).
+    """
+    base_times = {
+        result_key(result): result['ns_per_op']
+        for result in baseline['results']
+    }
+    regressions = []
+    for result in results:
+        base_time = base_times.get(result_key(result))
+        if base_time and result['ns_per_op'] > base_time * (1 + tolerance):
+            regressions.append(
+                (result_key(result), base_time, result['ns_per_op']))
+    return regressions
+
+
+def main():
+    """Выполняет бенчмарки, сохраняет и сравнивает результаты."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--output', help='файл JSON для результатов')
+    parser.add_argument('--baseline', help='файл JSON с базой')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='допустимое замедление, доля от базы')
+    parser.add_argument('--max-grid', type=int, default=1000,
+                        help='наибольшая сторона поля для структур')
+    args = parser.parse_args()
+    results = run_benchmarks([
+        size for size in GRID_SIZES if max(size) <= args.max_grid])
+    report = {
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            json.dump(report, output, ensure_ascii=False, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as baseline:
+            regressions = compare(results, json.load(baseline), args.tolerance)
+        for key, base_time, new_time in regressions:
+            print(f'Регрессия {key}: {base_time:,.0f} -> {new_time:,.0f} нс')
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,516 @@
+"""
+Планировщик ходов Змейки: лучевой поиск с ограничением по времени.
+
+Planner ведет змейку, как Autopilot, но ход выбирает поиском по дереву
+будущих состояний по правилам step: голова сдвигается, хвост уходит,
+если змейка не растет, укус (Snake.self_collection) заканчивает ветку,
+а яблоко удлиняет змейку. Куда упадет следующее яблоко, планировщик не
+знает, поэтому ветка, съевшая яблоко, дальше не раскрывается.
+
+Узел дерева не копирует тело. Тело на корне описывается номерами
+«укладки»: голова положена на ходу size, хвост — на ходу 1, ячейка
+занята, пока ее номер укладки больше, чем ход минус число сегментов.
+Узел хранит только новую голову и ссылку на родителя, поэтому узел
+создается за O(1), а последнюю укладку ячейки дает проход по пути от
+узла к корню — O(глубины).
+
+Состояние хешируется по Зобристу: исключающее ИЛИ случайных ключей
+занятых ячеек, ячейки головы, длины и яблока. Ход меняет хеш за O(1)
+(новая голова и ушедший хвост). Хеш Зобриста не зависит от того, в
+каком порядке уложены сегменты, а от порядка зависит, когда хвост
+освободит ячейку. Поэтому узел хранит и хеш укладки: сумму ключей
+занятых ячеек, умноженных на ORDER_BASE в степени номера укладки, — он
+тоже меняется за O(1). Узлы с одинаковыми обоими хешами на одной
+глубине — перестановки одного пути, из них остается первый. Хеш
+укладки, сдвинутый к хвосту (order_key), — ключ таблицы транспозиций:
+в ней хранится дорогая часть оценки, число ячеек, доступных голове.
+Таблица — LRU заданного размера и переживает такты: состояния,
+встреченные при прошлых поисках, не оцениваются заново.
+
+Поиск углубляется по слою, пока не кончится время: по умолчанию доля
+PLAN_SHARE интервала такта 1 / SPEED, — и возвращает первый ход лучшего
+узла последнего полного слоя. Время проверяется перед оценкой каждого
+узла; если оно вышло уже на первом слое, выбирается ход без укуса,
+ближайший к яблоку.
+
+    python snake_planner.py --width 16 --height 12 --ticks 5000
+    python snake_planner.py --play
+"""
+
+
+import argparse
+import functools
+import random
+import time
+from array import array
+from collections import OrderedDict, deque
+
+from the_snake import (
+    COLLISION, DIRECTIONS, EAT, SPEED, WIN, Apple, Snake, World, is_reversal,
+    main as play, step
+)
+
+# Доля интервала такта, отведенная на поиск хода:
+PLAN_SHARE = 0.5
+
+# Сколько лучших узлов оставлять на каждой глубине:
+BEAM_WIDTH = 32
+
+# Наибольшая глубина поиска:
+MAX_DEPTH = 64
+
+# Число состояний в таблице транспозиций:
+TABLE_SIZE = 1 << 16
+
+# Начальное значение генератора ключей Зобриста:
+ZOBRIST_SEED = 0x5A0B
+
+# Нечетное основание хеша укладки и модуль его арифметики:
+ORDER_BASE = 0x9E3779B97F4A7C15
+ORDER_MASK = (1 << 64) - 1
+
+# Оценка узла, съевшего яблоко, без глубины, на которой он его съел:
+EAT_SCORE = 1 << 20
+
+# Штраф узлу, голове которого не хватает места:
+TRAP_PENALTY = 1 << 24
+
+
+@functools.lru_cache(maxsize=8)
+def zobrist_keys(cells):
+    """
+    Возвращает ключи Зобриста для поля из cells ячеек.
+
+    ----------
+    Четыре array('Q'): ключи занятых ячеек, ячейки головы, ячейки
+    яблока и длины змейки от 0 до cells + 1.
+    """
+    rng = random.Random(ZOBRIST_SEED)
+    return tuple(
+        array('Q', (rng.getrandbits(64) for _ in range(size)))
+        for size in (cells, cells, cells, cells + 2)
+    )
+
+
+@functools.lru_cache(maxsize=8)
+def order_powers(count):
+    """
+    Возвращает степени ORDER_BASE от 0 до count - 1 и обратные к ним.
+
+    ----------
+    Два array('Q'); обратные — по модулю 2 ** 64, где ORDER_BASE
+    обратим, потому что нечетен.
+    """
+    inverse = pow(ORDER_BASE, -1, ORDER_MASK + 1)
+    powers, inverses = array('Q', [1]), array('Q', [1])
+    for _ in range(count - 1):
+        powers.append(powers[-1] * ORDER_BASE & ORDER_MASK)
+        inverses.append(inverses[-1] * inverse & ORDER_MASK)
+    return powers, inverses
+
+
+class TranspositionTable:
+    """
+    Таблица транспозиций с вытеснением давно не использованных состояний.
+
+    Атрибуты
+    ---------
+    size : int
+                наибольшее число состояний
+    hits, misses : int
+                число найденных и не найденных состояний
+    """
+
+    def __init__(self, size=TABLE_SIZE):
+        """Создает пустую таблицу на size состояний."""
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        """Возвращает число состояний в таблице."""
+        return len(self._entries)
+
+    def get(self, key):
+        """Возвращает значение состояния key или None."""
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        """Запоминает значение состояния key, вытесняя самые старые."""
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)  # Удаляем давно не нужные
+
+
+class Node:
+    """
+    Состояние игры в дереве поиска.
+
+    Атрибуты
+    ---------
+    parent : Node или None
+                состояние до хода; None у корня
+    head : int
+                номер ячейки головы
+    direction : tuple[int]
+                направление змейки
+    length, size : int
+                длина змейки и число сегментов тела
+    moves : int
+                номер укладки головы
+    hash : int
+                хеш Зобриста состояния
+    order : int
+                хеш укладки: сумма ключей занятых ячеек, умноженных на
+                ORDER_BASE в степени номера укладки
+    first : tuple[int] или None
+                первый ход пути от корня
+    eaten : int
+                глубина, на которой съедено яблоко; 0 — не съедено
+    """
+
+    __slots__ = (
+        'parent', 'head', 'direction', 'length', 'size', 'moves', 'hash',
+        'order', 'first', 'eaten',
+    )
+
+    def __init__(self, parent, head, direction, length, size, moves,
+                 hash_, order, first, eaten):
+        """Устанавливает все необходимые атрибуты объекта Node."""
+        self.parent = parent
+        self.head = head
+        self.direction = direction
+        self.length = length
+        self.size = size
+        self.moves = moves
+        self.hash = hash_
+        self.order = order
+        self.first = first
+        self.eaten = eaten
+
+
+class Planner:
+    """
+    Планировщик ходов змейки.
+
+    Атрибуты
+    ---------
+    snake : Snake
+                змейка, которой управляет планировщик
+    apple : Apple
+                яблоко
+    budget : float
+                время на выбор хода в секундах
+    table : TranspositionTable
+                таблица транспозиций, общая для всех поисков
+    depth : int
+                глубина последнего поиска
+    """
+
+    def __init__(self, snake, apple, budget=None, table=None):
+        """
+        Устанавливает все необходимые атрибуты объекта Planner.
+
+        Параметры
+        ----------
+        snake : Snake
+                змейка
+        apple : Apple
+                яблоко
+        budget : float, optional
+                время на ход; по умолчанию PLAN_SHARE / SPEED
+        table : TranspositionTable, optional
+                таблица транспозиций
+        """
+        self.snake = snake
+        self.apple = apple
+        self.budget = PLAN_SHARE / SPEED if budget is None else budget
+        self.table = TranspositionTable() if table is None else table
+        self.depth = 0
+        world = snake.world
+        self._width = world.width
+        self._height = world.height
+        self._cells = world.cells
+        self._keys = zobrist_keys(world.cells)
+        self._powers, self._inverses = order_powers(
+            world.cells + MAX_DEPTH + 2)
+        self._placed = array('I', bytes(4 * world.cells))
+        self._root_cells = array('I')
+        self._root_moves = 0
+        self._apple = 0
+
+    def steer(self):
+        """
+        Записывает поворот следующего такта в snake.next_direction.
+
+        ----------
+        Направление записывается и тогда, когда змейка идет прямо:
+        next_direction важнее очереди ввода, поэтому нажатая стрелка
+        не перебивает автопилот.
+        """
+        self.snake.next_direction = self.decide()
+
+    def decide(self, deadline=None):
+        """
+        Возвращает направление для следующего такта.
+
+        ----------
+        Поиск заканчивается к моменту deadline по time.perf_counter;
+        по умолчанию через budget секунд.
+        """
+        if deadline is None:
+            deadline = time.perf_counter() + self.budget
+        beam = [self._root()]
+        best = None
+        self.depth = 0
+        while self.depth < MAX_DEPTH:
+            children = self._expand(beam, deadline)
+            if children is None and best is None:
+                # Время вышло на первом слое: ход без укуса к яблоку
+                best = max(self._children(beam[0]), key=self._heading,
+                           default=None)
+            if not children:
+                break  # Все ветки кончились укусом или вышло время
+            children.sort(key=lambda scored: scored[0], reverse=True)
+            beam = [child for _, child in children[:BEAM_WIDTH]]
+            best = beam[0]
+            self.depth += 1
+            if best.eaten or time.perf_counter() > deadline:
+                break
+        if best is None:
+            return self.snake.direction
+        return best.first
+
+    def _expand(self, beam, deadline):
+        """
+        Раскрывает узлы слоя beam.
+
+        ----------
+        Возвращает список пар (оценка, узел); из узлов с одинаковыми
+        хешами остается первый. None, если время вышло до конца слоя:
+        оно проверяется перед оценкой каждого узла.
+        """
+        children = []
+        seen = set()
+        for node in beam:
+            for child in self._children(node):
+                key = child.hash, child.order
+                if key in seen:
+                    continue
+                if time.perf_counter() > deadline:
+                    return None
+                seen.add(key)
+                children.append((self._score(child), child))
+        return children
+
+    def _root(self):
+        """Строит корень дерева по змейке и яблоку."""
+        body = self.snake.body
+        placed = self._placed
+        for number in self._root_cells:
+            placed[number] = 0  # Стираем укладку прошлого поиска
+        cells = body.head_cells()
+        size = len(cells)
+        occupied, heads, apples, lengths = self._keys
+        powers = self._powers
+        hash_ = order = 0
+        for offset, number in enumerate(cells):
+            placed[number] = size - offset
+            hash_ ^= occupied[number]
+            order += occupied[number] * powers[size - offset]
+        x, y = self.apple.position
+        self._apple = y * self._width + x
+        self._root_cells = cells
+        self._root_moves = size
+        length = self.snake.length
+        hash_ ^= heads[cells[0]] ^ apples[self._apple] ^ lengths[
+            min(length, len(lengths) - 1)]
+        return Node(None, cells[0], self.snake.direction, length, size,
+                    size, hash_, order & ORDER_MASK, None, 0)
+
+    def _latest(self, number, node):
+        """Возвращает номер последней укладки ячейки к состоянию node."""
+        while node.parent is not None:
+            if node.head == number:
+                return node.moves
+            node = node.parent
+        return self._placed[number]
+
+    def _cell_at(self, moves, node):
+        """Возвращает ячейку, уложенную на ходу moves, к состоянию node."""
+        if moves <= self._root_moves:
+            return self._root_cells[self._root_moves - moves]
+        while node.moves != moves:
+            node = node.parent
+        return node.head
+
+    def _neighbour(self, number, direction):
+        """Возвращает номер соседней ячейки в направлении direction."""
+        width = self._width
+        y, x = divmod(number, width)
+        return ((y + direction[1]) % self._height * width
+                + (x + direction[0]) % width)
+
+    def _children(self, node):
+        """Перебирает состояния после каждого хода из node без укуса."""
+        if node.eaten:
+            return
+        occupied, heads, apples, lengths = self._keys
+        powers = self._powers
+        moves = node.moves + 1
+        for direction in DIRECTIONS:
+            if is_reversal(direction, node.direction):
+                continue  # Разворот step игнорирует
+            head = self._neighbour(node.head, direction)
+            size = node.size + 1
+            hash_ = node.hash ^ heads[node.head] ^ heads[head]
+            order = node.order + occupied[head] * powers[moves]
+            if size > node.length:
+                size -= 1
+                tail = self._cell_at(moves - size, node)
+                hash_ ^= occupied[tail]
+                order -= occupied[tail] * powers[moves - size]
+            if self._latest(head, node) > moves - size:
+                continue  # Укус
+            hash_ ^= occupied[head]
+            length, eaten = node.length, node.eaten
+            if head == self._apple:
+                eaten = moves - self._root_moves
+                hash_ ^= apples[head] ^ lengths[
+                    min(length, len(lengths) - 1)] ^ lengths[
+                    min(length + 1, len(lengths) - 1)]
+                length += 1
+            yield Node(node, head, direction, length, size, moves, hash_,
+                       order & ORDER_MASK, node.first or direction, eaten)
+
+    def order_key(self, node):
+        """
+        Возвращает ключ таблицы транспозиций для состояния node.
+
+        ----------
+        Хеш укладки, сдвинутый так, что хвост уложен на ходу 1: он
+        одинаков у одинаково уложенных тел на любой глубине и в любом
+        поиске и различает тела, уложенные в разном порядке.
+        """
+        return node.order * self._inverses[node.moves - node.size] & (
+            ORDER_MASK)
+
+    def _heading(self, node):
+        """Оценивает состояние по яблоку и расстоянию до него."""
+        if node.eaten:
+            return EAT_SCORE - node.eaten
+        width, height = self._width, self._height
+        head_y, head_x = divmod(node.head, width)
+        apple_y, apple_x = divmod(self._apple, width)
+        dx, dy = abs(head_x - apple_x), abs(head_y - apple_y)
+        return -min(dx, width - dx) - min(dy, height - dy)
+
+    def _score(self, node):
+        """Оценивает состояние: яблоко, расстояние до него и простор."""
+        score = self._heading(node)
+        need = min(node.size, self._cells - node.size)
+        key = self.order_key(node)
+        space = self.table.get(key)
+        if space is None:
+            space = self._space(node, need)
+            self.table.put(key, space)
+        if space < need:
+            score -= TRAP_PENALTY * (need - space) // max(need, 1)
+        return score
+
+    def _space(self, node, limit):
+        """
+        Считает ячейки, доступные голове, но не больше limit.
+
+        ----------
+        Обход в ширину: ячейка тела проходима, если хвост покинет ее
+        к тому времени, как до нее дойдет голова.
+        """
+        path = {}
+        walker = node
+        while walker.parent is not None:
+            path.setdefault(walker.head, walker.moves)
+            walker = walker.parent
+        placed = self._placed
+        tail = node.moves - node.size
+        seen = {node.head}
+        frontier = deque([(node.head, 0)])
+        count = 0
+        while frontier and count < limit:
+            cell, distance = frontier.popleft()
+            for direction in DIRECTIONS:
+                neighbour = self._neighbour(cell, direction)
+                if neighbour in seen:
+                    continue
+                seen.add(neighbour)
+                laid = path.get(neighbour) or placed[neighbour]
+                if laid > tail + distance + 1:
+                    continue  # Тело еще не ушло из ячейки
+                count += 1
+                frontier.append((neighbour, distance + 1))
+        return count
+
+
+def evaluate(world, seed=0, ticks=1000, budget=None):
+    """
+    Играет планировщиком без отрисовки.
+
+    ----------
+    Возвращает словарь: съеденные яблоки, укусы, заполнения поля,
+    среднее и наибольшее время выбора хода в миллисекундах.
+    """
+    rng = random.Random(seed)
+    snake = Snake(rng, world)
+    apple = Apple(snake.positions, rng, world)
+    planner = Planner(snake, apple, budget)
+    events = {EAT: 0, COLLISION: 0, WIN: 0}
+    total = worst = 0.0
+    for _ in range(ticks):
+        start = time.perf_counter()
+        planner.steer()
+        elapsed = time.perf_counter() - start
+        total += elapsed
+        worst = max(worst, elapsed)
+        event = step(snake, apple)
+        if event in events:
+            events[event] += 1
+    return {
+        'apples': events[EAT],
+        'collisions': events[COLLISION],
+        'wins': events[WIN],
+        'mean_ms': total / ticks * 1000,
+        'max_ms': worst * 1000,
+    }
+
+
+def main():
+    """Оценивает планировщик без отрисовки или показывает его игру."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--width', type=int, default=World().width)
+    parser.add_argument('--height', type=int, default=World().height)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--ticks', type=int, default=1000)
+    parser.add_argument('--play', action='store_true',
+                        help='показать игру планировщика в окне')
+    args = parser.parse_args()
+    world = World(args.width, args.height)
+    if args.play:
+        play(random.Random(args.seed), world=world, autopilot=Planner)
+        return
+    report = evaluate(world, args.seed, args.ticks)
+    print(f'Яблок: {report["apples"]}, укусов: {report["collisions"]}, '
+          f'заполнений поля: {report["wins"]}, ход: '
+          f'{report["mean_ms"]:.2f} мс в среднем, '
+          f'{report["max_ms"]:.2f} мс наибольший')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,274 @@
+"""
+Замер времени кадров Змейки.
+
+Profiler по запросу оборачивает горячие функции игры замером времени:
+обработку клавиш, выбор поворота такта, движение, проверку укуса, выбор
+позиции яблока, отрисовку и pygame.display.update. Пока профилировщик не
+установлен, игра вызывает исходные функции, поэтому выключенный замер
+ничего не стоит, кроме двух проверок на None за кадр в main.
+
+Для последних HISTORY_FRAMES кадров хранятся время работы кадра и время
+каждой части. По ним считаются медиана и 99-й перцентиль, а кадр, на
+который ушло больше одного игрового такта (1000 / SPEED мс), считается
+пропущенным. Сводка рисуется поверх игры и выгружается в JSON или CSV:
+
+    python snake_profiler.py --json profile.json --csv frames.csv
+"""
+
+
+import argparse
+import csv
+import functools
+import json
+import time
+from collections import deque
+
+import pygame
+
+import the_snake
+from the_snake import SPEED
+
+# Сколько последних кадров хранить:
+HISTORY_FRAMES = 1000
+
+# Как часто перерисовывать сводку на экране, в секундах:
+OVERLAY_INTERVAL = 0.5
+
+OVERLAY_COLOR = (255, 255, 255)
+OVERLAY_FONT_SIZE = 18
+
+
+def hot_paths():
+    """Возвращает замеряемые части кадра: имя, владелец, атрибут."""
+    return (
+        ('handle_keys', the_snake, 'handle_keys'),
+        ('next_turn', the_snake.Snake, 'next_turn'),
+        ('move', the_snake.Snake, 'move'),
+        ('self_collection', the_snake.Snake, 'self_collection'),
+        ('randomize_position', the_snake.Apple, 'randomize_position'),
+        ('draw', the_snake.Renderer, 'draw'),
+        ('draw', the_snake.ViewportRenderer, 'draw'),
+        ('display_update', pygame.display, 'update'),
+    )
+
+
+def percentile(values, fraction):
+    """Возвращает перцентиль fraction отсортированного списка values."""
+    if not values:
+        return 0.0
+    return values[int(fraction * (len(values) - 1))]
+
+
+class Profiler:
+    """
+    Замер времени кадров и их частей.
+
+    Атрибуты
+    ---------
+    frames : deque[float]
+                время работы последних кадров, мс
+    sections : dict[str, deque[float]]
+                время каждой части в последних кадрах, мс
+    dropped : int
+                число кадров дольше игрового такта
+    """
+
+    def __init__(self, speed=SPEED, history=HISTORY_FRAMES):
+        """
+        Устанавливает все необходимые атрибуты объекта Profiler.
+
+        Параметры
+        ----------
+        speed : int
+                игровых тактов в секунду; задает бюджет кадра
+        history : int
+                сколько последних кадров хранить
+        """
+        self.budget_ms = 1000 / speed if speed else float('inf')
+        self.frames = deque(maxlen=history)
+        self.sections = {
+            name: deque(maxlen=history) for name, _, _ in hot_paths()}
+        self.frame_count = 0
+        self.dropped = 0
+        self._current = {}
+        self._originals = []
+        self._frame_start = None
+        self._overlay_time = 0.0
+        self._overlay_rect = None
+        self._overlay_lines = []
+        self._overlay_repaints = None
+        self._font = None
+
+    def __enter__(self):
+        """Устанавливает замер времени."""
+        self.install()
+        return self
+
+    def __exit__(self, *exc_info):
+        """Снимает замер времени."""
+        self.uninstall()
+
+    def install(self):
+        """Оборачивает горячие функции игры замером времени."""
+        if self._originals:
+            return
+        for name, owner, attribute in hot_paths():
+            original = getattr(owner, attribute)
+            self._originals.append((owner, attribute, original))
+            setattr(owner, attribute, self._timed(name, original))
+
+    def uninstall(self):
+        """Возвращает исходные функции игры."""
+        while self._originals:
+            owner, attribute, original = self._originals.pop()
+            setattr(owner, attribute, original)
+
+    def _timed(self, name, function):
+        """Возвращает функцию, добавляющую свое время к части name."""
+        timings = self._current
+        perf_counter = time.perf_counter
+
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                timings[name] = timings.get(name, 0.0) + perf_counter() - start
+
+        return timed
+
+    def start_frame(self):
+        """Отмечает начало кадра."""
+        self._current.clear()
+        self._frame_start = time.perf_counter()
+
+    def end_frame(self, renderer=None, apple=None, snake=None):
+        """Сохраняет замеры кадра и обновляет сводку на экране."""
+        if self._frame_start is None:
+            return
+        frame_ms = (time.perf_counter() - self._frame_start) * 1000
+        self._frame_start = None
+        self.frames.append(frame_ms)
+        self.frame_count += 1
+        if frame_ms > self.budget_ms:
+            self.dropped += 1
+        for name, times in self.sections.items():
+            times.append(self._current.get(name, 0.0) * 1000)
+        if renderer is not None:
+            self.draw_overlay(renderer, apple, snake)
+
+    def summary(self):
+        """
+        Возвращает сводку по последним кадрам.
+
+        ----------
+        Словарь с числом кадров, числом пропущенных кадров, медианой и
+        99-м перцентилем времени кадра и каждой части в миллисекундах.
+        """
+        frames = sorted(self.frames)
+        sections = {}
+        for name, times in self.sections.items():
+            times = sorted(times)
+            sections[name] = {
+                'p50': percentile(times, 0.5),
+                'p99': percentile(times, 0.99),
+                'max': times[-1] if times else 0.0,
+            }
+        return {
+            'frames': self.frame_count,
+            'dropped': self.dropped,
+            'budget_ms': self.budget_ms,
+            'frame_p50': percentile(frames, 0.5),
+            'frame_p99': percentile(frames, 0.99),
+            'sections': sections,
+        }
+
+    def overlay_lines(self):
+        """Возвращает строки сводки для отображения поверх игры."""
+        summary = self.summary()
+        lines = [
+            f'кадр p50 {summary["frame_p50"]:.2f} мс, '
+            f'p99 {summary["frame_p99"]:.2f} мс',
+            f'пропущено {summary["dropped"]} из {summary["frames"]}',
+        ]
+        slowest = sorted(
+            summary['sections'].items(), key=lambda item: -item[1]['p99'])
+        for name, stats in slowest[:3]:
+            lines.append(f'{name} p99 {stats["p99"]:.2f} мс')
+        return lines
+
+    def draw_overlay(self, renderer, apple, snake):
+        """
+        Перерисовывает сводку поверх игры раз в OVERLAY_INTERVAL секунд.
+
+        ----------
+        Перед выводом текста место прошлой сводки перерисовывается
+        ячейками игры, и на дисплее обновляется только эта область.
+        Если отрисовщик между обновлениями перерисовал окно целиком
+        (renderer.repaints изменился), прошлая сводка выводится снова.
+        """
+        now = time.perf_counter()
+        if now - self._overlay_time < OVERLAY_INTERVAL:
+            if self._overlay_lines and (
+                    self._overlay_repaints != renderer.repaints):
+                self._blit_overlay(renderer)
+                pygame.display.update(self._overlay_rect)
+            return
+        self._overlay_time = now
+        if self._font is None:
+            pygame.font.init()
+            self._font = pygame.font.Font(None, OVERLAY_FONT_SIZE)
+        lines = self._overlay_lines = [
+            self._font.render(line, True, OVERLAY_COLOR)
+            for line in self.overlay_lines()
+        ]
+        rect = pygame.Rect(0, 0, max(line.get_width() for line in lines),
+                           self._font.get_linesize() * len(lines))
+        dirty = rect if self._overlay_rect is None else rect.union(
+            self._overlay_rect)
+        renderer.restore(dirty, apple, snake)
+        self._overlay_rect = rect
+        self._blit_overlay(renderer)
+        pygame.display.update(dirty)
+
+    def _blit_overlay(self, renderer):
+        """Выводит последнюю сводку на поверхность отрисовщика."""
+        line_height = self._font.get_linesize()
+        for index, line in enumerate(self._overlay_lines):
+            renderer.surface.blit(line, (0, index * line_height))
+        self._overlay_repaints = renderer.repaints
+
+    def export_json(self, path):
+        """Сохраняет сводку в JSON."""
+        with open(path, 'w', encoding='utf-8') as output:
+            json.dump(self.summary(), output, ensure_ascii=False, indent=2)
+
+    def export_csv(self, path):
+        """Сохраняет время последних кадров и их частей в CSV."""
+        names = list(self.sections)
+        with open(path, 'w', encoding='utf-8', newline='') as output:
+            writer = csv.writer(output)
+            writer.writerow(['frame_ms'] + names)
+            writer.writerows(zip(self.frames, *self.sections.values()))
+
+
+def main():
+    """Запускает игру с замером времени кадров."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--json', help='файл для сводки в JSON')
+    parser.add_argument('--csv', help='файл для времени кадров в CSV')
+    args = parser.parse_args()
+    profiler = Profiler()
+    try:
+        with profiler:
+            the_snake.main(profiler=profiler)
+    finally:
+        if args.json:
+            profiler.export_json(args.json)
+        if args.csv:
+            profiler.export_csv(args.csv)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+"""
+Запись и воспроизведение партий Змейки.
+
+Партия полностью определяется начальным значением генератора случайных
+чисел и направлениями, выбранными игроком на каждом такте, поэтому запись
+компактна: заголовок с seed и размерами поля, затем один байт на такт.
+
+Формат файла (little-endian):
+
+    заголовок   4s B Q H H   магия b'SNKR', версия, seed, ширина и
+                             высота мира в ячейках
+    такты       B * n        номер направления в DIRECTIONS или NO_INPUT
+    конец       B            END_OF_TICKS
+    итог        Q I H H H H  число тактов, длина змейки, ячейки головы
+                             и яблока
+
+Итог пишется при закрытии записи и используется для проверки: партия
+воспроизводится без отрисовки с максимальной скоростью, и ее итоговое
+состояние сравнивается с записанным.
+"""
+
+
+import argparse
+import random
+import struct
+
+from the_snake import (
+    DIRECTIONS, GRID_HEIGHT, GRID_WIDTH, Apple, Snake, World, main as play,
+    step
+)
+
+MAGIC = b'SNKR'
+VERSION = 1
+HEADER = struct.Struct('<4sBQHH')
+TRAILER = struct.Struct('<QIHHHH')
+
+# Байты тактов:
+NO_INPUT = len(DIRECTIONS)
+END_OF_TICKS = 0xFF
+
+_TICK_BYTES = [bytes((code,)) for code in range(NO_INPUT + 1)]
+
+# Размер порции при чтении тактов из файла:
+READ_CHUNK = 1 << 16
+
+
+class ReplayMismatch(Exception):
+    """Итог воспроизведения не совпал с записанным."""
+
+
+def new_game(seed, world=None):
+    """Создает змейку и яблоко в мире world с генератором, заданным seed."""
+    rng = random.Random(seed)
+    snake = Snake(rng, world)
+    return snake, Apple(snake.positions, rng, world)
+
+
+def final_state(ticks, snake, apple):
+    """Возвращает итог партии в формате TRAILER."""
+    return (ticks, snake.length, *snake.get_head_position(), *apple.position)
+
+
+class ReplayWriter:
+    """
+    Потоковая запись партии в файл.
+
+    Атрибуты
+    ---------
+    seed : int
+                начальное значение генератора партии
+    ticks : int
+                число записанных тактов
+    """
+
+    def __init__(self, path, seed, world=None):
+        """Открывает файл path и пишет заголовок записи партии в world."""
+        if world is None:
+            world = World()
+        self.seed = seed
+        self.ticks = 0
+        self._file = open(path, 'wb')
+        self._file.write(
+            HEADER.pack(MAGIC, VERSION, seed, world.width, world.height))
+
+    def __enter__(self):
+        """Возвращает саму запись."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Закрывает файл, если запись не была закрыта."""
+        if not self._file.closed:
+            self._file.close()
+
+    def record(self, direction):
+        """Записывает направление такта; None — игрок ничего не нажал."""
+        code = NO_INPUT if direction is None else DIRECTIONS.index(direction)
+        self._file.write(_TICK_BYTES[code])
+        self.ticks += 1
+
+    def close(self, snake, apple):
+        """Пишет итог партии и закрывает файл."""
+        self._file.write(bytes((END_OF_TICKS,)))
+        self._file.write(TRAILER.pack(*final_state(self.ticks, snake, apple)))
+        self._file.close()
+
+
+def read_header(replay_file):
+    """Читает и проверяет заголовок, возвращает seed и мир партии."""
+    magic, version, seed, width, height = HEADER.unpack(
+        replay_file.read(HEADER.size))
+    if magic != MAGIC or version != VERSION:
+        raise ValueError('Файл не является записью партии Змейки.')
+    return seed, World(width, height)
+
+
+def read_ticks(replay_file):
+    """Перебирает порции байтов тактов до END_OF_TICKS."""
+    while True:
+        chunk = replay_file.read(READ_CHUNK)
+        if not chunk:
+            raise ValueError('Запись партии оборвана: нет итога.')
+        end = chunk.find(END_OF_TICKS)
+        if end < 0:
+            yield chunk
+            continue
+        yield chunk[:end]
+        replay_file.seek(end + 1 - len(chunk), 1)
+        return
+
+
+def replay(path):
+    """
+    Воспроизводит партию без отрисовки и проверяет итог.
+
+    ----------
+    Возвращает змейку и яблоко в конце партии.
+    Вызывает ReplayMismatch, если итог отличается от записанного.
+    """
+    directions = DIRECTIONS + (None,)
+    with open(path, 'rb') as replay_file:
+        snake, apple = new_game(*read_header(replay_file))
+        ticks = 0
+        for chunk in read_ticks(replay_file):
+            for code in chunk:
+                step(snake, apple, directions[code])
+            ticks += len(chunk)
+        expected = TRAILER.unpack(replay_file.read(TRAILER.size))
+    actual = final_state(ticks, snake, apple)
+    if actual != expected:
+        raise ReplayMismatch(
+            f'Итог воспроизведения {actual} не совпал с записанным '
+            f'{expected}.')
+    return snake, apple
+
+
+def seed_argument(text):
+    """Разбирает seed командной строки: он должен уместиться в Q."""
+    seed = int(text)
+    if not 0 <= seed < 1 << 64:
+        raise argparse.ArgumentTypeError(
+            f'seed должен быть от 0 до 2 ** 64 - 1, а не {seed}')
+    return seed
+
+
+def main():
+    """Записывает партию или воспроизводит запись."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    record_parser = subparsers.add_parser('record', help='сыграть и записать')
+    record_parser.add_argument('path')
+    record_parser.add_argument('--seed', type=seed_argument, default=None)
+    record_parser.add_argument('--width', type=int, default=GRID_WIDTH,
+                               help='ширина мира в ячейках')
+    record_parser.add_argument('--height', type=int, default=GRID_HEIGHT,
+                               help='высота мира в ячейках')
+    replay_parser = subparsers.add_parser('replay', help='воспроизвести')
+    replay_parser.add_argument('path')
+    args = parser.parse_args()
+    if args.command == 'record':
+        seed = random.getrandbits(64) if args.seed is None else args.seed
+        world = World(args.width, args.height)
+        play(random.Random(seed), ReplayWriter(args.path, seed, world),
+             world=world)
+    else:
+        snake, _ = replay(args.path)
+        print(f'Запись воспроизведена, длина змейки: {snake.length}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+"""
+Многопроцессный запуск симуляций Змейки.
+
+Игры делятся на шарды, по одному на процесс. Состояние игр каждого шарда
+(BatchSnake) и общая таблица статистики лежат в блоках
+multiprocessing.shared_memory: процессы пишут в них напрямую, а главный
+процесс читает результаты без сериализации.
+
+Каждая игра получает генератор по своему номеру (snake_batch.seed_states),
+а случайная стратегия берет числа из того же генератора, поэтому итог
+не зависит от числа процессов. Статистика собирается в порядке номеров
+игр. При Ctrl+C или stop() процессы завершают текущую порцию тактов, и
+результат содержит уже выполненные такты.
+"""
+
+
+import argparse
+import multiprocessing
+import os
+import signal
+import time
+from collections import namedtuple
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from snake_batch import (
+    EAT_CODE, COLLISION_CODE, NO_ACTION, WIN_CODE, BatchSnake
+)
+from the_snake import DIRECTIONS, GRID_HEIGHT, GRID_WIDTH
+
+# Столбцы таблицы статистики, по строке на игру:
+STATS = ('ticks', 'apples', 'collisions', 'wins', 'max_length', 'length')
+TICKS, APPLES, COLLISIONS, WINS, MAX_LENGTH, LENGTH = range(len(STATS))
+
+# Сколько тактов выполнять между проверками сигнала остановки:
+CHUNK_TICKS = 64
+
+RolloutResult = namedtuple(
+    'RolloutResult', ('stats', 'seconds', 'completed'))
+
+
+def shard_bounds(n_games, shards):
+    """Возвращает границы [start, stop) шардов, по возможности равных."""
+    edges = np.linspace(0, n_games, shards + 1).astype(int)
+    return [
+        (int(start), int(stop))
+        for start, stop in zip(edges[:-1], edges[1:])
+        if stop > start
+    ]
+
+
+def _stats_view(shared, n_games):
+    """Возвращает таблицу статистики поверх блока общей памяти."""
+    return np.ndarray((n_games, len(STATS)), np.int64, shared.buf)
+
+
+def _play(batch, stats, ticks, stop_event):
+    """Играет ticks тактов случайной стратегией, обновляя статистику."""
+    done = 0
+    while done < ticks and not stop_event.is_set():
+        chunk = min(CHUNK_TICKS, ticks - done)
+        for _ in range(chunk):
+            actions = batch.random(batch.games, len(DIRECTIONS) + 1)
+            events = batch.step(actions.astype(np.int64) + NO_ACTION)
+            stats[:, APPLES] += (events == EAT_CODE) | (events == WIN_CODE)
+            stats[:, COLLISIONS] += events == COLLISION_CODE
+            stats[:, WINS] += events == WIN_CODE
+            np.maximum(stats[:, MAX_LENGTH], batch.length,
+                       out=stats[:, MAX_LENGTH])
+        done += chunk
+        stats[:, TICKS] = done
+
+
+def _run_shard(state_name, stats_name, n_games, bounds, ticks, width,
+               height, seed, stop_event):
+    """Выполняет симуляцию одного шарда в дочернем процессе."""
+    # Прерывание обрабатывает главный процесс через stop_event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    start, stop = bounds
+    state = SharedMemory(name=state_name)
+    shared_stats = SharedMemory(name=stats_name)
+    try:
+        batch = BatchSnake(
+            stop - start, width, height, seed, state.buf, game_offset=start)
+        stats = _stats_view(shared_stats, n_games)[start:stop]
+        _play(batch, stats, ticks, stop_event)
+        # Представления должны освободить память до закрытия блоков
+        del batch, stats
+    finally:
+        state.close()
+        shared_stats.close()
+
+
+class RolloutRunner:
+    """
+    Запуск игр на пуле процессов с общей памятью.
+
+    Атрибуты
+    ---------
+    n_games : int
+                число игр
+    workers : int
+                число процессов (шардов)
+    width, height : int
+                размеры поля в ячейках
+    seed : int
+                начальное значение генераторов
+    """
+
+    def __init__(self, n_games, workers=None, width=GRID_WIDTH,
+                 height=GRID_HEIGHT, seed=0):
+        """Устанавливает все необходимые атрибуты объекта RolloutRunner."""
+        self.n_games = n_games
+        self.workers = workers or os.cpu_count() or 1
+        self.width = width
+        self.height = height
+        self.seed = seed
+        self.context = multiprocessing.get_context()
+        self.stop_event = self.context.Event()
+
+    def stop(self):
+        """Просит процессы завершиться после текущей порции тактов."""
+        self.stop_event.set()
+
+    def run(self, ticks):
+        """
+        Играет ticks тактов во всех играх и возвращает RolloutResult.
+
+        ----------
+        stats — копия таблицы статистики (столбцы STATS) в порядке номеров
+        игр, seconds — время симуляции, completed — выполнены ли все такты.
+        Просьба stop действует только на текущий запуск.
+        """
+        self.stop_event.clear()
+        shards = shard_bounds(self.n_games, self.workers)
+        shared_stats = SharedMemory(
+            create=True, size=self.n_games * len(STATS) * 8)
+        states = [
+            SharedMemory(create=True, size=BatchSnake.state_nbytes(
+                stop - start, self.width, self.height))
+            for start, stop in shards
+        ]
+        try:
+            stats = _stats_view(shared_stats, self.n_games)
+            stats[:] = 0
+            seconds = self._run_processes(shards, states, shared_stats, ticks)
+            self._collect_lengths(shards, states, stats)
+            result = RolloutResult(
+                stats.copy(), seconds, bool((stats[:, TICKS] == ticks).all()))
+            del stats
+            return result
+        finally:
+            for shared in (shared_stats, *states):
+                shared.close()
+                shared.unlink()
+
+    def _run_processes(self, shards, states, shared_stats, ticks):
+        """Запускает процессы шардов и ждет их завершения."""
+        processes = [
+            self.context.Process(target=_run_shard, args=(
+                state.name, shared_stats.name, self.n_games, bounds, ticks,
+                self.width, self.height, self.seed, self.stop_event))
+            for bounds, state in zip(shards, states)
+        ]
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            self.stop()
+            for process in processes:
+                process.join()
+        seconds = time.perf_counter() - start
+        failed = [process.exitcode for process in processes
+                  if process.exitcode]
+        if failed:
+            raise RuntimeError(
+                f'Процессы симуляции завершились с кодами {failed}.')
+        return seconds
+
+    def _collect_lengths(self, shards, states, stats):
+        """Читает итоговые длины змеек из состояния шардов."""
+        for (start, stop), state in zip(shards, states):
+            batch = BatchSnake.attach(
+                state.buf, stop - start, self.width, self.height)
+            stats[start:stop, LENGTH] = batch.length
+            del batch
+
+
+def main():
+    """Запускает симуляции на всех ядрах и печатает скорость."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--games', type=int, default=4096)
+    parser.add_argument('--ticks', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    runner = RolloutRunner(args.games, args.workers, seed=args.seed)
+    result = runner.run(args.ticks)
+    total_ticks = int(result.stats[:, TICKS].sum())
+    print(f'Процессов: {runner.workers}, тактов: {total_ticks:,}, '
+          f'{total_ticks / result.seconds:,.0f} тактов в секунду')
+    print(f'Яблок: {int(result.stats[:, APPLES].sum()):,}, '
+          f'укусов: {int(result.stats[:, COLLISIONS].sum()):,}, '
+          f'побед: {int(result.stats[:, WINS].sum()):,}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,495 @@
+"""
+Сетевая игра Змейка: сервер на asyncio и клиентское зеркало состояния.
+
+Сервер хранит единственное верное состояние — арену snake_arena, где
+каждому подключенному клиенту принадлежит одна змейка. Клиент шлет
+повороты по одному байту (номер направления в DIRECTIONS), сервер
+добавляет их в очередь ввода его змейки. Раз в такт сервер рассылает
+всем одно и то же сообщение с изменениями за такт, а не позиции
+целиком: каждый клиент повторяет правила движения у себя.
+
+Сообщения передаются кадрами: длина <I, затем тело (little-endian).
+
+    SNAPSHOT  при подключении — все состояние арены
+        B I H H H H I   тип, такт, слот клиента, ширина и высота мира,
+                        число слотов, число яблок
+        для каждого слота: I I (число сегментов, length), затем ячейки
+                        сегментов I от головы; 0 сегментов — слот пуст
+        I * яблоки      ячейки яблок
+
+    TICK      каждый такт, поля применяются по порядку
+        B I H H H H H H H   тип, такт, число слотов, и число ушедших,
+                            пришедших, выросших, разбившихся змеек,
+                            убранных и новых яблок
+        H * ушедшие         слоты, которые освободились
+        H * пришедшие, I *  слоты и ячейки новых змеек длины 1
+        B * слоты           направление шага змейки слота или NO_SNAKE
+        H * выросшие        слоты, у которых length выросла на 1
+        H * разбившиеся, I * слоты и ячейки, где змейки начали заново
+        I * убранные яблоки, I * новые яблоки
+
+Ячейки передаются номерами y * width + x. Шаг змейки на клиенте
+повторяет Snake.move: новая голова со сквозными границами, и хвост
+уходит, если сегментов больше length. Поэтому на такт приходится один
+байт на змейку и по несколько байт на редкие события.
+
+    python snake_server.py serve --port 8765
+    python snake_server.py bench --clients 2000 --seconds 10
+"""
+
+
+import argparse
+import asyncio
+import random
+import struct
+import sys
+import time
+from array import array
+from collections import deque
+
+from snake_arena import Arena
+from the_snake import DIRECTIONS, GRID_HEIGHT, GRID_WIDTH, SPEED, World
+
+DIRECTION_CODES = {
+    direction: code for code, direction in enumerate(DIRECTIONS)
+}
+NO_SNAKE = 0xFF
+
+SNAPSHOT, TICK = range(2)
+FRAME = struct.Struct('<I')
+SNAPSHOT_HEADER = struct.Struct('<BIHHHHI')
+SLOT_HEADER = struct.Struct('<II')
+TICK_HEADER = struct.Struct('<BIHHHHHHH')
+
+# Сколько байтов может копиться в буфере отправки медленного клиента:
+MAX_CLIENT_BUFFER = 1 << 20
+
+# Число яблок на арене по умолчанию:
+ARENA_APPLES = 64
+
+DEFAULT_PORT = 8765
+
+# Размер порции чтения у простого клиента:
+READ_CHUNK = 1 << 16
+
+
+def _pack(typecode, values):
+    """Упаковывает числа в little-endian байты массива typecode."""
+    packed = array(typecode, values)
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def _unpack(typecode, data, offset, count):
+    """Возвращает count чисел typecode из data и смещение за ними."""
+    unpacked = array(typecode)
+    end = offset + count * unpacked.itemsize
+    unpacked.frombytes(data[offset:end])
+    if sys.byteorder == 'big':
+        unpacked.byteswap()
+    return unpacked, end
+
+
+def _cell(position, width):
+    """Возвращает номер ячейки (x, y)."""
+    return position[1] * width + position[0]
+
+
+class ClientConnection(asyncio.Protocol):
+    """Соединение сервера с одним клиентом."""
+
+    def __init__(self, server):
+        """Запоминает сервер; змейка появляется при подключении."""
+        self.server = server
+        self.transport = None
+        self.slot = None
+
+    def connection_made(self, transport):
+        """Отдает клиенту змейку и снимок арены."""
+        self.transport = transport
+        self.slot = self.server.join(self)
+
+    def data_received(self, data):
+        """Добавляет повороты клиента в очередь ввода его змейки."""
+        snake = self.server.slots[self.slot]
+        for code in data:
+            if code < len(DIRECTIONS):
+                snake.input_queue.push(DIRECTIONS[code], snake.direction)
+
+    def connection_lost(self, exc):
+        """Убирает змейку клиента с арены."""
+        self.server.leave(self.slot)
+
+    def send(self, frame):
+        """
+        Отправляет кадр клиенту.
+
+        ----------
+        Клиент, который не успевает читать и копит больше
+        MAX_CLIENT_BUFFER байтов, отключается.
+        """
+        if self.transport.get_write_buffer_size() > MAX_CLIENT_BUFFER:
+            self.transport.abort()
+            return
+        self.transport.write(frame)
+
+
+class GameServer:
+    """
+    Сервер арены с рассылкой изменений за такт.
+
+    Атрибуты
+    ---------
+    arena : Arena
+                состояние игры
+    slots : list[ArenaSnake или None]
+                змейки клиентов по номерам слотов; None — слот свободен
+    ticks : int
+                число выполненных тактов
+    bytes_sent : int
+                сколько байтов тактов разослано всем клиентам
+    tick_seconds : float
+                сколько времени заняли такты, включая рассылку
+    """
+
+    def __init__(self, world=None, apples=ARENA_APPLES, rng=None):
+        """
+        Устанавливает все необходимые атрибуты объекта GameServer.
+
+        Параметры
+        ----------
+        world : World, optional
+                игровой мир, по умолчанию поле размером с окно
+        apples : int
+                число яблок на арене
+        rng : random.Random, optional
+                генератор случайных чисел арены
+        """
+        self.arena = Arena(0, apples, world, rng, policy=None)
+        self.slots = []
+        self.connections = {}  # Слот -> ClientConnection
+        self.ticks = 0
+        self.bytes_sent = 0
+        self.tick_seconds = 0.0
+        self._slot_of = {}  # Змейка -> слот
+        self._free_slots = []
+        self._joins = {}  # Слот -> ячейка змейки, пришедшей за такт
+        self._leaves = []
+        self._stopped = False
+
+    def join(self, connection):
+        """Создает змейку клиента, отправляет ему снимок, возвращает слот."""
+        snake = self.arena.add_snake()
+        if self._free_slots:
+            slot = self._free_slots.pop()
+            self.slots[slot] = snake
+        else:
+            slot = len(self.slots)
+            self.slots.append(snake)
+        self._slot_of[snake] = slot
+        self.connections[slot] = connection
+        self._joins[slot] = snake.body.head_cell
+        connection.send(self.snapshot(slot))
+        return slot
+
+    def leave(self, slot):
+        """Освобождает слот клиента и убирает его змейку."""
+        snake = self.slots[slot]
+        if snake is None:
+            return
+        self.arena.remove_snake(snake)
+        del self._slot_of[snake]
+        del self.connections[slot]
+        self.slots[slot] = None
+        self._free_slots.append(slot)
+        self._joins.pop(slot, None)
+        self._leaves.append(slot)
+
+    def snapshot(self, slot):
+        """Возвращает кадр SNAPSHOT для клиента слота slot."""
+        world = self.arena.world
+        parts = [SNAPSHOT_HEADER.pack(
+            SNAPSHOT, self.ticks, slot, world.width, world.height,
+            len(self.slots), len(self.arena.apples))]
+        for snake in self.slots:
+            if snake is None:
+                parts.append(SLOT_HEADER.pack(0, 0))
+                continue
+            parts.append(SLOT_HEADER.pack(len(snake.body), snake.length))
+            parts.append(_pack(
+                'I', [_cell(position, world.width)
+                      for position in snake.body]))
+        parts.append(_pack('I', self.arena.apples))
+        body = b''.join(parts)
+        return FRAME.pack(len(body)) + body
+
+    def tick(self):
+        """Выполняет такт арены и рассылает изменения всем клиентам."""
+        start = time.perf_counter()
+        arena = self.arena
+        apples_before = set(arena.apples)
+        lengths = [snake.length if snake else 0 for snake in self.slots]
+        crashed = {self._slot_of[snake] for snake in arena.step()}
+        self.ticks += 1
+        moves = bytearray((NO_SNAKE,)) * len(self.slots)
+        grown = []
+        for slot, snake in enumerate(self.slots):
+            if snake is None:
+                continue
+            moves[slot] = DIRECTION_CODES[snake.direction]
+            if slot not in crashed and snake.length > lengths[slot]:
+                grown.append(slot)
+        crashed = sorted(crashed)
+        apples_after = set(arena.apples)
+        removed = apples_before - apples_after
+        added = apples_after - apples_before
+        body = b''.join((
+            TICK_HEADER.pack(
+                TICK, self.ticks, len(self.slots), len(self._leaves),
+                len(self._joins), len(grown), len(crashed), len(removed),
+                len(added)),
+            _pack('H', self._leaves),
+            _pack('H', self._joins), _pack('I', self._joins.values()),
+            bytes(moves),
+            _pack('H', grown),
+            _pack('H', crashed),
+            _pack('I', (self.slots[slot].body.head_cell for slot in crashed)),
+            _pack('I', removed), _pack('I', added),
+        ))
+        self._leaves.clear()
+        self._joins.clear()
+        frame = FRAME.pack(len(body)) + body
+        for connection in list(self.connections.values()):
+            connection.send(frame)
+        self.bytes_sent += len(frame) * len(self.connections)
+        self.tick_seconds += time.perf_counter() - start
+        return frame
+
+    async def run(self, speed=SPEED):
+        """Выполняет такты со скоростью speed, пока не вызван stop."""
+        loop = asyncio.get_running_loop()
+        interval = 1 / speed
+        deadline = loop.time()
+        self._stopped = False
+        while not self._stopped:
+            self.tick()
+            deadline += interval
+            await asyncio.sleep(max(0.0, deadline - loop.time()))
+
+    def stop(self):
+        """Останавливает run после текущего такта."""
+        self._stopped = True
+
+    async def serve(self, host='127.0.0.1', port=DEFAULT_PORT):
+        """Начинает принимать клиентов и возвращает asyncio.Server."""
+        loop = asyncio.get_running_loop()
+        return await loop.create_server(
+            lambda: ClientConnection(self), host, port)
+
+
+class ClientState:
+    """
+    Зеркало состояния арены на стороне клиента.
+
+    Атрибуты
+    ---------
+    slot : int
+                слот змейки клиента
+    ticks : int
+                номер последнего примененного такта
+    bodies : dict[int, deque[int]]
+                ячейки змеек по слотам, от головы к хвосту
+    lengths : dict[int, int]
+                length змеек по слотам
+    apples : set[int]
+                ячейки яблок
+    """
+
+    def __init__(self):
+        """Создает пустое состояние до получения снимка."""
+        self.slot = None
+        self.ticks = 0
+        self.width = self.height = 0
+        self.bodies = {}
+        self.lengths = {}
+        self.apples = set()
+
+    def apply(self, frame):
+        """Применяет тело кадра SNAPSHOT или TICK."""
+        if frame[0] == SNAPSHOT:
+            self._apply_snapshot(frame)
+        else:
+            self._apply_tick(frame)
+
+    def _apply_snapshot(self, frame):
+        """Заменяет состояние снимком арены."""
+        (_, self.ticks, self.slot, self.width, self.height, n_slots,
+         n_apples) = SNAPSHOT_HEADER.unpack_from(frame)
+        offset = SNAPSHOT_HEADER.size
+        self.bodies.clear()
+        self.lengths.clear()
+        for slot in range(n_slots):
+            size, length = SLOT_HEADER.unpack_from(frame, offset)
+            cells, offset = _unpack(
+                'I', frame, offset + SLOT_HEADER.size, size)
+            if size:
+                self.bodies[slot] = deque(cells)
+                self.lengths[slot] = length
+        apples, _ = _unpack('I', frame, offset, n_apples)
+        self.apples = set(apples)
+
+    def _apply_tick(self, frame):
+        """Применяет изменения за такт."""
+        (_, self.ticks, n_slots, n_leaves, n_joins, n_grown, n_crashed,
+         n_removed, n_added) = TICK_HEADER.unpack_from(frame)
+        offset = TICK_HEADER.size
+        leaves, offset = _unpack('H', frame, offset, n_leaves)
+        for slot in leaves:
+            self.bodies.pop(slot, None)
+            self.lengths.pop(slot, None)
+        joins, offset = _unpack('H', frame, offset, n_joins)
+        cells, offset = _unpack('I', frame, offset, n_joins)
+        self._restart(joins, cells)
+        moves = frame[offset:offset + n_slots]
+        self._move(moves)
+        grown, offset = _unpack('H', frame, offset + n_slots, n_grown)
+        for slot in grown:
+            self.lengths[slot] += 1
+        crashed, offset = _unpack('H', frame, offset, n_crashed)
+        cells, offset = _unpack('I', frame, offset, n_crashed)
+        self._restart(crashed, cells)
+        removed, offset = _unpack('I', frame, offset, n_removed)
+        added, _ = _unpack('I', frame, offset, n_added)
+        self.apples.difference_update(removed)
+        self.apples.update(added)
+
+    def _restart(self, slots, cells):
+        """Ставит змейки слотов slots длины 1 в ячейки cells."""
+        for slot, cell in zip(slots, cells):
+            self.bodies[slot] = deque((cell,))
+            self.lengths[slot] = 1
+
+    def _move(self, moves):
+        """Делает шаг каждой змейкой, как Snake.move."""
+        width, height = self.width, self.height
+        for slot, code in enumerate(moves):
+            if code == NO_SNAKE:
+                continue
+            body = self.bodies[slot]
+            dx, dy = DIRECTIONS[code]
+            head_y, head_x = divmod(body[0], width)
+            body.appendleft(
+                (head_y + dy) % height * width + (head_x + dx) % width)
+            if len(body) > self.lengths[slot]:
+                body.pop()
+
+
+async def read_frames(reader):
+    """Перебирает тела кадров из потока reader до его закрытия."""
+    while True:
+        try:
+            header = await reader.readexactly(FRAME.size)
+            (size,) = FRAME.unpack(header)
+            yield await reader.readexactly(size)
+        except asyncio.IncompleteReadError:
+            return
+
+
+async def simulate_client(host, port, rng, turn_probability=0.05,
+                          state=None):
+    """
+    Простой клиент: иногда поворачивает, пока сервер его не отключит.
+
+    ----------
+    Если передан ClientState, клиент повторяет в нем состояние арены и
+    возвращает его. Иначе кадры только читаются: так нагрузочный тест
+    измеряет сервер, а не клиентов, запущенных в том же процессе.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        if state is None:
+            while await reader.read(READ_CHUNK):
+                if rng.random() < turn_probability:
+                    writer.write(bytes((rng.randrange(len(DIRECTIONS)),)))
+            return None
+        async for frame in read_frames(reader):
+            state.apply(frame)
+            if rng.random() < turn_probability:
+                writer.write(bytes((rng.randrange(len(DIRECTIONS)),)))
+    finally:
+        writer.close()
+    return state
+
+
+async def bench(clients, seconds, world, speed, seed=0):
+    """
+    Запускает сервер и clients клиентов в одном процессе.
+
+    ----------
+    Возвращает число выполненных тактов в секунду, среднее время такта
+    сервера в миллисекундах и средний размер кадра такта в байтах.
+    """
+    server = GameServer(world, rng=random.Random(seed))
+    listener = await server.serve('127.0.0.1', 0)
+    port = listener.sockets[0].getsockname()[1]
+    rng = random.Random(seed)
+    tasks = []
+    for _ in range(clients):
+        tasks.append(asyncio.create_task(
+            simulate_client('127.0.0.1', port, rng)))
+        await asyncio.sleep(0)
+    while len(server.connections) < clients:
+        await asyncio.sleep(0.01)
+    runner = asyncio.create_task(server.run(speed))
+    start_ticks, start_bytes = server.ticks, server.bytes_sent
+    start_busy = server.tick_seconds
+    start = time.perf_counter()
+    await asyncio.sleep(seconds)
+    server.stop()
+    await runner
+    elapsed = time.perf_counter() - start
+    ticks = server.ticks - start_ticks
+    tick_ms = (server.tick_seconds - start_busy) / max(1, ticks) * 1000
+    frame_bytes = (server.bytes_sent - start_bytes) / max(1, ticks * clients)
+    listener.close()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return ticks / elapsed, tick_ms, frame_bytes
+
+
+def main():
+    """Запускает сервер или измеряет его под нагрузкой."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    serve_parser = subparsers.add_parser('serve', help='запустить сервер')
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    bench_parser = subparsers.add_parser(
+        'bench', help='сервер и клиенты на localhost')
+    bench_parser.add_argument('--clients', type=int, default=1000)
+    bench_parser.add_argument('--seconds', type=float, default=5)
+    for subparser in (serve_parser, bench_parser):
+        subparser.add_argument('--width', type=int, default=GRID_WIDTH * 8)
+        subparser.add_argument('--height', type=int, default=GRID_HEIGHT * 8)
+        subparser.add_argument('--speed', type=int, default=SPEED)
+    args = parser.parse_args()
+    world = World(args.width, args.height)
+    if args.command == 'bench':
+        rate, tick_ms, frame_bytes = asyncio.run(
+            bench(args.clients, args.seconds, world, args.speed))
+        print(f'{rate:.1f} тактов в секунду при скорости {args.speed}, '
+              f'такт {tick_ms:.2f} мс, кадр такта {frame_bytes:,.0f} байт')
+        return
+
+    async def serve():
+        server = GameServer(world)
+        await server.serve(args.host, args.port)
+        await server.run(args.speed)
+
+    asyncio.run(serve())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,524 @@
+"""
+Снимки полного состояния игры Змейки.
+
+Snapshot хранит все, от чего зависит продолжение партии: тело змейки,
+направление и следующий поворот, длину, ячейку яблока, состояние
+генератора случайных чисел и порядок ячеек в индексе свободных ячеек
+(FreeCells) — от него зависит, куда упадет следующее яблоко. Партия,
+восстановленная из снимка, продолжается такт в такт так же, как
+исходная.
+
+Checkpoints держит тысячи снимков одной игры, не копируя тело змейки
+в каждый. Змейка движется как очередь: новые головы дописываются в
+«след» — последовательность ячеек в порядке появления, разбитую на блоки
+по TRAIL_CHUNK, а тело на любом такте — отрезок следа. Снимок хранит
+ссылки на блоки и границы отрезка, поэтому снимок тратит O(новых ячеек)
+вместо O(длины змейки). В блоки только дописывают, записанное не
+меняется, поэтому общие блоки безопасны; блоки, на которые не ссылается
+ни один снимок, освобождаются вместе со снимками. Состояние генератора
+тоже общее у снимков, пока генератор не использовался. Порядок
+FreeCells меняется на каждом такте лишь в нескольких позициях, поэтому
+Checkpoints ведет журнал его перестановок (FreeCells.journal), а снимок
+хранит только длину журнала на своем такте. Перемотка отменяет
+перестановки журнала после снимка — O(изменений) вместо O(размера
+поля); начало журнала, которое старше всех снимков, отбрасывается.
+
+Двоичный формат (little-endian):
+
+    заголовок   4s B H H B B I H H I I I магия b'SNKS', версия, ширина
+                                        и высота мира, коды направления
+                                        и поворота, длина змейки, ячейка
+                                        яблока, число сегментов,
+                                        свободных и переставленных ячеек
+    тело        I * сегментов           ячейки от головы к хвосту
+    индекс      I * переставленных * 2  свободные позиции FreeCells, где
+                                        лежит не ячейка с тем же номером,
+                                        и номера лежащих в них ячеек
+    генератор   I * 625 B d             состояние Mersenne Twister и
+                                        запасное значение gauss
+
+Запись и чтение — копирование массивов целиком, без объекта на сегмент;
+переставленные ячейки индекса находятся средствами NumPy. Порядок
+занятых позиций индекса не влияет на выбор яблока и не сохраняется.
+
+    python snake_snapshot.py save game.snks --seed 3 --ticks 5000
+    python snake_snapshot.py load game.snks --ticks 100
+"""
+
+
+import argparse
+import random
+import struct
+import time
+from array import array
+from bisect import bisect_left
+from collections import deque
+
+import numpy as np
+
+from the_snake import DIRECTIONS, Apple, Snake, World, step
+
+MAGIC = b'SNKS'
+VERSION = 3
+HEADER = struct.Struct('<4sBHHBBIHHIII')
+GAUSS = struct.Struct('<Bd')
+
+NO_TURN = len(DIRECTIONS)
+
+# Число ячеек в блоке следа Checkpoints:
+TRAIL_CHUNK = 4096
+
+# Версия состояния random.Random.getstate и число слов в нем:
+RNG_VERSION = 3
+RNG_WORDS = 625
+
+
+def _free_pairs(free_cells, length=None):
+    """
+    Возвращает переставленные свободные ячейки free_cells.
+
+    ----------
+    Два array('I') — свободные позиции, где лежит не ячейка с тем же
+    номером, и номера лежащих в них ячеек, — и число свободных ячеек;
+    формат FreeCells.load_moved. length — длина журнала, к которой
+    вернуть порядок (FreeCells.free_order).
+    """
+    cells, overlay, free = free_cells.free_order(length)
+    if isinstance(cells, array):
+        order = np.frombuffer(cells, dtype=np.uint32, count=free)
+        patch = [item for item in overlay.items() if item[0] < free]
+        if patch:
+            order = order.copy()
+            changed, numbers = zip(*patch)
+            order[list(changed)] = numbers
+        positions = np.flatnonzero(
+            order != np.arange(free, dtype=np.uint32)).astype(np.uint32)
+        return (array('I', positions.tobytes()),
+                array('I', order[positions].tobytes()), free)
+    moved = dict(cells)
+    moved.update(overlay)
+    pairs = sorted(
+        (position, number) for position, number in moved.items()
+        if position < free and position != number)
+    return (array('I', (position for position, _ in pairs)),
+            array('I', (number for _, number in pairs)), free)
+
+
+def _rng_state(rng):
+    """Возвращает состояние генератора: array('I') слов и gauss."""
+    version, words, gauss = rng.getstate()
+    return array('I', words), gauss
+
+
+class Snapshot:
+    """
+    Снимок состояния змейки, яблока и генератора.
+
+    Атрибуты
+    ---------
+    world : World
+                игровой мир
+    direction, next_direction : tuple[int] или None
+                направление змейки и поворот следующего такта
+    length : int
+                длина змейки
+    apple : tuple[int]
+                ячейка яблока
+    size : int
+                число сегментов тела
+
+    Снимок не меняется после создания; очередь ввода игрока в него не
+    входит.
+    """
+
+    __slots__ = (
+        'world', 'direction', 'next_direction', 'length', 'apple', 'size',
+        '_chunks', '_offset', '_rng_words', '_gauss', '_moved', '_history',
+        '_journal', '_epoch',
+    )
+
+    @classmethod
+    def capture(cls, snake, apple, body=None, rng_state=None, history=None):
+        """
+        Снимает состояние змейки snake и яблока apple.
+
+        Параметры
+        ----------
+        body : tuple, optional
+                блоки следа с ячейками тела от хвоста к голове и смещение
+                хвоста в первом блоке; по умолчанию тело копируется
+        rng_state : tuple, optional
+                готовое состояние генератора от _rng_state
+        history : Checkpoints, optional
+                история, чей журнал FreeCells ведется; снимок хранит
+                только длину журнала, по умолчанию переставленные ячейки
+                FreeCells копируются
+        """
+        snapshot = cls.__new__(cls)
+        snapshot.world = snake.world
+        snapshot.direction = snake.direction
+        snapshot.next_direction = snake.next_direction
+        snapshot.length = snake.length
+        snapshot.apple = apple.position
+        snapshot.size = len(snake.body)
+        if body is None:
+            cells = snake.body.head_cells()
+            cells.reverse()
+            body = (cells,), 0
+        snapshot._chunks, snapshot._offset = body
+        if rng_state is None:
+            rng_state = _rng_state(snake.rng)
+        snapshot._rng_words, snapshot._gauss = rng_state
+        snapshot._history = history
+        if history is None:
+            snapshot._moved = _free_pairs(snake.body.free_cells)
+            snapshot._journal = snapshot._epoch = None
+        else:
+            snapshot._moved = None
+            snapshot._journal, snapshot._epoch = history._mark()
+        return snapshot
+
+    def body_cells(self):
+        """Возвращает array('I') ячеек тела от головы к хвосту."""
+        cells = array('I')
+        offset, remaining = self._offset, self.size
+        for chunk in self._chunks:
+            piece = chunk[offset:offset + remaining]
+            cells += piece
+            remaining -= len(piece)
+            offset = 0
+        cells.reverse()
+        return cells
+
+    def moved(self):
+        """Возвращает переставленные свободные ячейки, как _free_pairs."""
+        if self._moved is None:
+            return self._history._moved_at(self)
+        return self._moved
+
+    def restore(self, snake, apple):
+        """
+        Возвращает змейку и яблоко в состояние снимка.
+
+        ----------
+        Генератор змейки получает сохраненное состояние; яблоко должно
+        брать числа из того же генератора, как в main и new_game.
+        Вызывает ValueError, если мир змейки другого размера или
+        снимок истории Checkpoints больше не связан с ее журналом.
+        """
+        world = snake.world
+        if (world.width, world.height) != (
+            self.world.width, self.world.height
+        ):
+            raise ValueError('Снимок сделан в мире другого размера.')
+        body = snake.body
+        if snake.dirty_cells is not None:
+            snake.dirty_cells.extend(body)  # Старое тело нужно стереть
+        free_cells = body.free_cells
+        history = self._history
+        if history is not None and free_cells is history.free_cells:
+            history._rewind_journal(self)
+        elif free_cells.journal is not None:
+            raise ValueError('Журнал FreeCells ведет другая история.')
+        else:
+            free_cells.load_moved(*self.moved())
+        body.assign_cells(self.body_cells(), keep_free_cells=True)
+        if snake.dirty_cells is not None:
+            snake.dirty_cells.extend(body)
+        snake.direction = self.direction
+        snake.next_direction = self.next_direction
+        snake.length = self.length
+        snake.input_queue.clear()
+        if apple.dirty_cells is not None:
+            apple.dirty_cells += [apple.position, self.apple]
+        apple.position = self.apple
+        snake.rng.setstate(
+            (RNG_VERSION, tuple(self._rng_words), self._gauss))
+
+    def new_game(self):
+        """Создает новые змейку и яблоко с общим генератором из снимка."""
+        rng = random.Random()
+        world = World(self.world.width, self.world.height)
+        snake = Snake(rng, world)
+        apple = Apple(snake.positions, rng, world)
+        self.restore(snake, apple)
+        return snake, apple
+
+    def to_bytes(self):
+        """Возвращает снимок в двоичном формате."""
+        next_turn = NO_TURN if self.next_direction is None else (
+            DIRECTIONS.index(self.next_direction))
+        positions, numbers, free = self.moved()
+        return b''.join((
+            HEADER.pack(
+                MAGIC, VERSION, self.world.width, self.world.height,
+                DIRECTIONS.index(self.direction), next_turn, self.length,
+                *self.apple, self.size, free, len(positions)),
+            self.body_cells().tobytes(),
+            positions.tobytes(),
+            numbers.tobytes(),
+            self._rng_words.tobytes(),
+            GAUSS.pack(self._gauss is not None, self._gauss or 0.0),
+        ))
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Читает снимок из двоичного формата."""
+        (magic, version, width, height, direction, next_turn, length,
+         apple_x, apple_y, size, free, moved) = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('Данные не являются снимком игры Змейки.')
+        snapshot = cls.__new__(cls)
+        snapshot.world = World(width, height)
+        snapshot.direction = DIRECTIONS[direction]
+        snapshot.next_direction = (
+            None if next_turn == NO_TURN else DIRECTIONS[next_turn])
+        snapshot.length = length
+        snapshot.apple = apple_x, apple_y
+        snapshot.size = size
+        view = memoryview(data)
+        offset = HEADER.size
+        cells, offset = _read_cells(view, offset, size)
+        cells.reverse()
+        snapshot._chunks, snapshot._offset = (cells,), 0
+        positions, offset = _read_cells(view, offset, moved)
+        numbers, offset = _read_cells(view, offset, moved)
+        snapshot._moved = positions, numbers, free
+        snapshot._history = snapshot._journal = snapshot._epoch = None
+        snapshot._rng_words, offset = _read_cells(view, offset, RNG_WORDS)
+        has_gauss, gauss = GAUSS.unpack_from(data, offset)
+        snapshot._gauss = gauss if has_gauss else None
+        return snapshot
+
+
+def _read_cells(view, offset, count):
+    """Читает count слов array('I') с offset; возвращает их и конец."""
+    end = offset + 4 * count
+    if end > len(view):
+        raise ValueError('Снимок оборван.')
+    cells = array('I')
+    cells.frombytes(view[offset:end])
+    return cells, end
+
+
+def save(path, snake, apple):
+    """Записывает снимок игры в файл path."""
+    with open(path, 'wb') as snapshot_file:
+        snapshot_file.write(Snapshot.capture(snake, apple).to_bytes())
+
+
+def load(path):
+    """Читает снимок игры из файла path."""
+    with open(path, 'rb') as snapshot_file:
+        return Snapshot.from_bytes(snapshot_file.read())
+
+
+class Checkpoints:
+    """
+    История снимков одной игры с общим телом змейки.
+
+    Атрибуты
+    ---------
+    snake : Snake
+                змейка игры
+    apple : Apple
+                яблоко игры
+    snapshots : deque[Snapshot]
+                снимки от старых к новым; при заданном limit старые
+                вытесняются
+    free_cells : FreeCells
+                индекс свободных ячеек змейки, чей журнал ведет история
+
+    У индекса может быть только один журнал, поэтому одну игру ведет
+    одна история; close прекращает ведение журнала и удаляет снимки.
+    """
+
+    def __init__(self, snake, apple, limit=None):
+        """
+        Устанавливает все необходимые атрибуты объекта Checkpoints.
+
+        Параметры
+        ----------
+        snake : Snake
+                змейка
+        apple : Apple
+                яблоко
+        limit : int, optional
+                наибольшее число хранимых снимков
+
+        ----------
+        Вызывает ValueError, если журнал FreeCells змейки уже ведется.
+        """
+        self.free_cells = snake.body.free_cells
+        if self.free_cells.journal is not None:
+            raise ValueError('Журнал FreeCells уже ведет другая история.')
+        self._log = self.free_cells.journal = array('Q')
+        self.snake = snake
+        self.apple = apple
+        self.snapshots = deque(maxlen=limit)
+        self._chunks = []  # Блоки следа, покрывающие тело
+        self._base = 0  # Номер первой ячейки _chunks[0] в следе
+        self._end = 0  # Номер ячейки следа после последней записанной
+        self._rebuilt = None  # body.rebuilt на момент записи следа
+        self._rng_state = None  # Последнее состояние генератора
+        self._journal_base = 0  # Номер первой записи журнала FreeCells
+        self._rewinds = 0  # Число перемоток журнала
+        # Перемотки, после которых журнал был короче, чем после всех
+        # следующих: их номера и длины журнала, обе по возрастанию.
+        self._cut_epochs = []
+        self._cut_lengths = []
+        self._epoch_floor = 0  # Снимки старше этой перемотки негодны
+
+    def __len__(self):
+        """Возвращает число снимков."""
+        return len(self.snapshots)
+
+    def __getitem__(self, index):
+        """Возвращает снимок по индексу."""
+        return self.snapshots[index]
+
+    def capture(self):
+        """Снимает текущее состояние игры и возвращает снимок."""
+        body = self.snake.body
+        size = len(body)
+        start = body.pushed - size  # Номер хвоста в следе
+        if body.rebuilt != self._rebuilt or start > self._end:
+            # Тело перестроено или уехало за след: начинаем новый след
+            self._chunks, self._base, self._end = [], start, start
+            self._rebuilt = body.rebuilt
+        self._write(body.head_cells(body.pushed - self._end))
+        first = (start - self._base) // TRAIL_CHUNK
+        if first:
+            del self._chunks[:first]  # Хвост ушел из этих блоков
+            self._base += first * TRAIL_CHUNK
+        snapshot = Snapshot.capture(
+            self.snake, self.apple,
+            (tuple(self._chunks), start - self._base), self._share_rng(), self)
+        self.snapshots.append(snapshot)
+        journal = self.free_cells.journal
+        dead = self.snapshots[0]._journal - self._journal_base
+        if dead > len(journal) // 2:
+            del journal[:dead]  # Записи старше всех снимков не нужны
+            self._journal_base += dead
+        oldest = self.snapshots[0]._epoch
+        stale = bisect_left(self._cut_epochs, oldest)
+        if stale:
+            # Перемотки до самого старого снимка не касаются ни одного
+            # снимка истории
+            del self._cut_epochs[:stale], self._cut_lengths[:stale]
+            self._epoch_floor = oldest
+        return snapshot
+
+    def _write(self, cells):
+        """Дописывает в след ячейки cells, заданные от головы к хвосту."""
+        cells.reverse()
+        written = 0
+        while written < len(cells):
+            position = (self._end - self._base) % TRAIL_CHUNK
+            if not position:
+                self._chunks.append(array('I', bytes(4 * TRAIL_CHUNK)))
+            count = min(TRAIL_CHUNK - position, len(cells) - written)
+            self._chunks[-1][position:position + count] = (
+                cells[written:written + count])
+            written += count
+            self._end += count
+
+    def _share_rng(self):
+        """Возвращает состояние генератора, общее с прошлым снимком."""
+        version, words, gauss = self.snake.rng.getstate()
+        last = self._rng_state
+        if last is None or last[2] != gauss or last[0] != words:
+            self._rng_state = words, array('I', words), gauss
+        return self._rng_state[1:]
+
+    def _mark(self):
+        """Возвращает длину журнала FreeCells и число перемоток."""
+        return (self._journal_base + len(self.free_cells.journal),
+                self._rewinds)
+
+    def _check(self, snapshot):
+        """
+        Вызывает ValueError, если журнал не ведет к такту снимка.
+
+        ----------
+        Снимок негоден, если после него журнал перематывали короче его
+        длины. Самая короткая из таких перемоток — первая из
+        _cut_lengths с номером не меньше эпохи снимка, поэтому проверка
+        стоит O(log перемоток).
+        """
+        if self.free_cells.journal is not self._log:
+            raise ValueError('История снимков закрыта.')
+        index = bisect_left(self._cut_epochs, snapshot._epoch)
+        if (snapshot._journal < self._journal_base
+                or snapshot._epoch < self._epoch_floor
+                or index < len(self._cut_lengths)
+                and self._cut_lengths[index] < snapshot._journal):
+            raise ValueError('Снимок больше не связан с журналом истории.')
+
+    def _rewind_journal(self, snapshot):
+        """Отменяет перестановки FreeCells, сделанные после снимка."""
+        self._check(snapshot)
+        length = snapshot._journal - self._journal_base
+        self.free_cells.rewind_journal(length)
+        epochs, lengths = self._cut_epochs, self._cut_lengths
+        while lengths and lengths[-1] >= snapshot._journal:
+            epochs.pop()  # Более короткая перемотка перекрывает прошлые
+            lengths.pop()
+        epochs.append(self._rewinds)
+        lengths.append(snapshot._journal)
+        self._rewinds += 1
+
+    def _moved_at(self, snapshot):
+        """Возвращает переставленные ячейки FreeCells на такте снимка."""
+        self._check(snapshot)
+        return _free_pairs(
+            self.free_cells, snapshot._journal - self._journal_base)
+
+    def close(self):
+        """Прекращает вести журнал FreeCells; снимки становятся негодны."""
+        self.free_cells.journal = None
+        self.snapshots.clear()
+
+    def rewind(self, steps=1):
+        """
+        Возвращает игру к снимку steps шагов назад и отбрасывает новые.
+
+        ----------
+        rewind(1) восстанавливает последний снимок. Возвращает снимок.
+        Вызывает IndexError, если снимков меньше steps.
+        """
+        if not 0 < steps <= len(self.snapshots):
+            raise IndexError('Нет снимка так далеко в прошлом.')
+        for _ in range(steps - 1):
+            self.snapshots.pop()
+        snapshot = self.snapshots[-1]
+        snapshot.restore(self.snake, self.apple)
+        return snapshot
+
+
+def main():
+    """Сохраняет партию в снимок или продолжает партию из снимка."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('command', choices=('save', 'load'))
+    parser.add_argument('path')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--ticks', type=int, default=1000)
+    args = parser.parse_args()
+    if args.command == 'save':
+        rng = random.Random(args.seed)
+        snake = Snake(rng)
+        apple = Apple(snake.positions, rng)
+    else:
+        start = time.perf_counter()
+        snake, apple = load(args.path).new_game()
+        print(f'Снимок прочитан за {time.perf_counter() - start:.6f} с')
+    for _ in range(args.ticks):
+        step(snake, apple, snake.rng.choice(DIRECTIONS + (None,) * 8))
+    print(f'Длина змейки: {snake.length}, голова: '
+          f'{snake.get_head_position()}, яблоко: {apple.position}')
+    if args.command == 'save':
+        save(args.path, snake, apple)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+"""
+Хранилище записанных партий Змейки в файлах, отображаемых в память.
+
+Каждый такт записывается структурой фиксированного размера TICK_RECORD:
+ячейка головы, направление, длина змейки, ячейка яблока и событие такта.
+Хранилище — каталог из двух файлов, в которые только дописываются данные,
+и файла с размерами мира, в котором записаны партии:
+
+    ticks.bin     записи тактов подряд
+    episodes.bin  индекс партий: номер первой записи и число записей
+    world.bin     ширина и высота мира (WORLD_RECORD)
+
+Партия (эпизод) заканчивается тактом, на котором змейка укусила себя или
+заполнила поле; на этом такте записано состояние уже после сброса.
+EpisodeStore отображает файлы в память и отдает массивы NumPy поверх
+отображения, не копируя данные и не читая файлы целиком.
+"""
+
+
+import mmap
+import os
+
+import numpy as np
+
+from the_snake import COLLISION, DIRECTIONS, EAT, MOVE, WIN, World
+
+TICKS_FILE = 'ticks.bin'
+EPISODES_FILE = 'episodes.bin'
+WORLD_FILE = 'world.bin'
+
+EVENTS = (MOVE, EAT, COLLISION, WIN)
+
+TICK_RECORD = np.dtype([
+    ('head_x', '<u2'),
+    ('head_y', '<u2'),
+    ('apple_x', '<u2'),
+    ('apple_y', '<u2'),
+    ('length', '<u4'),
+    ('direction', 'u1'),
+    ('event', 'u1'),
+    ('reserved', 'u1', (2,)),
+])
+EPISODE_RECORD = np.dtype([('start', '<u8'), ('count', '<u8')])
+WORLD_RECORD = np.dtype([('width', '<u2'), ('height', '<u2')])
+
+# Сколько тактов копить в памяти перед записью на диск:
+WRITE_BUFFER_TICKS = 4096
+
+
+def fill_record(record, snake, apple, event):
+    """Заполняет запись TICK_RECORD состоянием после такта."""
+    record['head_x'], record['head_y'] = snake.get_head_position()
+    record['apple_x'], record['apple_y'] = apple.position
+    record['length'] = snake.length
+    record['direction'] = DIRECTIONS.index(snake.direction)
+    record['event'] = EVENTS.index(event)
+
+
+def read_world(directory):
+    """Возвращает мир, в котором записано хранилище, или None."""
+    path = os.path.join(directory, WORLD_FILE)
+    if not os.path.exists(path):
+        return None  # Хранилище записано до появления world.bin
+    record = np.fromfile(path, dtype=WORLD_RECORD, count=1)[0]
+    return World(int(record['width']), int(record['height']))
+
+
+class EpisodeWriter:
+    """
+    Дописывает такты и партии в хранилище.
+
+    Атрибуты
+    ---------
+    directory : str
+                каталог хранилища
+    ticks : int
+                число тактов в хранилище, включая буфер
+    world : World или None
+                мир записанных партий; None, пока ничего не записано
+    """
+
+    def __init__(self, directory):
+        """Открывает хранилище directory, создавая его при необходимости."""
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self._ticks_file = open(os.path.join(directory, TICKS_FILE), 'ab')
+        self._episodes_file = open(
+            os.path.join(directory, EPISODES_FILE), 'ab')
+        self.ticks = self._ticks_file.tell() // TICK_RECORD.itemsize
+        self.world = read_world(directory)
+        self._episode_start = self.ticks
+        self._buffer = np.zeros(WRITE_BUFFER_TICKS, dtype=TICK_RECORD)
+        self._buffered = 0
+
+    def __enter__(self):
+        """Возвращает сам объект записи."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Закрывает хранилище."""
+        self.close()
+
+    def record(self, snake, apple, event):
+        """
+        Записывает состояние после такта step.
+
+        ----------
+        На событиях COLLISION и WIN партия завершается. Вызывает
+        ValueError, если хранилище записано в мире другого размера.
+        """
+        if snake.world is not self.world:
+            self._set_world(snake.world)
+        fill_record(self._buffer[self._buffered], snake, apple, event)
+        self._buffered += 1
+        self.ticks += 1
+        if self._buffered == len(self._buffer):
+            self.flush()
+        if event in (COLLISION, WIN):
+            self.end_episode()
+
+    def _set_world(self, world):
+        """Запоминает мир партий, записывая его в новое хранилище."""
+        if self.world is None:
+            record = np.array(
+                [(world.width, world.height)], dtype=WORLD_RECORD)
+            record.tofile(os.path.join(self.directory, WORLD_FILE))
+        elif (self.world.width, self.world.height) != (
+            world.width, world.height
+        ):
+            raise ValueError(
+                f'Хранилище записано в мире {self.world.width}x'
+                f'{self.world.height}, а не {world.width}x{world.height}.')
+        self.world = world
+
+    def flush(self):
+        """Записывает накопленные такты на диск."""
+        self._ticks_file.write(self._buffer[:self._buffered].tobytes())
+        self._ticks_file.flush()
+        self._buffered = 0
+
+    def end_episode(self):
+        """Завершает текущую партию и добавляет ее в индекс."""
+        if self.ticks == self._episode_start:
+            return
+        self.flush()
+        episode = np.array(
+            [(self._episode_start, self.ticks - self._episode_start)],
+            dtype=EPISODE_RECORD)
+        self._episodes_file.write(episode.tobytes())
+        self._episodes_file.flush()
+        self._episode_start = self.ticks
+
+    def close(self):
+        """Завершает партию и закрывает файлы."""
+        if self._ticks_file.closed:
+            return
+        self.end_episode()
+        self._ticks_file.close()
+        self._episodes_file.close()
+
+
+def _map(path, dtype):
+    """Отображает файл в память и возвращает массив записей и mmap."""
+    with open(path, 'rb') as mapped_file:
+        size = os.fstat(mapped_file.fileno()).st_size
+        count = size // dtype.itemsize
+        if not count:
+            return np.empty(0, dtype=dtype), None
+        mapped = mmap.mmap(
+            mapped_file.fileno(), count * dtype.itemsize,
+            access=mmap.ACCESS_READ)
+    return np.frombuffer(mapped, dtype=dtype), mapped
+
+
+class EpisodeStore:
+    """
+    Чтение хранилища партий без копирования.
+
+    Атрибуты
+    ---------
+    ticks : numpy.ndarray[TICK_RECORD]
+                все такты хранилища, представление поверх mmap
+    episodes : numpy.ndarray[EPISODE_RECORD]
+                индекс партий
+    world : World или None
+                мир записанных партий; None у хранилищ без world.bin
+
+    Хранилище видит данные на момент открытия; партии, записанные позже,
+    появятся после повторного открытия.
+    """
+
+    def __init__(self, directory):
+        """Отображает в память файлы хранилища directory."""
+        self.world = read_world(directory)
+        self.ticks, self._ticks_map = _map(
+            os.path.join(directory, TICKS_FILE), TICK_RECORD)
+        self.episodes, self._episodes_map = _map(
+            os.path.join(directory, EPISODES_FILE), EPISODE_RECORD)
+
+    def __enter__(self):
+        """Возвращает само хранилище."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Закрывает хранилище."""
+        self.close()
+
+    def __len__(self):
+        """Возвращает число партий."""
+        return len(self.episodes)
+
+    def __getitem__(self, index):
+        """Возвращает такты партии index без копирования."""
+        start, count = self.episodes[index]
+        return self.ticks[start:start + count]
+
+    def close(self):
+        """
+        Закрывает отображения файлов.
+
+        ----------
+        Массивы, полученные из хранилища, после закрытия использовать
+        нельзя; пока они существуют, mmap не закрывается.
+        """
+        self.ticks = self.episodes = None
+        for mapped in (self._ticks_map, self._episodes_map):
+            if mapped is not None:
+                try:
+                    mapped.close()
+                except BufferError:
+                    pass  # Закроется, когда исчезнут все представления
@@ -0,0 +1,322 @@
+import subprocess
+import sys
+import tracemalloc
+
+import pygame
+import pytest
+
+from conftest import BASE_DIR
+
+
+def test_snake_positions_read_like_list(snake, _the_snake):
+    head = snake.get_head_position()
+    assert snake.positions == [head], (
+        'Убедитесь, что `Snake.positions` читается как список позиций.'
+    )
+    assert snake.positions[0] == head and snake.positions[1:] == [], (
+        'Убедитесь, что `Snake.positions` поддерживает индексы и срезы.'
+    )
+
+
+def test_snake_move_keeps_length(snake, _the_snake):
+    snake.direction = _the_snake.RIGHT
+    snake.length = 3
+    for _ in range(5):
+        snake.move()
+    assert len(snake.positions) == 3, (
+        'Убедитесь, что длина тела змейки не превышает `length`.'
+    )
+    head_x, head_y = snake.get_head_position()
+    assert snake.positions[1] == (
+        (head_x - 1) % _the_snake.GRID_WIDTH, head_y
+    ), 'Убедитесь, что сегменты следуют за головой змейки.'
+
+
+def _move_in_square(snake, module):
+    for direction in (module.RIGHT, module.DOWN, module.LEFT, module.UP):
+        snake.direction = direction
+        snake.move()
+
+
+def test_snake_tail_cell_is_not_collision(snake, _the_snake):
+    snake.length = 4
+    _move_in_square(snake, _the_snake)
+    assert not snake.self_collection(), (
+        'Клетка, освобожденная хвостом, не считается укусом.'
+    )
+
+
+def test_snake_self_collection(snake, _the_snake):
+    snake.length = 5
+    _move_in_square(snake, _the_snake)
+    assert snake.self_collection(), (
+        'Убедитесь, что `self_collection` находит укус змейки.'
+    )
+
+
+def test_apple_avoids_snake(snake, apple, _the_snake):
+    snake.length = 10
+    for _ in range(9):
+        snake.move()
+    for _ in range(50):
+        apple.randomize_position(snake.positions)
+        assert apple.position not in snake.positions, (
+            'Убедитесь, что яблоко не появляется на змейке.'
+        )
+
+
+def test_apple_reports_full_board(apple, _the_snake):
+    cells = _the_snake.board_cells()
+    try:
+        apple.randomize_position(cells)
+    except _the_snake.BoardFull:
+        pass
+    else:
+        raise AssertionError(
+            'Если змейка заполнила все поле, `randomize_position` '
+            'должен вызывать `BoardFull`.'
+        )
+
+
+def test_renderer_updates_only_dirty_cells(snake, apple, _the_snake):
+    renderer = _the_snake.Renderer(_the_snake.screen)
+    renderer.draw(apple, snake)
+    snake.length = 1
+    tail = snake.get_head_position()
+    snake.move()
+    assert snake.dirty_cells == [snake.get_head_position(), tail], (
+        'Убедитесь, что `Snake.move` отмечает новую голову и старый хвост.'
+    )
+    renderer.draw(apple, snake)
+    assert snake.dirty_cells == [] and apple.dirty_cells == [], (
+        'Убедитесь, что после отрисовки список изменившихся ячеек пуст.'
+    )
+    assert _the_snake.screen.get_at(_the_snake.cell_to_pixels(tail))[:3] == (
+        _the_snake.BOARD_BACKGROUND_COLOR
+    ), 'Убедитесь, что освобожденная хвостом ячейка стирается.'
+
+
+def test_step_eats_apple(snake, apple, _the_snake):
+    snake.direction = _the_snake.RIGHT
+    head_x, head_y = snake.get_head_position()
+    apple.position = (head_x + 1, head_y)
+    assert _the_snake.step(snake, apple) == _the_snake.EAT, (
+        'Убедитесь, что `step` сообщает о поедании яблока.'
+    )
+    assert snake.length == 2 and apple.position not in snake.positions, (
+        'После поедания яблока змейка растет, а яблоко перемещается.'
+    )
+    assert _the_snake.step(snake, apple, _the_snake.LEFT) == _the_snake.MOVE
+    assert snake.direction == _the_snake.RIGHT, (
+        'Убедитесь, что `step` игнорирует разворот на 180°.'
+    )
+
+
+# Сколько может занимать импорт the_snake, секунд:
+IMPORT_TIME_BUDGET = 0.1
+
+
+def test_import_is_fast_and_does_not_load_pygame():
+    code = (
+        'import sys, time\n'
+        'start = time.perf_counter()\n'
+        'import the_snake, snake_arena, snake_replay, snake_autopilot\n'
+        'print(time.perf_counter() - start)\n'
+        'assert "pygame.base" not in sys.modules\n'
+    )
+    seconds = min(
+        float(subprocess.run(
+            [sys.executable, '-c', code], check=True, cwd=BASE_DIR,
+            capture_output=True, text=True, timeout=10,
+        ).stdout)
+        for _ in range(3)
+    )
+    assert seconds < IMPORT_TIME_BUDGET, (
+        f'Импорт занял {seconds:.3f} с, бюджет {IMPORT_TIME_BUDGET} с. '
+        'Убедитесь, что pygame загружается только при первом обращении.'
+    )
+
+
+def test_lazy_import_reports_missing_module(_the_snake):
+    with pytest.raises(ModuleNotFoundError) as error_info:
+        _the_snake.lazy_import('snake_missing_module')
+    assert error_info.value.name == 'snake_missing_module', (
+        'Убедитесь, что ошибка называет отсутствующий модуль.'
+    )
+
+
+def test_import_does_not_open_display():
+    code = (
+        'import pygame, the_snake\n'
+        'assert not pygame.display.get_init()\n'
+        'assert pygame.display.get_surface() is None\n'
+    )
+    subprocess.run(
+        [sys.executable, '-c', code], check=True, cwd=BASE_DIR,
+        stdout=subprocess.DEVNULL,
+    )
+
+
+def test_surface_cache_reuses_cells(_the_snake):
+    cache = _the_snake.SurfaceCache()
+    cell = cache.cell(_the_snake.SNAKE_COLOR)
+    assert cache.cell(_the_snake.SNAKE_COLOR) is cell, (
+        'Поверхность ячейки должна создаваться один раз.'
+    )
+    assert cache.cell(_the_snake.SNAKE_COLOR, size=10) is not cell, (
+        'При другом размере ячейки кэш должен создавать новую поверхность.'
+    )
+    cache.clear()
+    assert cache.cell(_the_snake.SNAKE_COLOR) is not cell
+
+
+def test_surface_cache_converts_to_display_format(_the_snake):
+    screen = _the_snake.get_screen()
+    cache = _the_snake.SurfaceCache()
+    for surface in (cache.cell(_the_snake.APPLE_COLOR), cache.background()):
+        assert surface.get_bitsize() == screen.get_bitsize()
+        assert surface.get_masks() == screen.get_masks(), (
+            'Поверхности кэша должны быть в формате пикселей окна.'
+        )
+
+
+def test_fixed_timestep_catches_up(_the_snake):
+    scheduler = _the_snake.FixedTimestep(rate=20, max_ticks=10)
+    assert len(list(scheduler.ticks(16))) == 0
+    assert len(list(scheduler.ticks(40))) == 1, (
+        'Такт должен выполняться, когда накопилось 50 мс.'
+    )
+    assert len(list(scheduler.ticks(150))) == 3, (
+        'При долгом кадре планировщик должен догонять пропущенные такты.'
+    )
+    assert len(list(scheduler.ticks(10_000))) == 10, (
+        'Число тактов за кадр должно ограничиваться `max_ticks`.'
+    )
+
+
+def test_fast_turns_are_queued(snake, apple, _the_snake):
+    pygame.init()
+    _the_snake.setup_input()
+    snake.direction = _the_snake.RIGHT
+    pygame.event.clear()
+    for key in (pygame.K_UP, pygame.K_LEFT):
+        pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=key))
+    _the_snake.handle_keys(snake)
+    _the_snake.step(snake, apple)
+    assert snake.direction == _the_snake.UP
+    _the_snake.step(snake, apple)
+    assert snake.direction == _the_snake.LEFT, (
+        'Два быстрых нажатия за один такт должны примениться по очереди.'
+    )
+    assert snake.input_queue.latency_stats()['count'] == 2
+
+
+def test_expose_events_repaint_window(snake, apple, _the_snake):
+    pygame.init()
+    _the_snake.setup_input()
+    renderer = _the_snake.Renderer(pygame.Surface(
+        (_the_snake.SCREEN_WIDTH, _the_snake.SCREEN_HEIGHT)))
+    renderer.draw(apple, snake)
+    for event_type in _the_snake.expose_events():
+        assert not pygame.event.get_blocked(event_type), (
+            'Убедитесь, что события перерисовки окна не отбрасываются.'
+        )
+        pygame.event.clear()
+        pygame.event.post(pygame.event.Event(event_type))
+        _the_snake.handle_keys(snake, renderer)
+        assert renderer.full_redraw, (
+            'После перерисовки окна системой кадр нужно нарисовать целиком.'
+        )
+        renderer.draw(apple, snake)
+
+
+def test_queue_rejects_reversal_of_pending_turn(_the_snake):
+    queue = _the_snake.InputQueue()
+    assert queue.push(_the_snake.UP, _the_snake.RIGHT)
+    assert not queue.push(_the_snake.DOWN, _the_snake.RIGHT), (
+        'Разворот проверяется относительно последнего поворота в очереди.'
+    )
+
+
+def test_large_world_wraps_snake(_the_snake):
+    world = _the_snake.World(1000, 700)
+    snake = _the_snake.Snake(world=world)
+    snake.positions = [(999, 0)]
+    snake.direction = _the_snake.RIGHT
+    snake.move()
+    snake.direction = _the_snake.UP
+    snake.move()
+    assert snake.get_head_position() == (0, 699), (
+        'Убедитесь, что змейка переходит через границы большого мира.'
+    )
+    apple = _the_snake.Apple(snake.positions, world=world)
+    assert 0 <= apple.position[0] < 1000 and 0 <= apple.position[1] < 700
+
+
+def test_huge_world_is_built_without_dense_index(_the_snake):
+    world = _the_snake.World(10_000, 10_000)
+    tracemalloc.start()
+    try:
+        snake = _the_snake.Snake(world=world)
+        apple = _the_snake.Apple(snake.positions, world=world)
+        for _ in range(1000):
+            _the_snake.step(snake, apple)
+        used = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert used < 1 << 20, (
+        'Убедитесь, что индекс огромного мира не выделяется на все поле.'
+    )
+    assert snake.get_head_position() not in snake.positions[1:]
+    assert apple.position not in snake.positions
+
+
+def test_viewport_follows_head(_the_snake):
+    world = _the_snake.World(1000, 1000)
+    snake = _the_snake.Snake(world=world)
+    apple = _the_snake.Apple(snake.positions, world=world)
+    surface = pygame.Surface(
+        (_the_snake.SCREEN_WIDTH, _the_snake.SCREEN_HEIGHT))
+    renderer = _the_snake.make_renderer(world, surface)
+    assert isinstance(renderer, _the_snake.ViewportRenderer), (
+        'Для мира больше окна нужен `ViewportRenderer`.'
+    )
+    snake.positions = [(0, 0)]
+    renderer.draw(apple, snake)
+    head = (
+        _the_snake.GRID_WIDTH // 2 * _the_snake.GRID_SIZE,
+        _the_snake.GRID_HEIGHT // 2 * _the_snake.GRID_SIZE,
+    )
+    assert surface.get_at(head)[:3] != _the_snake.BOARD_BACKGROUND_COLOR, (
+        'Убедитесь, что голова змейки рисуется в центре окна.'
+    )
+    snake.direction = _the_snake.LEFT
+    snake.move()
+    renderer.draw(apple, snake)
+    assert surface.get_at(head)[:3] != _the_snake.BOARD_BACKGROUND_COLOR, (
+        'Убедитесь, что окно следует за головой через границу мира.'
+    )
+    assert len(renderer._chunks) <= _the_snake.CHUNK_CACHE_SIZE
+
+
+def test_steady_tick_keeps_memory_flat(snake, apple, _the_snake):
+    snake.length = 10
+    snake.direction = _the_snake.RIGHT
+    head_x, head_y = snake.get_head_position()
+    apple.position = (head_x, (head_y + 1) % _the_snake.GRID_HEIGHT)
+    for _ in range(1000):
+        _the_snake.run_tick(snake, apple)
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        for _ in range(10_000):
+            _the_snake.run_tick(snake, apple)
+        growth = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    assert growth < 1024, (
+        'Убедитесь, что игровой такт не накапливает новые объекты.'
+    )
+    assert not hasattr(snake, '__dict__'), (
+        'Убедитесь, что `Snake` объявляет `__slots__`.'
+    )
@@ -0,0 +1,113 @@
+import random
+
+import numpy as np
+import pytest
+
+import snake_analytics
+import snake_replay
+import snake_storage
+from the_snake import COLLISION, EAT, WIN, World
+
+# Маленькое поле: змейка часто ест и кусает себя.
+WORLD = World(8, 6)
+
+
+def record_games(directory, replay_path, ticks=5000):
+    """Записывает игру в хранилище и в запись партии, возвращает такты."""
+    snake, apple = snake_replay.new_game(7, WORLD)
+    rng = random.Random(3)
+    log = []
+    with snake_storage.EpisodeWriter(directory) as writer, \
+            snake_replay.ReplayWriter(replay_path, 7, WORLD) as recorder:
+        for tick in range(ticks):
+            direction = None
+            if tick % 3 == 0:
+                direction = rng.choice(snake_replay.DIRECTIONS)
+            length = snake.length
+            event = snake_replay.step(snake, apple, direction)
+            writer.record(snake, apple, event)
+            recorder.record(direction)
+            log.append((event, length, snake.get_head_position()))
+        recorder.close(snake, apple)
+    return log
+
+
+def expected_summary(log):
+    """Считает очки, промежутки и причины конца партий без NumPy."""
+    scores, gaps, deaths = [], [], {'collision': 0, 'win': 0}
+    since = 0
+    for event, length, _ in log:
+        since += 1
+        if event == EAT:
+            gaps.append(since)
+            since = 0
+        elif event in (COLLISION, WIN):
+            scores.append(length)
+            deaths['collision' if event == COLLISION else 'win'] += 1
+            since = 0
+    return scores, gaps, deaths
+
+
+def test_store_statistics_match_reference(tmp_path):
+    log = record_games(tmp_path / 'store', tmp_path / 'game.snkr')
+    scores, gaps, deaths = expected_summary(log)
+    stats = snake_analytics.analyze_store(tmp_path / 'store', WORLD)
+    assert deaths['collision'] and gaps, 'Игра должна содержать события.'
+    assert stats.ticks == len(log)
+    assert stats.apples == len(gaps)
+    assert sorted(np.repeat(np.arange(len(stats.scores)), stats.scores)) == (
+        sorted(scores + [log[-1][1]])
+    ), 'Очки партий должны совпадать с длинами змейки в конце партий.'
+    assert np.array_equal(
+        np.repeat(np.arange(len(stats.gaps)), stats.gaps), sorted(gaps)
+    ), 'Промежутки между яблоками посчитаны неверно.'
+    assert stats.deaths == dict(deaths, unfinished=1), (
+        'Последняя партия закрыта без укуса и должна считаться оборванной.'
+    )
+    assert stats.heatmap.sum() == len(log)
+    x, y = log[-1][2]
+    assert stats.heatmap[y, x] > 0
+
+
+def test_chunking_and_workers_do_not_change_result(tmp_path):
+    record_games(tmp_path / 'store', tmp_path / 'game.snkr')
+    whole = snake_analytics.analyze_store(tmp_path / 'store', WORLD).summary()
+    chunked = snake_analytics.analyze_store(
+        tmp_path / 'store', WORLD, chunk_ticks=37).summary()
+    pooled = snake_analytics.analyze_store(
+        tmp_path / 'store', WORLD, workers=2, chunk_ticks=101).summary()
+    assert chunked == whole, 'Итог не должен зависеть от размера порции.'
+    assert pooled == whole, 'Итог пула процессов должен совпадать.'
+
+
+def test_replay_source_matches_store(tmp_path):
+    log = record_games(tmp_path / 'store', tmp_path / 'game.snkr')
+    stats = snake_analytics.analyze_replay(
+        tmp_path / 'game.snkr', chunk_ticks=512)
+    stored = snake_analytics.analyze_store(tmp_path / 'store', WORLD)
+    assert stats.ticks == len(log)
+    assert np.array_equal(stats.heatmap, stored.heatmap)
+    assert np.array_equal(stats.gaps, stored.gaps)
+    assert stats.summary()['deaths'] == stored.summary()['deaths'], (
+        'Незаконченная партия записи должна считаться оборванной.'
+    )
+
+
+def test_store_remembers_its_world(tmp_path):
+    log = record_games(tmp_path / 'store', tmp_path / 'game.snkr', 500)
+    stats = snake_analytics.analyze_store(tmp_path / 'store')
+    assert (stats.world.width, stats.world.height) == (8, 6), (
+        'По умолчанию статистика должна считаться в мире хранилища.'
+    )
+    assert stats.heatmap.sum() == len(log)
+    for world in (World(4, 3), World(16, 12)):
+        with pytest.raises(ValueError):
+            snake_analytics.analyze_store(tmp_path / 'store', world)
+
+
+def test_heads_outside_world_are_rejected(tmp_path):
+    record_games(tmp_path / 'store', tmp_path / 'game.snkr', 500)
+    with snake_storage.EpisodeStore(tmp_path / 'store') as store:
+        ticks = store.ticks.copy()
+    with pytest.raises(ValueError, match='вне мира'):
+        snake_analytics.SessionStats(World(4, 3)).update(ticks)
@@ -0,0 +1,72 @@
+import random
+
+import snake_arena
+from the_snake import LEFT, RIGHT, UP, World
+
+
+def _check_arena(arena):
+    counts = [0] * arena.world.cells
+    for snake in arena.snakes:
+        assert len(snake.positions) <= snake.length, (
+            'Длина тела змейки арены не должна превышать `length`.'
+        )
+        for x, y in snake.positions:
+            counts[y * arena.world.width + x] += 1
+    assert counts == list(arena.counts), (
+        'Общие счетчики должны совпадать с телами змеек.'
+    )
+    assert all(not counts[cell] for cell in arena.apples), (
+        'Яблоко не должно лежать на змейке.'
+    )
+    busy = sum(1 for count in counts if count) + len(arena.apples)
+    assert len(arena.free_cells) == arena.world.cells - busy, (
+        'Индекс свободных ячеек должен учитывать змеек и яблоки.'
+    )
+
+
+def test_arena_state_stays_consistent():
+    arena = snake_arena.Arena(
+        30, 10, World(20, 15), random.Random(1))
+    crashes = 0
+    for _ in range(300):
+        crashed = arena.step()
+        crashes += len(crashed)
+        for snake in crashed:
+            assert snake.length == 1, 'Разбившаяся змейка начинает заново.'
+        _check_arena(arena)
+    assert crashes and any(snake.length > 1 for snake in arena.snakes), (
+        'На тесной арене змейки должны и расти, и разбиваться.'
+    )
+
+
+def test_arena_head_to_head_crashes_both():
+    arena = snake_arena.Arena(
+        3, 0, World(10, 10), random.Random(2), policy=None)
+    first, second, third = arena.snakes
+    first.positions, first.direction = [(3, 5)], RIGHT
+    second.positions, second.direction = [(5, 5)], LEFT
+    third.positions, third.direction = [(0, 0), (0, 1), (0, 2)], UP
+    third.length = 3
+    crashed = arena.step()
+    assert crashed == [first, second], (
+        'Змейки, встретившиеся головами, разбиваются обе.'
+    )
+    assert third.get_head_position() == (0, 9), (
+        'Змейки арены проходят сквозь границы поля.'
+    )
+    _check_arena(arena)
+
+
+def test_arena_head_into_body_crashes_only_attacker():
+    arena = snake_arena.Arena(
+        2, 0, World(10, 10), random.Random(3), policy=None)
+    attacker, victim = arena.snakes
+    victim.positions = [(5, 4), (5, 5), (5, 6)]
+    victim.length, victim.direction = 3, UP
+    attacker.positions, attacker.direction = [(4, 5)], RIGHT
+    arena.step()
+    assert attacker.length == 1 and victim.length == 3, (
+        'Разбивается только змейка, врезавшаяся в чужое тело.'
+    )
+    assert victim.get_head_position() == (5, 3)
+    _check_arena(arena)
@@ -0,0 +1,56 @@
+import random
+
+import pytest
+
+import snake_autopilot
+from conftest import StopInfiniteLoop
+from the_snake import Apple, Snake, World, step
+
+
+@pytest.mark.parametrize('width, height', [(2, 2), (5, 1), (6, 5), (7, 5),
+                                           (5, 8), (9, 9)])
+def test_hamiltonian_cycle_visits_every_cell(width, height):
+    cycle = list(snake_autopilot.hamiltonian_cycle(width, height))
+    assert sorted(cycle) == list(range(width * height)), (
+        'Цикл должен проходить через каждую ячейку по одному разу.'
+    )
+    for cell, following in zip(cycle, cycle[1:] + cycle[:1]):
+        y, x = divmod(cell, width)
+        next_y, next_x = divmod(following, width)
+        dx = min((x - next_x) % width, (next_x - x) % width)
+        dy = min((y - next_y) % height, (next_y - y) % height)
+        assert dx + dy <= 1, 'Соседние ячейки цикла должны быть смежны.'
+
+
+@pytest.mark.parametrize('width, height', [(6, 5), (7, 5), (12, 9)])
+def test_autopilot_fills_board(width, height):
+    world = World(width, height)
+    ticks, collisions, _ = snake_autopilot.soak(world, seed=width)
+    assert collisions == 0, 'Автопилот не должен кусать себя.'
+    assert ticks < world.cells ** 2, (
+        'Автопилот должен заполнить поле целиком.'
+    )
+
+
+def test_arrow_keys_do_not_override_autopilot():
+    world = World(8, 6)
+    rng = random.Random(3)
+    snake = Snake(rng, world)
+    apple = Apple(snake.positions, rng, world)
+    pilot = snake_autopilot.Autopilot(snake, apple)
+    for _ in range(40):
+        direction = pilot.decide()
+        # Стрелка поперек хода автопилота всегда допустима для очереди
+        snake.input_queue.push((direction[1], direction[0]), snake.direction)
+        pilot.steer()
+        step(snake, apple)
+        assert snake.direction == direction, (
+            'Нажатая стрелка не должна перебивать автопилот.'
+        )
+
+
+@pytest.mark.timeout(1, method='thread')
+@pytest.mark.usefixtures('modified_clock')
+def test_main_runs_with_autopilot(_the_snake):
+    with pytest.raises(StopInfiniteLoop):
+        _the_snake.main(autopilot=snake_autopilot.Autopilot)
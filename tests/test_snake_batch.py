@@ -0,0 +1,43 @@
+import numpy as np
+
+import snake_batch
+
+
+def _body_cells(batch, game):
+    capacity = batch.body.shape[1]
+    indexes = (
+        batch.head_index[game] - np.arange(batch.size[game])
+    ) % capacity
+    return batch.body[game, indexes]
+
+
+def test_batch_state_stays_consistent():
+    batch = snake_batch.BatchSnake(64, width=6, height=5, seed=1)
+    rng = np.random.default_rng(1)
+    events = []
+    for _ in range(500):
+        events.extend(batch.step(rng.integers(-1, 4, size=64)))
+        occupancy = batch.cells_occupancy
+        for game in range(64):
+            cells = _body_cells(batch, game)
+            assert len(set(cells)) == len(cells), (
+                'Тело змейки не должно пересекаться само с собой.'
+            )
+            assert occupancy[game].sum() == batch.size[game], (
+                'Сетка занятости должна совпадать с телом змейки.'
+            )
+            assert occupancy[game, batch.apple[game]] == 0, (
+                'Яблоко не должно лежать на змейке.'
+            )
+    assert {snake_batch.EAT_CODE, snake_batch.COLLISION_CODE} <= set(
+        events), 'Убедитесь, что змейки едят яблоки и кусают себя.'
+
+
+def test_batch_is_reproducible():
+    first = snake_batch.BatchSnake(8, seed=7)
+    second = snake_batch.BatchSnake(8, seed=7)
+    for _ in range(100):
+        first.step()
+        second.step()
+    assert np.array_equal(first.body, second.body)
+    assert np.array_equal(first.apple, second.apple)
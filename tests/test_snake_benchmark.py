@@ -0,0 +1,77 @@
+import json
+import sys
+
+import pytest
+
+import snake_benchmark
+
+
+def result(name, ns_per_op, **params):
+    return {'name': name, 'params': params, 'ns_per_op': ns_per_op}
+
+
+def test_result_key_does_not_depend_on_param_order():
+    first = result('world_move', 10, length=5, grid=[32, 24])
+    second = {'name': 'world_move', 'ns_per_op': 20,
+              'params': {'grid': [32, 24], 'length': 5}}
+    assert snake_benchmark.result_key(first) == (
+        'world_move[grid=[32, 24],length=5]'
+    )
+    assert snake_benchmark.result_key(second) == (
+        snake_benchmark.result_key(first)
+    ), 'Ключ результата не должен зависеть от порядка параметров.'
+
+
+def test_compare_reports_only_slowdowns_beyond_tolerance():
+    baseline = {'results': [
+        result('snake_move', 100, length=1),
+        result('snake_move', 100, length=2),
+        result('apple_draw', 100),
+    ]}
+    results = [
+        result('snake_move', 119, length=1),
+        result('snake_move', 121, length=2),
+        result('apple_draw', 50),
+        result('batch_step', 1000, games=1),
+    ]
+    assert snake_benchmark.compare(results, baseline, 0.2) == [
+        ('snake_move[length=2]', 100, 121),
+    ], 'Регрессией считается только замедление больше допуска.'
+
+
+@pytest.mark.parametrize('slowdown, code', ((1.1, None), (2, 1)))
+def test_main_exits_with_error_on_regression(
+    tmp_path, monkeypatch, slowdown, code
+):
+    baseline = tmp_path / 'base.json'
+    baseline.write_text(json.dumps(
+        {'results': [result('snake_move', 100, length=1)]}))
+    monkeypatch.setattr(snake_benchmark, 'run_benchmarks', lambda sizes: [
+        result('snake_move', 100 * slowdown, length=1)])
+    monkeypatch.setattr(sys, 'argv', [
+        'snake_benchmark.py', '--baseline', str(baseline),
+        '--output', str(tmp_path / 'bench.json')])
+    if code is None:
+        snake_benchmark.main()
+    else:
+        with pytest.raises(SystemExit) as exit_info:
+            snake_benchmark.main()
+        assert exit_info.value.code == code, (
+            'При регрессии скрипт должен завершаться с кодом 1.'
+        )
+    report = json.loads((tmp_path / 'bench.json').read_text())
+    assert report['results'][0]['ns_per_op'] == 100 * slowdown
+
+
+def test_frame_snake_moves_without_biting_itself(_the_snake):
+    snake, apple, frame = snake_benchmark.make_frame()
+    length = snake.length
+    frame()
+    assert snake.length in (length, length + 1), (
+        'Первый такт кадра не должен приводить к укусу.'
+    )
+    for _ in range(2000):
+        frame()
+    assert snake.length >= length, (
+        'Змейка кадра должна идти по зигзагу, не кусая себя.'
+    )
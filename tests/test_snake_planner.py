@@ -0,0 +1,177 @@
+import random
+
+import pytest
+
+import snake_planner
+from conftest import StopInfiniteLoop
+from the_snake import COLLISION, DOWN, RIGHT, Apple, Snake, World, step
+
+
+def node_body(planner, node):
+    """Возвращает ячейки тела узла от головы к хвосту."""
+    return [
+        planner._cell_at(moves, node)
+        for moves in range(node.moves, node.moves - node.size, -1)
+    ]
+
+
+def full_hash(planner, node):
+    """Считает хеш Зобриста узла заново по его телу."""
+    occupied, heads, apples, lengths = planner._keys
+    hash_ = heads[node.head] ^ lengths[node.length]
+    for cell in node_body(planner, node):
+        hash_ ^= occupied[cell]
+    if not node.eaten:
+        hash_ ^= apples[planner._apple]
+    return hash_
+
+
+def full_order(planner, node):
+    """Считает хеш укладки узла заново по его телу."""
+    occupied = planner._keys[0]
+    order = 0
+    for moves in range(node.moves, node.moves - node.size, -1):
+        order += occupied[planner._cell_at(moves, node)] * (
+            snake_planner.ORDER_BASE ** moves)
+    return order & snake_planner.ORDER_MASK
+
+
+def test_search_states_follow_game_rules():
+    world = World(10, 8)
+    rng = random.Random(4)
+    snake = Snake(rng, world)
+    apple = Apple(snake.positions, rng, world)
+    planner = snake_planner.Planner(snake, apple)
+    checked = 0
+    for _ in range(3000):
+        root = planner._root()
+        children = {
+            child.direction: child for child in planner._children(root)}
+        direction = rng.choice(snake_planner.DIRECTIONS)
+        if direction not in children:
+            direction = snake.direction
+        event = step(snake, apple, direction)
+        child = children.get(direction)
+        if child is None:
+            assert event == COLLISION, (
+                'Планировщик отбросил ход, после которого змейка жива.'
+            )
+            continue
+        assert node_body(planner, child) == list(snake.body.head_cells()), (
+            'Тело узла не совпадает с телом змейки после step.'
+        )
+        assert child.length == snake.length
+        assert child.hash == full_hash(planner, child), (
+            'Хеш Зобриста после хода должен совпадать с посчитанным заново.'
+        )
+        assert child.order == full_order(planner, child), (
+            'Хеш укладки после хода должен совпадать с посчитанным заново.'
+        )
+        checked += 1
+    assert checked > 2000
+
+
+def test_transpositions_share_a_hash():
+    world = World(10, 8)
+    snake = Snake(random.Random(1), world)
+    apple = Apple(snake.positions, random.Random(1), world)
+    apple.position = (0, 0)
+    snake.direction = RIGHT
+    planner = snake_planner.Planner(snake, apple)
+    root = planner._root()
+
+    def follow(*directions):
+        node = root
+        for direction in directions:
+            node = next(child for child in planner._children(node)
+                        if child.direction == direction)
+        return node
+
+    right_down = follow(RIGHT, DOWN)
+    down_right = follow(DOWN, RIGHT)
+    assert right_down.head == down_right.head
+    assert right_down.hash == down_right.hash, (
+        'Одно состояние, достигнутое разными путями, должно иметь один хеш.'
+    )
+
+
+def test_table_key_depends_on_body_order():
+    world = World(10, 8)
+    snake = Snake(random.Random(1), world)
+    apple = Apple(snake.positions, random.Random(1), world)
+    planner = snake_planner.Planner(snake, apple)
+    snake.length = 4
+    snake.positions = [(1, 0), (0, 0), (0, 1), (1, 1)]
+    clockwise = planner._root()
+    snake.positions = [(1, 0), (1, 1), (0, 1), (0, 0)]
+    counterclockwise = planner._root()
+    assert clockwise.hash == counterclockwise.hash
+    assert planner.order_key(clockwise) != planner.order_key(
+        counterclockwise
+    ), 'Тела, уложенные в разном порядке, не должны делить оценку.'
+    shifted = next(planner._children(counterclockwise))
+    snake.positions = [
+        divmod(cell, world.width)[::-1] for cell in node_body(planner, shifted)
+    ]
+    assert planner.order_key(shifted) == planner.order_key(planner._root()), (
+        'Ключ таблицы не должен зависеть от глубины узла.'
+    )
+
+
+def test_transposition_table_evicts_least_recently_used():
+    table = snake_planner.TranspositionTable(size=2)
+    table.put(1, 10)
+    table.put(2, 20)
+    assert table.get(1) == 10
+    table.put(3, 30)
+    assert table.get(2) is None, 'Вытесняться должно давнее состояние.'
+    assert table.get(1) == 10 and len(table) == 2
+    assert (table.hits, table.misses) == (2, 1)
+
+
+def test_expired_deadline_skips_evaluation():
+    world = World(10, 8)
+    snake = Snake(random.Random(1), world)
+    apple = Apple(snake.positions, random.Random(1), world)
+    snake.length = 4
+    snake.positions = [(1, 0), (0, 0), (0, 1), (1, 1)]
+    snake.direction = RIGHT
+    apple.position = (1, 3)
+    planner = snake_planner.Planner(snake, apple)
+    direction = planner.decide(deadline=0)
+    assert planner.table.misses == 0 and planner.depth == 0, (
+        'После срока поиск не должен оценивать ни одного узла.'
+    )
+    assert direction == DOWN, (
+        'Без времени на поиск выбирается ход без укуса к яблоку.'
+    )
+
+
+def test_planner_eats_apples():
+    report = snake_planner.evaluate(World(12, 10), seed=2, ticks=500)
+    assert report['apples'] > 30, 'Планировщик должен доходить до яблок.'
+    assert report['collisions'] <= 1
+
+
+def test_arrow_keys_do_not_override_planner():
+    world = World(8, 6)
+    rng = random.Random(3)
+    snake = Snake(rng, world)
+    apple = Apple(snake.positions, rng, world)
+    planner = snake_planner.Planner(snake, apple)
+    for _ in range(20):
+        snake.input_queue.push(
+            (snake.direction[1], snake.direction[0]), snake.direction)
+        planner.steer()
+        direction = snake.next_direction
+        step(snake, apple)
+        assert snake.direction == direction, (
+            'Нажатая стрелка не должна перебивать планировщик.'
+        )
+
+
+@pytest.mark.timeout(1, method='thread')
+@pytest.mark.usefixtures('modified_clock')
+def test_main_runs_with_planner(_the_snake):
+    with pytest.raises(StopInfiniteLoop):
+        _the_snake.main(autopilot=snake_planner.Planner)
@@ -0,0 +1,60 @@
+import random
+
+import pygame
+
+import snake_profiler
+
+
+def test_profiler_times_hot_paths(_the_snake, snake, apple):
+    original_move = _the_snake.Snake.move
+    profiler = snake_profiler.Profiler()
+    with profiler:
+        assert _the_snake.Snake.move is not original_move
+        for _ in range(5):
+            profiler.start_frame()
+            _the_snake.step(snake, apple)
+            profiler.end_frame()
+    assert _the_snake.Snake.move is original_move, (
+        'После снятия профилировщика должны вызываться исходные функции.'
+    )
+    summary = profiler.summary()
+    assert summary['frames'] == 5
+    assert summary['sections']['move']['max'] > 0, (
+        'Убедитесь, что профилировщик замеряет `Snake.move`.'
+    )
+
+
+def test_profiler_times_queued_turns(_the_snake, snake, apple):
+    profiler = snake_profiler.Profiler()
+    with profiler:
+        profiler.start_frame()
+        snake.input_queue.push(_the_snake.UP, snake.direction)
+        _the_snake.run_tick(snake, apple)
+        profiler.end_frame()
+    assert profiler.summary()['sections']['next_turn']['max'] > 0, (
+        'Убедитесь, что профилировщик замеряет выбор поворота в `run_tick`.'
+    )
+
+
+def test_overlay_survives_viewport_repaints(_the_snake, monkeypatch):
+    # Сводка выводится заново только из кэша: интервал не истекает
+    monkeypatch.setattr(snake_profiler, 'OVERLAY_INTERVAL', 3600)
+    world = _the_snake.World(100, 100)
+    rng = random.Random(1)
+    snake = _the_snake.Snake(rng, world)
+    apple = _the_snake.Apple(snake.positions, rng, world)
+    renderer = _the_snake.ViewportRenderer(_the_snake.get_screen())
+    profiler = snake_profiler.Profiler()
+    for _ in range(3):
+        profiler.start_frame()
+        _the_snake.step(snake, apple)
+        renderer.draw(apple, snake)
+        profiler.end_frame(renderer, apple, snake)
+        pixels = pygame.surfarray.pixels3d(renderer.surface)
+        overlay = pixels[:profiler._overlay_rect.right,
+                         :profiler._overlay_rect.bottom]
+        assert (overlay == snake_profiler.OVERLAY_COLOR).all(axis=2).any(), (
+            'Сводка профилировщика должна оставаться на экране после '
+            'перерисовки окна целиком.'
+        )
+        del pixels, overlay
@@ -0,0 +1,54 @@
+import random
+import sys
+
+import pytest
+
+import snake_replay
+
+
+def _record(path, seed, ticks):
+    moves = random.Random(seed + 1)
+    snake, apple = snake_replay.new_game(seed)
+    with snake_replay.ReplayWriter(path, seed) as writer:
+        for _ in range(ticks):
+            direction = moves.choice(snake_replay.DIRECTIONS + (None,) * 4)
+            writer.record(direction)
+            snake_replay.step(snake, apple, direction)
+        writer.close(snake, apple)
+    return snake, apple
+
+
+def test_replay_restores_final_state(tmp_path):
+    path = tmp_path / 'game.snkr'
+    snake, apple = _record(path, seed=42, ticks=3000)
+    assert path.stat().st_size == (
+        snake_replay.HEADER.size + 3000 + 1 + snake_replay.TRAILER.size
+    ), 'Каждый такт должен занимать в записи один байт.'
+    replayed_snake, replayed_apple = snake_replay.replay(path)
+    assert replayed_snake.positions == snake.positions
+    assert replayed_apple.position == apple.position
+
+
+def test_replay_detects_mismatch(tmp_path):
+    path = tmp_path / 'game.snkr'
+    _record(path, seed=7, ticks=500)
+    data = bytearray(path.read_bytes())
+    data[snake_replay.HEADER.size + 1:-snake_replay.TRAILER.size - 1] = (
+        bytes([snake_replay.NO_INPUT]) * (499)
+    )
+    path.write_bytes(bytes(data))
+    with pytest.raises(snake_replay.ReplayMismatch):
+        snake_replay.replay(path)
+
+
+@pytest.mark.parametrize('seed', ('-1', str(1 << 64)))
+def test_record_rejects_seed_outside_header(tmp_path, monkeypatch, seed):
+    monkeypatch.setattr(sys, 'argv', [
+        'snake_replay.py', 'record', str(tmp_path / 'game.snkr'),
+        '--seed', seed])
+    with pytest.raises(SystemExit) as exit_info:
+        snake_replay.main()
+    assert exit_info.value.code == 2, (
+        'seed вне заголовка записи должен отклоняться разбором аргументов.'
+    )
+    assert not (tmp_path / 'game.snkr').exists()
@@ -0,0 +1,33 @@
+import threading
+
+import numpy as np
+
+import snake_rollout
+
+
+def test_rollout_does_not_depend_on_workers():
+    results = [
+        snake_rollout.RolloutRunner(10, workers, 8, 6, seed=3).run(200)
+        for workers in (1, 3)
+    ]
+    assert all(result.completed for result in results)
+    assert np.array_equal(results[0].stats, results[1].stats), (
+        'Результат симуляции не должен зависеть от числа процессов.'
+    )
+    assert (results[0].stats[:, snake_rollout.TICKS] == 200).all()
+
+
+def test_runner_runs_again_after_stop():
+    runner = snake_rollout.RolloutRunner(4, 2, 8, 6, seed=1)
+    timer = threading.Timer(0.5, runner.stop)
+    timer.start()
+    try:
+        stopped = runner.run(10 ** 9)
+    finally:
+        timer.cancel()
+    assert not stopped.completed
+    result = runner.run(100)
+    assert result.completed, (
+        'Остановка прошлого запуска не должна прерывать следующий.'
+    )
+    assert (result.stats[:, snake_rollout.TICKS] == 100).all()
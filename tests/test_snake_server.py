@@ -0,0 +1,76 @@
+import asyncio
+import random
+from collections import deque
+
+import snake_server
+from the_snake import World
+
+HOST = '127.0.0.1'
+
+
+def _server_state(server):
+    width = server.arena.world.width
+    bodies, lengths = {}, {}
+    for slot, snake in enumerate(server.slots):
+        if snake is not None:
+            bodies[slot] = deque(y * width + x for x, y in snake.body)
+            lengths[slot] = snake.length
+    return bodies, lengths, set(server.arena.apples)
+
+
+async def _wait(condition, timeout=10):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        assert loop.time() < deadline, 'Клиенты не дождались сервера.'
+        await asyncio.sleep(0.01)
+
+
+async def _scenario():
+    server = snake_server.GameServer(
+        World(24, 16), apples=6, rng=random.Random(4))
+    listener = await server.serve(HOST, 0)
+    port = listener.sockets[0].getsockname()[1]
+    clients = []
+
+    async def connect(count):
+        for _ in range(count):
+            state = snake_server.ClientState()
+            task = asyncio.create_task(snake_server.simulate_client(
+                HOST, port, random.Random(len(clients)), 0.3, state))
+            clients.append((task, state))
+        await _wait(lambda: all(state.slot is not None
+                                for _, state in clients))
+
+    await connect(30)
+    for tick in range(150):
+        if tick == 50:
+            for task, _ in clients[:5]:
+                task.cancel()  # Часть клиентов уходит
+            await _wait(lambda: len(server.connections) == 25)
+        if tick == 80:
+            await connect(10)  # Новые клиенты занимают свободные слоты
+        server.tick()
+        await asyncio.sleep(0)
+    active = [state for task, state in clients if not task.done()]
+    await _wait(lambda: all(state.ticks == server.ticks for state in active))
+    bodies, lengths, apples = _server_state(server)
+    for state in active:
+        assert (state.bodies, state.lengths, state.apples) == (
+            bodies, lengths, apples), (
+            'Клиент должен восстанавливать состояние арены по изменениям.'
+        )
+    assert len(server.slots) == 35, 'Освободившиеся слоты занимаются снова.'
+    listener.close()
+    for task, _ in clients:
+        task.cancel()
+    await asyncio.gather(*(task for task, _ in clients),
+                         return_exceptions=True)
+    return server
+
+
+def test_clients_mirror_server_state():
+    server = asyncio.run(_scenario())
+    assert server.bytes_sent < server.ticks * 35 * 100, (
+        'Такт должен передавать изменения, а не позиции целиком.'
+    )
@@ -0,0 +1,178 @@
+import pickle
+import random
+import timeit
+import tracemalloc
+
+import pytest
+
+import snake_snapshot
+from the_snake import RIGHT, UP, World
+
+# Маленькое поле: змейка часто ест, кусает себя и растет.
+WORLD = World(12, 10)
+
+
+def play(snake, apple, ticks, seed):
+    """Играет случайными поворотами и возвращает состояния по тактам."""
+    rng = random.Random(seed)
+    states = []
+    for _ in range(ticks):
+        snake_snapshot.step(
+            snake, apple, rng.choice(snake_snapshot.DIRECTIONS + (None,) * 3))
+        states.append((list(snake.positions), snake.direction, snake.length,
+                       apple.position))
+    return states
+
+
+def new_game(seed=5, world=WORLD):
+    rng = random.Random(seed)
+    snake = snake_snapshot.Snake(rng, world)
+    return snake, snake_snapshot.Apple(snake.positions, rng, world)
+
+
+def test_bytes_round_trip_continues_the_same_game(tmp_path):
+    snake, apple = new_game()
+    play(snake, apple, 3000, seed=1)
+    snake.next_direction = UP
+    snake_snapshot.save(tmp_path / 'game.snks', snake, apple)
+    restored, restored_apple = snake_snapshot.load(
+        tmp_path / 'game.snks').new_game()
+    assert list(restored.positions) == list(snake.positions)
+    assert restored.next_direction == UP
+    assert play(restored, restored_apple, 3000, seed=2) == (
+        play(snake, apple, 3000, seed=2)
+    ), 'Партия из снимка должна продолжаться так же, как исходная.'
+
+
+def test_checkpoints_rewind_to_any_tick():
+    snake, apple = new_game()
+    checkpoints = snake_snapshot.Checkpoints(snake, apple)
+    rng = random.Random(3)
+    expected = []
+    for _ in range(2000):
+        checkpoints.capture()
+        expected.append(list(snake.positions))
+        snake_snapshot.step(
+            snake, apple, rng.choice(snake_snapshot.DIRECTIONS + (None,) * 3))
+    for index in (0, 1, 999, 1500, 1999):
+        assert list(checkpoints[index].body_cells()) == [
+            y * WORLD.width + x for x, y in expected[index]
+        ], 'Тело в снимке не совпадает с телом на такте снимка.'
+    data = checkpoints[1500].to_bytes()
+    checkpoints.rewind(500)
+    assert list(snake.positions) == expected[1500]
+    future = play(snake, apple, 200, seed=4)
+    restored, restored_apple = snake_snapshot.Snapshot.from_bytes(
+        data).new_game()
+    assert play(restored, restored_apple, 200, seed=4) == future, (
+        'Снимок из прошлого истории должен сохраняться в байты верно.'
+    )
+    checkpoints.rewind(1)
+    assert play(snake, apple, 200, seed=4) == future, (
+        'Перемотка должна восстанавливать генератор и индекс яблока.'
+    )
+
+
+def test_checkpoints_share_the_body_of_a_long_snake():
+    world = World(100, 100)
+    snake, apple = new_game(world=world)
+    snake.positions = [(x, y) for y in range(50) for x in (
+        range(100) if y % 2 == 0 else range(99, -1, -1))][::-1]
+    snake.length = len(snake.positions)
+    snake.direction = RIGHT
+    snake.move()
+    checkpoints = snake_snapshot.Checkpoints(snake, apple)
+    for _ in range(1000):
+        checkpoints.capture()
+        snake.move()
+    chunks = {
+        id(chunk) for snapshot in checkpoints for chunk in snapshot._chunks
+    }
+    assert len(chunks) * snake_snapshot.TRAIL_CHUNK < 3 * snake.length, (
+        'Снимки должны делить блоки тела, а не копировать его.'
+    )
+    snapshot = checkpoints[-1]
+    data = snapshot.to_bytes()
+    assert snake_snapshot.Snapshot.from_bytes(data).size == snake.length
+    state = (list(snake.positions), snake.direction, snake.length,
+             apple.position, snake.rng.getstate())
+    fast = min(timeit.repeat(snapshot.to_bytes, number=20, repeat=5))
+    slow = min(timeit.repeat(lambda: pickle.dumps(state), number=20,
+                             repeat=5))
+    assert fast * 2 < slow, (
+        'Двоичный снимок должен записываться быстрее pickle.'
+    )
+
+
+def test_checkpoints_of_a_large_board_store_only_changes():
+    world = World(1000, 1000)
+    snake, apple = new_game(world=world)
+    checkpoints = snake_snapshot.Checkpoints(snake, apple, limit=1000)
+    rng = random.Random(6)
+    tracemalloc.start()
+    expected = []
+    for _ in range(1500):
+        checkpoints.capture()
+        expected.append((list(snake.positions), apple.position))
+        snake_snapshot.step(
+            snake, apple, rng.choice(snake_snapshot.DIRECTIONS + (None,) * 3))
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    assert used < 4 * world.cells, (
+        'Снимки должны хранить отличия индекса, а не копии поля.'
+    )
+    assert len(snake.body.free_cells.journal) < 4 * 1000, (
+        'Журнал старше всех снимков должен отбрасываться.'
+    )
+    checkpoints.rewind(700)
+    assert (list(snake.positions), apple.position) == expected[800]
+    future = play(snake, apple, 300, seed=8)
+    checkpoints.rewind(1)
+    assert play(snake, apple, 300, seed=8) == future, (
+        'Перемотка по журналу должна восстанавливать индекс яблока.'
+    )
+    restored, restored_apple = checkpoints[-1].new_game()
+    checkpoints.rewind(1)
+    assert play(restored, restored_apple, 300, seed=8) == future, (
+        'Снимок истории должен переноситься в новую игру.'
+    )
+    stale = checkpoints[-1]
+    checkpoints.rewind(2)
+    with pytest.raises(ValueError):
+        stale.restore(snake, apple)
+
+
+def test_snapshot_of_a_sparse_index_round_trips():
+    world = World(1100, 1000)
+    snake, apple = new_game(world=world)
+    checkpoints = snake_snapshot.Checkpoints(snake, apple)
+    play(snake, apple, 300, seed=9)
+    checkpoints.capture()
+    data = checkpoints[-1].to_bytes()
+    future = play(snake, apple, 300, seed=10)
+    restored, restored_apple = snake_snapshot.Snapshot.from_bytes(
+        data).new_game()
+    assert play(restored, restored_apple, 300, seed=10) == future, (
+        'Снимок большого поля с разреженным индексом должен продолжаться.'
+    )
+
+
+def test_frequent_rewinds_keep_history_checks_small():
+    snake, apple = new_game()
+    checkpoints = snake_snapshot.Checkpoints(snake, apple, limit=50)
+    rng = random.Random(11)
+    for tick in range(20_000):
+        checkpoints.capture()
+        snake_snapshot.step(
+            snake, apple, rng.choice(snake_snapshot.DIRECTIONS + (None,) * 3))
+        if tick % 3 == 2:
+            stale = checkpoints[-1]
+            checkpoints.rewind(2)
+    assert len(checkpoints._cut_lengths) <= len(checkpoints), (
+        'Перемотки старше всех снимков не должны накапливаться.'
+    )
+    with pytest.raises(ValueError):
+        stale.restore(snake, apple)
+    checkpoints.rewind(len(checkpoints))
+    assert list(checkpoints[0].body_cells()) == list(
+        snake.body.head_cells())
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+import snake_replay
+import snake_storage
+from the_snake import World
+
+
+def test_store_reads_recorded_episodes(tmp_path):
+    snake, apple = snake_replay.new_game(5)
+    events = []
+    with snake_storage.EpisodeWriter(tmp_path) as writer:
+        for tick in range(3000):
+            direction = snake_replay.DIRECTIONS[tick // 3 % 4]
+            event = snake_replay.step(snake, apple, direction)
+            writer.record(snake, apple, event)
+            events.append(snake_storage.EVENTS.index(event))
+    with snake_storage.EpisodeStore(tmp_path) as store:
+        assert len(store.ticks) == 3000
+        assert np.array_equal(store.ticks['event'], events)
+        assert sum(len(store[i]) for i in range(len(store))) == 3000, (
+            'Партии должны покрывать все записанные такты.'
+        )
+        assert store[0].base is not None, (
+            'Партия должна быть представлением, а не копией данных.'
+        )
+        last = store.ticks[-1]
+        assert (int(last['head_x']), int(last['head_y'])) == (
+            snake.get_head_position()
+        )
+
+
+def test_store_rejects_games_from_another_world(tmp_path):
+    snake, apple = snake_replay.new_game(5, World(8, 6))
+    with snake_storage.EpisodeWriter(tmp_path) as writer:
+        writer.record(snake, apple, snake_replay.step(snake, apple))
+    with snake_storage.EpisodeStore(tmp_path) as store:
+        assert (store.world.width, store.world.height) == (8, 6)
+    snake, apple = snake_replay.new_game(5, World(16, 12))
+    with snake_storage.EpisodeWriter(tmp_path) as writer:
+        with pytest.raises(ValueError):
+            writer.record(snake, apple, snake_replay.step(snake, apple))
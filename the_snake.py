@@ -17,9 +17,36 @@
 """
 
 
-from random import choice, randint
+import importlib.util
+import random
+import sys
+import time
+from array import array
+from collections import Counter, OrderedDict, deque
 
-import pygame
+
+def lazy_import(name):
+    """
+    Возвращает модуль name, который загрузится при первом обращении.
+
+    Импорт pygame занимает большую часть времени запуска, а логике игры,
+    воспроизведению записей и рабочим процессам он не нужен.
+    Отсутствующий модуль вызывает ModuleNotFoundError сразу, как import.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f'No module named {name!r}', name=name)
+    spec.loader = importlib.util.LazyLoader(spec.loader)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+pygame = lazy_import('pygame')
 
 # Константы для размеров поля и сетки:
 SCREEN_WIDTH, SCREEN_HEIGHT = 640, 480
@@ -32,6 +59,8 @@ UP = (0, -1)
 DOWN = (0, 1)
 LEFT = (-1, 0)
 RIGHT = (1, 0)
+# Все направления; номер направления в кортеже — его код в записях:
+DIRECTIONS = (UP, DOWN, LEFT, RIGHT)
 
 # Цвет фона - черный:
 BOARD_BACKGROUND_COLOR = (0, 0, 0)
@@ -45,38 +74,750 @@ APPLE_COLOR = (255, 0, 0)
 # Цвет змейки
 SNAKE_COLOR = (0, 255, 0)
 
-# Скорость движения змейки:
+# Скорость движения змейки (игровых тактов в секунду):
 SPEED = 20
 
-# Настройка игрового окна:
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), 0, 32)
+# Частота отрисовки кадров:
+FPS = 60
+
+# Сколько тактов можно догнать за один кадр при нагрузке:
+MAX_TICKS_PER_FRAME = 10
+
+# Сколько поворотов можно нажать наперед:
+INPUT_QUEUE_SIZE = 3
+
+# Сколько последних задержек ввода учитывать в статистике:
+LATENCY_SAMPLES = 256
+
+# Начальная емкость буфера тела змейки в сегментах:
+SNAKE_BODY_CAPACITY = 64
+
+# Наибольшее число ячеек поля, для которого индексы и счетчики ячеек
+# хранятся плотными массивами; у больших полей — словарями изменений:
+DENSE_CELLS_LIMIT = 1 << 20
+
+# Перерисовывать только изменившиеся ячейки вместо всего экрана:
+DIRTY_RENDERING = True
+
+# Сторона блока мира в ячейках при отрисовке мира больше окна:
+CHUNK_SIZE = 8
+
+# Сколько отрисованных блоков мира хранить:
+CHUNK_CACHE_SIZE = 256
+
+# События игрового такта:
+MOVE = 'move'
+EAT = 'eat'
+COLLISION = 'collision'
+WIN = 'win'
+
+
+def get_screen():
+    """Возвращает игровое окно, создавая его при первом обращении."""
+    screen = globals().get('screen')
+    if screen is None:
+        # Настройка игрового окна:
+        screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), 0, 32)
+        # Заголовок окна игрового поля:
+        pygame.display.set_caption('Змейка')
+        globals()['screen'] = screen
+        surfaces.clear()  # Поверхности до окна не приведены к его формату
+    return screen
+
+
+def get_clock():
+    """Возвращает игровые часы, создавая их при первом обращении."""
+    clock = globals().get('clock')
+    if clock is None:
+        # Настройка времени:
+        clock = globals()['clock'] = pygame.time.Clock()
+    return clock
+
+
+def __getattr__(name):
+    """
+    Лениво создает screen, clock и KEY_DIRECTIONS при первом обращении.
+
+    Модуль импортируется без открытия окна и без загрузки pygame,
+    поэтому игровую логику можно запускать без дисплея.
+    """
+    if name == 'screen':
+        return get_screen()
+    if name == 'clock':
+        return get_clock()
+    if name == 'KEY_DIRECTIONS':
+        return get_key_directions()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+class BoardFull(Exception):
+    """Свободных ячеек не осталось: змейка заполнила все поле."""
+
+
+class World:
+    """
+    Игровой мир: тороидальное поле width x height в ячейках.
+
+    Позиции объектов хранятся в ячейках (x, y). Мир может быть больше
+    окна: тогда окно показывает его часть (ViewportRenderer).
+    """
+
+    __slots__ = ('width', 'height', 'cells', 'center')
+
+    def __init__(self, width=GRID_WIDTH, height=GRID_HEIGHT):
+        """
+        Устанавливает все необходимые атрибуты объекта World.
+
+        Параметры
+        ----------
+        width, height : int
+                размеры мира в ячейках
+        """
+        self.width = width
+        self.height = height
+        self.cells = width * height
+        self.center = (width // 2, height // 2)
+
+    def __repr__(self):
+        """Возвращает строковое представление мира."""
+        return f'{type(self).__name__}({self.width}, {self.height})'
+
+    def fits_screen(self):
+        """Проверяет, помещается ли мир в окно целиком."""
+        return self.width <= GRID_WIDTH and self.height <= GRID_HEIGHT
+
+
+def board_cells(world=None):
+    """Возвращает позиции всех ячеек игрового поля."""
+    if world is None:
+        world = World()
+    return [
+        (x, y) for y in range(world.height) for x in range(world.width)
+    ]
+
+
+class _Identity(dict):
+    """Словарь, в котором отсутствующий номер отображается сам в себя."""
+
+    __slots__ = ()
+
+    def __missing__(self, key):
+        """Возвращает отсутствующий номер как значение."""
+        return key
+
+
+def _identity_cells(count):
+    """Возвращает тождественное отображение номеров ячеек 0..count-1."""
+    if count <= DENSE_CELLS_LIMIT:
+        return array('I', range(count))
+    return _Identity()  # Хранятся только переставленные номера
+
+
+def cell_counts(count):
+    """
+    Возвращает нулевые счетчики сегментов для поля из count ячеек.
+
+    ----------
+    До DENSE_CELLS_LIMIT ячеек — array('H') размером с поле, иначе
+    Counter, который хранит только ячейки, где побывала змейка.
+    """
+    if count <= DENSE_CELLS_LIMIT:
+        return array('H', bytes(2 * count))
+    return Counter()
+
+
+class FreeCells:
+    """
+    Индекс свободных ячеек поля.
+
+    Ячейки хранятся номерами y * width + x в массиве array('I'), свободные
+    — в его начале. Занятая ячейка переставляется с последней свободной,
+    освобожденная — с первой занятой, поэтому добавление, удаление и
+    выбор случайной свободной ячейки выполняются за O(1). Второй массив
+    хранит позицию каждой ячейки в первом. Оба массива выделяются один
+    раз, и память не растет, как бы долго ни двигалась змейка.
+    У поля больше DENSE_CELLS_LIMIT ячеек вместо массивов — словари,
+    хранящие только переставленные ячейки: огромный мир создается
+    мгновенно, а память растет лишь с числом занимавшихся ячеек.
+
+    Если задан журнал (journal, array('Q')), каждая перестановка
+    дописывается в него одним словом: позиция * 2 + 1 для освобождения
+    и позиция * 2 для занятия. rewind_journal отменяет перестановки с
+    конца журнала, так что вернуться к прошлому порядку стоит
+    O(перестановок), а не O(размера поля).
+    """
+
+    __slots__ = ('width', 'height', 'journal', '_free', '_cells', '_index')
+
+    def __init__(self, width=GRID_WIDTH, height=GRID_HEIGHT):
+        """
+        Устанавливает все необходимые атрибуты объекта FreeCells.
+
+        Параметры
+        ----------
+        width, height : int
+                размеры поля в ячейках; сначала все ячейки свободны
+        """
+        self.width = width
+        self.height = height
+        self.journal = None  # Журнал перестановок, если он ведется
+        self._free = width * height  # Число свободных ячеек
+        self._cells = _identity_cells(self._free)  # Позиция -> номер
+        self._index = _identity_cells(self._free)  # Номер ячейки -> позиция
+
+    def __len__(self):
+        """Возвращает число свободных ячеек."""
+        return self._free
+
+    def __contains__(self, cell):
+        """Проверяет, свободна ли ячейка."""
+        return self._index[cell[1] * self.width + cell[0]] < self._free
+
+    def add_cell(self, number):
+        """Отмечает свободной ячейку с номером number."""
+        position = self._index[number]
+        if position >= self._free:
+            cells = self._cells
+            first = cells[self._free]
+            cells[position], cells[self._free] = first, number
+            self._index[first], self._index[number] = position, self._free
+            self._free += 1
+            if self.journal is not None:
+                self.journal.append(position << 1 | 1)
+
+    def discard_cell(self, number):
+        """Отмечает занятой ячейку с номером number."""
+        position = self._index[number]
+        if position < self._free:
+            self._free -= 1
+            cells = self._cells
+            last = cells[self._free]
+            cells[position], cells[self._free] = last, number
+            self._index[last], self._index[number] = position, self._free
+            if self.journal is not None:
+                self.journal.append(position << 1)
+
+    def add(self, cell):
+        """Отмечает ячейку свободной."""
+        self.add_cell(cell[1] * self.width + cell[0])
+
+    def discard(self, cell):
+        """Отмечает ячейку занятой, переставляя на ее место последнюю."""
+        self.discard_cell(cell[1] * self.width + cell[0])
+
+    def choice(self, rng=random):
+        """
+        Возвращает случайную свободную ячейку.
+
+        ----------
+        rng — генератор случайных чисел с методом randrange.
+        Вызывает BoardFull, если свободных ячеек нет.
+        """
+        y, x = divmod(self.choice_cell(rng), self.width)
+        return x, y
+
+    def choice_cell(self, rng=random):
+        """Возвращает номер случайной свободной ячейки."""
+        if not self._free:
+            raise BoardFull('На поле не осталось свободных ячеек.')
+        return self._cells[rng.randrange(self._free)]
+
+    def rewind_journal(self, length):
+        """Отменяет перестановки журнала, оставляя первые length записей."""
+        journal = self.journal
+        cells, index = self._cells, self._index
+        while len(journal) > length:
+            entry = journal.pop()
+            position = entry >> 1
+            if entry & 1:
+                self._free -= 1  # Ячейка освобождалась: снова занята
+                other = self._free
+            else:
+                other = self._free  # Ячейка занималась: снова свободна
+                self._free += 1
+            first, second = cells[position], cells[other]
+            cells[position], cells[other] = second, first
+            index[second], index[first] = position, other
+
+    def free_order(self, length=None):
+        """
+        Возвращает порядок свободных ячеек, не копируя индекс.
+
+        ----------
+        Тройка: хранилище индекса (array('I') позиция -> номер или
+        словарь переставленных позиций большого поля), словарь позиций,
+        номера в которых отличаются от хранилища, и число свободных
+        ячеек. При заданном length это порядок, к которому вернул бы
+        rewind_journal(length): отличия собираются обходом отменяемых
+        записей журнала, сам индекс не меняется. От порядка первых
+        свободных позиций зависит выбор choice; порядок занятых на него
+        не влияет.
+        """
+        cells, free = self._cells, self._free
+        overlay = {}
+        if length is not None:
+            journal = self.journal
+            for offset in range(len(journal) - 1, length - 1, -1):
+                entry = journal[offset]
+                position = entry >> 1
+                if entry & 1:
+                    free -= 1
+                    other = free
+                else:
+                    other = free
+                    free += 1
+                first = overlay.get(position, cells[position])
+                overlay[position] = overlay.get(other, cells[other])
+                overlay[other] = first
+        return cells, overlay, free
+
+    def load_moved(self, positions, numbers, free):
+        """
+        Восстанавливает порядок свободных ячеек.
+
+        ----------
+        positions и numbers — свободные позиции, в которых лежит не
+        ячейка с тем же номером, и номера лежащих в них ячеек; free —
+        число свободных ячеек. Занятые ячейки раскладываются по
+        оставшимся позициям за O(переставленных).
+        """
+        cells = _identity_cells(self.width * self.height)
+        index = _identity_cells(self.width * self.height)
+        for position, number in zip(positions, numbers):
+            cells[position] = number
+            index[number] = position
+        # Занятые позиции, чьи ячейки стали свободными, и занятые ячейки,
+        # чьи позиции отданы свободным:
+        holes = [number for number in numbers if number >= free]
+        displaced = [
+            position for position in positions if index[position] == position
+        ]
+        for position, number in zip(holes, displaced):
+            cells[position] = number
+            index[number] = position
+        self._cells, self._index, self._free = cells, index, free
+
+
+class SnakeBody:
+    """
+    Тело змейки: кольцевой буфер сегментов и счетчики занятых ячеек.
+
+    Сегменты хранятся номерами ячеек y * width + x в кольцевом буфере
+    array('I'), голова — в позиции _start. Число сегментов в каждой
+    ячейке хранится в счетчиках от cell_counts. Движение, рост и
+    проверка укуса выполняются за O(1) и не создают объектов: буфер
+    расширяется вдвое, только когда змейка вырастает больше него.
+    Для чтения тело ведет себя как список позиций (x, y). Если передан
+    индекс свободных ячеек, тело поддерживает его в актуальном состоянии.
+
+    Счетчики pushed и rebuilt позволяют следить за телом снаружи: пока
+    rebuilt не изменился, тело менялось только добавлением голов
+    (их pushed) и удалением хвоста.
+    """
+
+    __slots__ = (
+        'free_cells', 'width', 'height', 'pushed', 'rebuilt', '_ring',
+        '_start', '_size', '_counts',
+    )
+
+    def __init__(self, positions=(), free_cells=None, world=None,
+                 counts=None):
+        """
+        Устанавливает все необходимые атрибуты объекта SnakeBody.
+
+        Параметры
+        ----------
+        positions : iterable, optional
+                позиции сегментов, начиная с головы
+        free_cells : FreeCells, optional
+                индекс свободных ячеек поля
+        world : World, optional
+                игровой мир; по умолчанию размеры free_cells или окна
+        counts : array('H') или Counter, optional
+                общие счетчики сегментов от cell_counts нескольких
+                змеек на одном поле; тогда проверки занятости и укуса
+                учитывают их всех
+        """
+        if world is None:
+            world = World() if free_cells is None else World(
+                free_cells.width, free_cells.height)
+        self.free_cells = free_cells
+        self.width = world.width
+        self.height = world.height
+        self.pushed = 0  # Сколько голов добавил push_head_cell
+        self.rebuilt = 0  # Сколько раз тело перестраивалось
+        self._ring = array('I', bytes(4 * SNAKE_BODY_CAPACITY))
+        self._start = 0  # Позиция головы в буфере
+        self._size = 0  # Число сегментов
+        if counts is None:
+            counts = cell_counts(world.cells)
+        self._counts = counts
+        self.extend(positions)
+
+    def __len__(self):
+        """Возвращает число сегментов."""
+        return self._size
+
+    def __iter__(self):
+        """Перебирает позиции от головы к хвосту."""
+        for index in range(self._size):
+            yield self._position(index)
+
+    def __contains__(self, position):
+        """Проверяет, занята ли ячейка телом, за O(1)."""
+        x, y = position
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return False
+        return self._counts[y * self.width + x] > 0
+
+    def __getitem__(self, index):
+        """Возвращает позицию по индексу или список позиций по срезу."""
+        if isinstance(index, slice):
+            return [
+                self._position(i) for i in range(*index.indices(len(self)))
+            ]
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError('Индекс сегмента вне тела змейки.')
+        return self._position(index)
+
+    def __eq__(self, other):
+        """Сравнивает тело с любой последовательностью позиций."""
+        try:
+            return list(self) == list(other)
+        except TypeError:
+            return NotImplemented
+
+    def __repr__(self):
+        """Возвращает строковое представление тела."""
+        return f'{type(self).__name__}({list(self)!r})'
 
-# Заголовок окна игрового поля:
-pygame.display.set_caption('Змейка')
+    def _position(self, index):
+        """Возвращает позицию сегмента index в виде (x, y)."""
+        ring = self._ring
+        y, x = divmod(ring[(self._start + index) % len(ring)], self.width)
+        return x, y
+
+    def _grow(self):
+        """Расширяет кольцевой буфер вдвое, сохраняя порядок сегментов."""
+        ring = self._ring
+        ring = ring[self._start:] + ring[:self._start]
+        self._ring = ring + array('I', bytes(4 * len(ring)))
+        self._start = 0
+
+    def _occupy(self, number):
+        """Отмечает ячейку занятой еще одним сегментом."""
+        count = self._counts[number]
+        self._counts[number] = count + 1
+        if not count and self.free_cells is not None:
+            self.free_cells.discard_cell(number)
+
+    def _release(self, number):
+        """Освобождает ячейку от одного сегмента."""
+        count = self._counts[number] - 1
+        self._counts[number] = count
+        if not count and self.free_cells is not None:
+            self.free_cells.add_cell(number)
+
+    @property
+    def head_cell(self):
+        """Номер ячейки головы."""
+        return self._ring[self._start]
+
+    @property
+    def tail_cell(self):
+        """Номер ячейки хвоста."""
+        ring = self._ring
+        return ring[(self._start + self._size - 1) % len(ring)]
+
+    def cell_count(self, number):
+        """Возвращает число сегментов в ячейке с номером number."""
+        return self._counts[number]
+
+    def extend(self, positions):
+        """Добавляет сегменты в конец тела, после хвоста."""
+        self.rebuilt += 1
+        for x, y in positions:
+            if self._size == len(self._ring):
+                self._grow()
+            number = y * self.width + x
+            ring = self._ring
+            ring[(self._start + self._size) % len(ring)] = number
+            self._size += 1
+            self._occupy(number)
+
+    def push_head_cell(self, number):
+        """Добавляет новую голову змейки по номеру ячейки."""
+        if self._size == len(self._ring):
+            self._grow()
+        self._start = (self._start - 1) % len(self._ring)
+        self._ring[self._start] = number
+        self._size += 1
+        self.pushed += 1
+        self._occupy(number)
+
+    def pop_tail_cell(self):
+        """Удаляет последний сегмент и возвращает номер его ячейки."""
+        if not self._size:
+            raise IndexError('Тело змейки пусто.')
+        self._size -= 1
+        ring = self._ring
+        number = ring[(self._start + self._size) % len(ring)]
+        self._release(number)
+        return number
+
+    def push_head(self, position):
+        """Добавляет новую голову змейки."""
+        self.push_head_cell(position[1] * self.width + position[0])
+
+    def pop_tail(self):
+        """Удаляет последний сегмент змейки и возвращает его позицию."""
+        y, x = divmod(self.pop_tail_cell(), self.width)
+        return x, y
+
+    def clear(self):
+        """Удаляет все сегменты, возвращая их ячейки в индекс."""
+        self.rebuilt += 1
+        while self._size:
+            self.pop_tail_cell()
+
+    def head_cells(self, count=None):
+        """Возвращает array('I') номеров count ячеек от головы к хвосту."""
+        if count is None or count > self._size:
+            count = self._size
+        ring, start = self._ring, self._start
+        end = start + count
+        if end <= len(ring):
+            return ring[start:end]
+        return ring[start:] + ring[:end - len(ring)]
+
+    def assign_cells(self, cells, keep_free_cells=False):
+        """
+        Заменяет все сегменты ячейками cells, начиная с головы.
+
+        ----------
+        С keep_free_cells индекс свободных ячеек не трогается: его
+        порядок уже восстановлен для нового тела, и меняются только
+        счетчики сегментов.
+        """
+        if keep_free_cells:
+            self.rebuilt += 1
+            counts = self._counts
+            for number in self.head_cells():
+                counts[number] -= 1
+        else:
+            self.clear()
+        while len(self._ring) < len(cells):
+            self._grow()
+        self._ring[:len(cells)] = array('I', cells)
+        self._start = 0
+        self._size = len(cells)
+        if not keep_free_cells:
+            for number in cells:
+                self._occupy(number)
+            return
+        counts = self._counts
+        for number in cells:
+            counts[number] += 1
+
+    def head_overlaps(self):
+        """
+        Проверяет, лежит ли голова на другом сегменте тела.
+
+        ----------
+        True, если в ячейке головы больше одного сегмента.
+        """
+        return self._counts[self._ring[self._start]] > 1
+
+
+class SurfaceCache:
+    """
+    Кэш заранее отрисованных поверхностей.
+
+    Ячейка с границей рисуется один раз для каждой комбинации цвета,
+    цвета границы и GRID_SIZE, фон — один раз для каждого размера и
+    цвета. Ключ собирается из текущих значений констант, поэтому при их
+    изменении создаются новые поверхности; clear удаляет все старые.
+    Если окно уже создано, поверхности приводятся к его формату пикселей
+    (convert), чтобы blit не преобразовывал их на каждом кадре.
+    """
+
+    def __init__(self):
+        """Устанавливает все необходимые атрибуты объекта SurfaceCache."""
+        self._cells = {}
+        self._backgrounds = {}
+
+    def cell(self, color, border_color=None, size=None):
+        """Возвращает поверхность ячейки цвета color с границей."""
+        key = (
+            tuple(color),
+            tuple(BORDER_COLOR if border_color is None else border_color),
+            GRID_SIZE if size is None else size,
+        )
+        surface = self._cells.get(key)
+        if surface is None:
+            color, border_color, size = key
+            surface = pygame.Surface((size, size))
+            surface.fill(color)  # Рисуем ячейку
+            pygame.draw.rect(surface, border_color, surface.get_rect(), 1)
+            self._cells[key] = surface = self._convert(surface)
+        return surface
+
+    def background(self, size=None, color=None):
+        """Возвращает поверхность фона размером size."""
+        key = (
+            (SCREEN_WIDTH, SCREEN_HEIGHT) if size is None else tuple(size),
+            tuple(BOARD_BACKGROUND_COLOR if color is None else color),
+        )
+        surface = self._backgrounds.get(key)
+        if surface is None:
+            size, color = key
+            surface = pygame.Surface(size)
+            surface.fill(color)
+            self._backgrounds[key] = surface = self._convert(surface)
+        return surface
 
-# Настройка времени:
-clock = pygame.time.Clock()
+    @staticmethod
+    def _convert(surface):
+        """Приводит surface к формату окна, если окно создано."""
+        if pygame.display.get_surface() is None:
+            return surface
+        return surface.convert()
+
+    def clear(self):
+        """Удаляет все поверхности из кэша."""
+        self._cells.clear()
+        self._backgrounds.clear()
+
+
+# Кэш поверхностей ячеек и фона:
+surfaces = SurfaceCache()
+
+
+def is_reversal(direction, current):
+    """Проверяет, разворачивает ли direction змейку из current на 180°."""
+    return direction[0] == -current[0] and direction[1] == -current[1]
+
+
+def cell_to_pixels(cell):
+    """Возвращает координаты левого верхнего угла ячейки в окне."""
+    return cell[0] * GRID_SIZE, cell[1] * GRID_SIZE
+
+
+def draw_cell(position, color, surface=None):
+    """Отрисовывает ячейку с границей и возвращает ее прямоугольник."""
+    if surface is None:
+        surface = get_screen()
+    return surface.blit(surfaces.cell(color), cell_to_pixels(position))
+
+
+class InputQueue:
+    """
+    Очередь поворотов змейки.
+
+    Нажатия копятся в очереди с отметкой времени и применяются по одному
+    за такт, поэтому два быстрых нажатия за один такт не теряются.
+    Разворот проверяется относительно последнего поворота в очереди, а не
+    текущего направления. Для каждого примененного поворота запоминается
+    задержка от нажатия до движения.
+    """
+
+    __slots__ = ('size', '_turns', 'latencies')
+
+    def __init__(self, size=INPUT_QUEUE_SIZE):
+        """
+        Устанавливает все необходимые атрибуты объекта InputQueue.
+
+        Параметры
+        ----------
+        size : int
+                наибольшее число поворотов в очереди
+        """
+        self.size = size
+        self._turns = deque()
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def __len__(self):
+        """Возвращает число поворотов в очереди."""
+        return len(self._turns)
+
+    def push(self, direction, current_direction, timestamp=None):
+        """
+        Добавляет поворот в очередь.
+
+        ----------
+        Возвращает False, если очередь заполнена или поворот повторяет
+        последнее направление либо разворачивает змейку на 180°.
+        """
+        last = self._turns[-1][0] if self._turns else current_direction
+        if len(self._turns) >= self.size or direction == last or (
+                is_reversal(direction, last)):
+            return False
+        if timestamp is None:
+            timestamp = time.perf_counter()
+        self._turns.append((direction, timestamp))
+        return True
+
+    def pop(self):
+        """Возвращает следующий поворот или None, если очередь пуста."""
+        if not self._turns:
+            return None
+        direction, timestamp = self._turns.popleft()
+        self.latencies.append(time.perf_counter() - timestamp)
+        return direction
+
+    def clear(self):
+        """Удаляет все повороты из очереди."""
+        self._turns.clear()
+
+    def latency_stats(self):
+        """
+        Возвращает статистику задержки от нажатия до движения.
+
+        ----------
+        Словарь с числом замеров и средней, 99-й перцентильной и
+        наибольшей задержкой в миллисекундах.
+        """
+        if not self.latencies:
+            return {'count': 0, 'mean': 0.0, 'p99': 0.0, 'max': 0.0}
+        latencies = sorted(self.latencies)
+        return {
+            'count': len(latencies),
+            'mean': sum(latencies) / len(latencies) * 1000,
+            'p99': latencies[int(0.99 * (len(latencies) - 1))] * 1000,
+            'max': latencies[-1] * 1000,
+        }
 
 
 class GameObject:
     """Базовый класс для игровых объектов."""
 
-    def __init__(self):
+    __slots__ = ('world', 'position', 'body_color', 'dirty_cells')
+
+    def __init__(self, world=None):
         """
         Устанавливает все необходимые атрибуты объекта GameObject.
 
         Атрибуты
         ---------
+        world : World
+                    игровой мир; по умолчанию поле размером с окно
         position : tuple[int]
-                    позиция объекта по центру
+                    ячейка объекта, по умолчанию центр мира
         body_color : None
                     цвет объекта
+        dirty_cells : list[tuple] или None
+                    ячейки, изменившиеся с последней отрисовки;
+                    None, пока их не отслеживает Renderer
 
         """
-        self.position = (SCREEN_WIDTH // 2), (SCREEN_HEIGHT // 2)
+        self.world = World() if world is None else world
+        self.position = self.world.center
         self.body_color = None
+        self.dirty_cells = None
 
-    def draw(self):
+    def draw(self, surface=None):
         """
         Метод отрисовки объекта.
 
@@ -89,7 +830,9 @@ class GameObject:
 class Apple(GameObject):
     """Класс для яблок, которые змейка может съесть."""
 
-    def __init__(self, snake_positions=None):
+    __slots__ = ('rng',)
+
+    def __init__(self, snake_positions=None, rng=None, world=None):
         """
         Устанавливает все необходимые атрибуты объекта Apple.
 
@@ -97,11 +840,17 @@ class Apple(GameObject):
         ---------
         body_color : tuple
                     цвет объекта
+        rng : random.Random
+                    генератор случайных чисел для позиции яблока
 
         Параметры
         ----------
-        snake_positions : list, optional
+        snake_positions : SnakeBody или list, optional
                 Позиции змейки, которые не должны совпадать с позицией яблока.
+        rng : random.Random, optional
+                генератор случайных чисел; по умолчанию модуль random
+        world : World, optional
+                игровой мир
 
         Примечания
         ---------
@@ -113,8 +862,9 @@ class Apple(GameObject):
         Если snake_positions равен None,
         то ему присваивается значение пустого списка для исключения ошибки.
         """
-        super().__init__()
+        super().__init__(world)
         self.body_color = APPLE_COLOR  # Устанавливаем цвет яблока
+        self.rng = random if rng is None else rng
         if snake_positions is None:
             snake_positions = []
         self.randomize_position(snake_positions)  # Генерируем позицию яблока
@@ -124,33 +874,35 @@ class Apple(GameObject):
         Случайно устанавливает позицию яблока.
 
         ---------
-        Принимает позицию змейки snake_positions, запускает бесконечный цикл.
-        Передает position(позиция яблока) новую позицию.
-        Если новая позиция яблока не совпадает с телом змейки,
-        то цикл завершается
+        Принимает позицию змейки snake_positions и выбирает позицию яблока
+        среди свободных ячеек. Тело змейки (SnakeBody) хранит индекс
+        свободных ячеек, и выбор выполняется за O(1). Для обычного списка
+        позиций индекс строится заново.
+        Если свободных ячеек нет, вызывается исключение BoardFull.
         """
-        while True:
-            self.position = (
-                randint(0, GRID_WIDTH - 1) * GRID_SIZE,
-                randint(0, GRID_HEIGHT - 1) * GRID_SIZE
-            )
-
-            # Проверка, что яблоко не накладывается на змею
-            if self.position not in snake_positions:
-                break  # Яблоко размещено в допустимой позиции
+        free_cells = getattr(snake_positions, 'free_cells', None)
+        if free_cells is None:
+            free_cells = FreeCells(self.world.width, self.world.height)
+            for cell in snake_positions:
+                free_cells.discard(cell)
+        old_position = self.position
+        self.position = free_cells.choice(self.rng)
+        if self.dirty_cells is not None:
+            self.dirty_cells += old_position, self.position
 
-    def draw(self):
+    def draw(self, surface=None):
         """Отрисовывает яблока на экране."""
-        rect = pygame.Rect(self.position, (GRID_SIZE, GRID_SIZE)
-                           )  # Создается прямоугольник для яблока
-        pygame.draw.rect(screen, self.body_color, rect)  # Рисует яблоко
-        pygame.draw.rect(screen, BORDER_COLOR, rect, 1)  # Рисует границу яблок
+        draw_cell(self.position, self.body_color, surface)  # Рисует яблоко
 
 
 class Snake(GameObject):
     """Класс для змейки."""
 
-    def __init__(self):
+    __slots__ = (
+        'rng', 'body', 'direction', 'next_direction', 'input_queue', 'length',
+    )
+
+    def __init__(self, rng=None, world=None):
         """
         Устанавливает все необходимые атрибуты объекта Snake.
 
@@ -158,70 +910,134 @@ class Snake(GameObject):
         ---------
         body_color : tuple[int]
                     цвет объекта
-        positions : list[tuple]
+        positions : SnakeBody
                     позиции змейки
         direction : tuple[int]
                     направление змейки
         next_direction : None
                     следующее направление
+        input_queue : InputQueue
+                    очередь поворотов, нажатых игроком
         length : int
                     длинна змейки
+        rng : random.Random
+                    генератор случайных чисел для направления
+
+        Параметры
+        ----------
+        rng : random.Random, optional
+                генератор случайных чисел; по умолчанию модуль random
+        world : World, optional
+                игровой мир
 
         Примечания
         ---------
         Вызовает конструктора базового класса в конструкторе дочернего.
         """
-        super().__init__()
+        super().__init__(world)
         self.body_color = SNAKE_COLOR  # Устанавливаем цвет змейки
+        self.rng = random if rng is None else rng
         # Изначальная позиция головы змейки
-        self.positions = [(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)]
+        self.positions = [self.start_position()]
         # Начальное направление движения
-        self.direction = choice((RIGHT, LEFT, UP, DOWN))
+        self.direction = self.rng.choice((RIGHT, LEFT, UP, DOWN))
         self.next_direction = None  # Следующее направление
+        self.input_queue = InputQueue()  # Очередь нажатых поворотов
         self.length = 1  # Длина змейки
 
+    @property
+    def positions(self):
+        """Тело змейки; читается как список позиций от головы к хвосту."""
+        return self.body
+
+    @positions.setter
+    def positions(self, positions):
+        body = getattr(self, 'body', None)
+        if body is None or body.free_cells is None:
+            self.body = SnakeBody(
+                positions,
+                FreeCells(self.world.width, self.world.height),
+                self.world,
+            )
+        else:
+            positions = list(positions)  # Позиции могут читаться из body
+            if self.dirty_cells is not None:
+                self.dirty_cells.extend(body)  # Старое тело нужно стереть
+            body.clear()  # Возвращаем ячейки старого тела в индекс
+            body.extend(positions)  # Буферы тела используются повторно
+        if self.dirty_cells is not None:
+            self.dirty_cells.extend(self.body)
+
+    def next_turn(self):
+        """
+        Забирает поворот для следующего такта.
+
+        ----------
+        Возвращает next_direction, если оно задано, иначе следующий
+        поворот из очереди ввода или None.
+        """
+        if self.next_direction:
+            direction, self.next_direction = self.next_direction, None
+            return direction
+        return self.input_queue.pop()
+
     def update_direction(self):
         """Обновляет направление движения змейки, если оно изменилось."""
-        if self.next_direction:
-            # Обновляем текущее направление
-            self.direction = self.next_direction
-            self.next_direction = None
+        direction = self.next_turn()
+        if direction:
+            self.direction = direction  # Обновляем текущее направление
 
     def move(self):
-        """Двигает змею в текущем направлении."""
-        head_x, head_y = self.get_head_position()  # распаковываем кортеж
-        new_position = (
-            (head_x + GRID_SIZE
-             * self.direction[0]) % SCREEN_WIDTH,
-            (head_y + GRID_SIZE
-             * self.direction[1]) % SCREEN_HEIGHT
-        )
+        """
+        Двигает змею в текущем направлении.
+
+        ----------
+        Голова и хвост передаются телу номерами ячеек, поэтому такт не
+        создает ни кортежей, ни списков, пока не отслеживаются dirty_cells.
+        """
+        body = self.body
+        width = body.width
+        head_y, head_x = divmod(body.head_cell, width)
         # Вставляем новую позицию головы
-        self.positions.insert(0, new_position)
+        body.push_head_cell(
+            (head_y + self.direction[1]) % body.height * width
+            + (head_x + self.direction[0]) % width)
         # Если длина змейки превышает заданную
-        if len(self.positions) > self.length:
-            self.positions.pop(-1)  # Удаляем последний сегмент змейки
+        if len(body) > self.length:
+            tail = body.pop_tail_cell()  # Удаляем последний сегмент змейки
+        else:
+            tail = None
+        if self.dirty_cells is not None:
+            self.dirty_cells.append(body[0])
+            if tail is not None:
+                self.dirty_cells.append((tail % width, tail // width))
 
     def get_head_position(self):
         """Возвращает позицию головы змейки."""
         return self.positions[0]
 
-    def draw(self):
+    def draw(self, surface=None):
         """Отрисовывает змею на экране."""
-        for position in self.positions:
-            # Создание прямоугольника для сегмента
-            rect = pygame.Rect(position, (GRID_SIZE, GRID_SIZE))
-            pygame.draw.rect(screen, self.body_color, rect)  # Рисуем сегмент
-            # Рисуем границу сегмента
-            pygame.draw.rect(screen, BORDER_COLOR, rect, 1)
+        if surface is None:
+            surface = get_screen()
+        sprite = surfaces.cell(self.body_color)
+        # Рисуем все сегменты одним вызовом
+        surface.blits([
+            (sprite, cell_to_pixels(position)) for position in self.positions
+        ], False)
+
+    def start_position(self):
+        """Возвращает ячейку, с которой змейка начинает игру."""
+        return self.world.center
 
     def reset(self):
         """Сбрасывает изменения позиции змейки и яблока"""
         # Устанавливаем начальную позицию
-        self.positions = [(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)]
+        self.positions = [self.start_position()]
         # Случайное направление
-        self.direction = choice((RIGHT, LEFT, UP, DOWN))
+        self.direction = self.rng.choice((RIGHT, LEFT, UP, DOWN))
         self.length = 1  # Сбрасываем длину
+        self.input_queue.clear()  # Повороты относились к старой змейке
 
     def self_collection(self):
         """
@@ -231,52 +1047,432 @@ class Snake(GameObject):
         True, если голова змейка укусила себя.
         False, если не укусила.
         """
-        return self.get_head_position() in self.positions[1:]
+        return self.body.head_overlaps()
+
 
+class Renderer:
+    """
+    Отрисовка игрового поля.
+
+    В режиме dirty перерисовываются только ячейки, изменившиеся за кадр
+    (новая голова, освобожденный хвост, старое и новое место яблока), и
+    только их прямоугольники передаются в pygame.display.update. Стоимость
+    кадра не зависит от длины змейки и размера экрана. Первый кадр и
+    режим без dirty рисуют поле целиком; после первого кадра в режиме
+    dirty Renderer включает у объектов учет dirty_cells. Прямоугольник
+    стираемой ячейки и список обновляемых областей создаются один раз.
+    Счетчик repaints растет с каждой перерисовкой окна целиком, чтобы
+    надписи поверх игры (сводка профилировщика) знали, что их стерли.
+    """
+
+    __slots__ = ('surface', 'dirty', 'full_redraw', 'repaints', '_cell_rect',
+                 '_rects')
+
+    def __init__(self, surface=None, dirty=True):
+        """
+        Устанавливает все необходимые атрибуты объекта Renderer.
 
-def handle_keys(snake):
-    """Обрабатывает нажатия клавиш для управления змейкой."""
+        Параметры
+        ----------
+        surface : pygame.Surface, optional
+                поверхность для отрисовки, по умолчанию screen
+        dirty : bool
+                перерисовывать только изменившиеся ячейки
+        """
+        self.surface = get_screen() if surface is None else surface
+        self.dirty = dirty
+        self.full_redraw = True
+        self.repaints = 0  # Число перерисовок окна целиком
+        self._cell_rect = pygame.Rect(0, 0, GRID_SIZE, GRID_SIZE)
+        self._rects = []
+
+    def draw(self, apple, snake):
+        """Отрисовывает кадр и обновляет дисплей."""
+        if self.full_redraw or not self.dirty:
+            self.surface.blit(surfaces.background(self.surface.get_size()),
+                              (0, 0))  # Отрисовка фона
+            apple.draw(self.surface)  # Отрисовка яблока
+            snake.draw(self.surface)  # Отрисовка змейки
+            pygame.display.update()  # Обновление дисплея
+            self.repaints += 1
+            self.full_redraw = False
+            if self.dirty:
+                apple.dirty_cells, snake.dirty_cells = [], []
+            return
+        rects = self._rects
+        for dirty_cells in (snake.dirty_cells, apple.dirty_cells):
+            for cell in dirty_cells:
+                rects.append(self.draw_cell(cell, apple, snake))
+            dirty_cells.clear()
+        pygame.display.update(rects)  # Обновляем только изменившееся
+        rects.clear()
+
+    def draw_cell(self, cell, apple, snake):
+        """Перерисовывает ячейку тем, что в ней сейчас находится."""
+        if cell in snake.positions:
+            return draw_cell(cell, snake.body_color, self.surface)
+        if cell == apple.position:
+            return draw_cell(cell, apple.body_color, self.surface)
+        rect = self._cell_rect
+        rect.topleft = cell_to_pixels(cell)
+        # Стираем ячейку фоном
+        background = surfaces.background(self.surface.get_size())
+        return self.surface.blit(background, rect, rect)
+
+    def restore(self, rect, apple, snake):
+        """Перерисовывает ячейки игры в прямоугольнике окна rect."""
+        for y in range(rect.top // GRID_SIZE, -(-rect.bottom // GRID_SIZE)):
+            for x in range(rect.left // GRID_SIZE,
+                           -(-rect.right // GRID_SIZE)):
+                self.draw_cell((x, y), apple, snake)
+
+
+def _visible_spans(origin, view, size):
+    """
+    Перебирает видимые отрезки блоков вдоль одной оси.
+
+    ----------
+    Для каждого отрезка возвращает номер блока, смещение в блоке, длину
+    и смещение в окне, все в ячейках. Отрезки идут от origin с переходом
+    через границу мира и покрывают окно или весь мир, если он меньше.
+    """
+    shown = 0
+    position = origin
+    total = min(view, size)
+    while shown < total:
+        chunk, offset = divmod(position, CHUNK_SIZE)
+        length = min(CHUNK_SIZE - offset, size - position, total - shown)
+        yield chunk, offset, length, shown
+        shown += length
+        position = (position + length) % size
+
+
+class ViewportRenderer:
+    """
+    Отрисовка мира больше окна.
+
+    Окно показывает область мира, в центре которой голова змейки, и
+    прокручивается вслед за ней через границы тороидального мира. Мир
+    разбит на блоки CHUNK_SIZE x CHUNK_SIZE ячеек: видимый блок рисуется
+    в отдельную поверхность и хранится в кэше, пока в нем ничего не
+    изменилось. Кадр состоит из нескольких blit видимых блоков, поэтому
+    его стоимость не зависит ни от размера мира, ни от длины змейки.
+    Каждый кадр перерисовывает окно целиком и увеличивает repaints.
+    """
+
+    __slots__ = ('surface', 'view', 'full_redraw', 'repaints', '_chunks')
+
+    def __init__(self, surface=None):
+        """
+        Устанавливает все необходимые атрибуты объекта ViewportRenderer.
+
+        Параметры
+        ----------
+        surface : pygame.Surface, optional
+                поверхность для отрисовки, по умолчанию screen
+        """
+        self.surface = get_screen() if surface is None else surface
+        width, height = self.surface.get_size()
+        self.view = (width // GRID_SIZE, height // GRID_SIZE)
+        self.full_redraw = True
+        self.repaints = 0  # Число перерисовок окна целиком
+        self._chunks = OrderedDict()
+
+    def camera(self, snake):
+        """Возвращает ячейку мира в левом верхнем углу окна."""
+        world = snake.world
+        head_x, head_y = snake.get_head_position()
+        view_width, view_height = self.view
+        return (
+            (head_x - view_width // 2) % world.width
+            if world.width > view_width else 0,
+            (head_y - view_height // 2) % world.height
+            if world.height > view_height else 0,
+        )
+
+    def draw(self, apple, snake):
+        """Отрисовывает видимую часть мира и обновляет дисплей."""
+        if self.full_redraw:
+            self._chunks.clear()
+            apple.dirty_cells, snake.dirty_cells = [], []
+            self.full_redraw = False
+        for cell in snake.dirty_cells + apple.dirty_cells:
+            self._chunks.pop(
+                (cell[0] // CHUNK_SIZE, cell[1] // CHUNK_SIZE), None)
+        snake.dirty_cells.clear()
+        apple.dirty_cells.clear()
+        self.surface.blit(surfaces.background(self.surface.get_size()),
+                          (0, 0))  # Отрисовка фона
+        world = snake.world
+        origin_x, origin_y = self.camera(snake)
+        blits = []
+        for chunk_y, offset_y, height, shown_y in _visible_spans(
+                origin_y, self.view[1], world.height):
+            for chunk_x, offset_x, width, shown_x in _visible_spans(
+                    origin_x, self.view[0], world.width):
+                chunk = self._chunk((chunk_x, chunk_y), apple, snake)
+                area = pygame.Rect(
+                    cell_to_pixels((offset_x, offset_y)),
+                    cell_to_pixels((width, height)))
+                blits.append((chunk, cell_to_pixels((shown_x, shown_y)), area))
+        self.surface.blits(blits, False)
+        pygame.display.update()  # Обновление дисплея
+        self.repaints += 1
+        while len(self._chunks) > CHUNK_CACHE_SIZE:
+            self._chunks.popitem(last=False)  # Удаляем давно не видимые
+
+    def _chunk(self, key, apple, snake):
+        """Возвращает поверхность блока key, рисуя ее при необходимости."""
+        chunk = self._chunks.get(key)
+        if chunk is not None:
+            self._chunks.move_to_end(key)
+            return chunk
+        chunk = pygame.Surface(cell_to_pixels((CHUNK_SIZE, CHUNK_SIZE)))
+        chunk.blit(surfaces.background(chunk.get_size()), (0, 0))
+        world = snake.world
+        left, top = key[0] * CHUNK_SIZE, key[1] * CHUNK_SIZE
+        for y in range(top, min(top + CHUNK_SIZE, world.height)):
+            for x in range(left, min(left + CHUNK_SIZE, world.width)):
+                if (x, y) in snake.positions:
+                    draw_cell((x - left, y - top), snake.body_color, chunk)
+                elif (x, y) == apple.position:
+                    draw_cell((x - left, y - top), apple.body_color, chunk)
+        self._chunks[key] = chunk
+        return chunk
+
+    def restore(self, rect, apple, snake):
+        """Ничего не делает: каждый кадр перерисовывает окно целиком."""
+
+
+def make_renderer(world, surface=None):
+    """Возвращает отрисовщик, подходящий для размеров мира."""
+    if world.fits_screen():
+        return Renderer(surface, DIRTY_RENDERING)
+    return ViewportRenderer(surface)
+
+
+def step(snake, apple, direction=None):
+    """
+    Выполняет один игровой такт без отрисовки и ввода.
+
+    Параметры
+    ----------
+    snake : Snake
+            змейка
+    apple : Apple
+            яблоко
+    direction : tuple[int], optional
+            новое направление; разворот на 180° игнорируется. Если не
+            задано, берется поворот змейки (Snake.update_direction)
+
+    ----------
+    Возвращает событие такта: MOVE, EAT, COLLISION или WIN.
+    """
+    if direction is None:
+        snake.update_direction()  # Обновление направления змейки
+    elif not is_reversal(direction, snake.direction):
+        snake.direction = direction
+    snake.move()  # Движение змейки
+    # Проверка на укус
+    if snake.self_collection():
+        snake.reset()  # Сброс состояния змейки
+        apple.randomize_position(snake.positions)  # новая позиция яблока
+        return COLLISION
+    # Проверка на поедание яблока
+    if snake.get_head_position() != apple.position:
+        return MOVE
+    snake.length += 1  # Увеличиваем длину змейки
+    try:
+        # Генерируем новую позицию яблока
+        apple.randomize_position(snake.positions)
+    except BoardFull:
+        # Змейка заполнила все поле — игра начинается заново
+        snake.reset()
+        apple.randomize_position(snake.positions)
+        return WIN
+    return EAT
+
+
+class FixedTimestep:
+    """
+    Планировщик игровых тактов с фиксированным шагом.
+
+    Время кадра копится в accumulator, и за кадр выполняется столько
+    тактов длиной 1000 / rate мс, сколько в нем поместилось. Если
+    отрисовка не успевает, такты догоняются без отрисовки промежуточных
+    кадров, поэтому игра идет с той же скоростью. Отставание больше
+    max_ticks тактов отбрасывается, чтобы игра не зависла навсегда.
+    При rate, равном 0, такты выполняются без ограничения до конца
+    времени кадра.
+    """
+
+    def __init__(self, rate=SPEED, fps=FPS, max_ticks=MAX_TICKS_PER_FRAME):
+        """
+        Устанавливает все необходимые атрибуты объекта FixedTimestep.
+
+        Параметры
+        ----------
+        rate : int
+                игровых тактов в секунду; 0 — без ограничения
+        fps : int
+                частота кадров, задает время кадра без ограничения тактов
+        max_ticks : int
+                наибольшее число тактов за кадр
+        """
+        self.rate = rate
+        self.tick_ms = 1000 / rate if rate else 0
+        self.frame_seconds = 1 / fps if fps else 0
+        self.max_ticks = max_ticks
+        self.accumulator = 0.0
+        self.dropped_ms = 0.0
+
+    def ticks(self, elapsed_ms):
+        """Перебирает такты, которые нужно выполнить за кадр."""
+        if not self.rate:
+            deadline = time.perf_counter() + self.frame_seconds
+            yield
+            while time.perf_counter() < deadline:
+                yield
+            return
+        self.accumulator += elapsed_ms
+        ticks = int(self.accumulator // self.tick_ms)
+        if ticks > self.max_ticks:
+            # Отбрасываем отставание, которое не успеть догнать
+            self.dropped_ms += (ticks - self.max_ticks) * self.tick_ms
+            self.accumulator -= (ticks - self.max_ticks) * self.tick_ms
+            ticks = self.max_ticks
+        for _ in range(ticks):
+            self.accumulator -= self.tick_ms
+            yield
+
+
+# Клавиши управления змейкой (имена констант pygame):
+KEY_NAMES = {
+    'K_UP': UP,
+    'K_DOWN': DOWN,
+    'K_LEFT': LEFT,
+    'K_RIGHT': RIGHT,
+}
+
+
+def get_key_directions():
+    """Возвращает словарь клавиша -> направление, загружая pygame."""
+    key_directions = globals().get('KEY_DIRECTIONS')
+    if key_directions is None:
+        key_directions = globals()['KEY_DIRECTIONS'] = {
+            getattr(pygame, name): direction
+            for name, direction in KEY_NAMES.items()
+        }
+    return key_directions
+
+
+def expose_events():
+    """Возвращает события pygame о том, что окно нужно перерисовать."""
+    return pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED
+
+
+def setup_input():
+    """
+    Оставляет в очереди событий pygame только нужные игре.
+
+    ----------
+    Это выход, нажатия клавиш и события expose_events: без них окно,
+    открытое после сворачивания или перекрытия, осталось бы пустым.
+    """
+    pygame.event.set_blocked(None)
+    pygame.event.set_allowed((pygame.QUIT, pygame.KEYDOWN, *expose_events()))
+
+
+def handle_keys(snake, renderer=None):
+    """
+    Обрабатывает нажатия клавиш для управления змейкой.
+
+    Повороты добавляются в очередь змейки (Snake.input_queue) и
+    применяются по одному за такт. На события expose_events отрисовщик
+    renderer перерисовывает окно целиком в ближайшем кадре.
+    """
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
             pygame.quit()
             raise SystemExit  # Закрытие игры при выходе
+        elif event.type in expose_events():
+            if renderer is not None:
+                renderer.full_redraw = True  # Окно стерто: рисуем заново
         elif event.type == pygame.KEYDOWN:  # Если нажата клавиша
-            if event.key == pygame.K_UP and snake.direction != DOWN:
-                snake.next_direction = UP  # Изменение направления
-            elif event.key == pygame.K_DOWN and snake.direction != UP:
-                snake.next_direction = DOWN
-            elif event.key == pygame.K_LEFT and snake.direction != RIGHT:
-                snake.next_direction = LEFT
-            elif event.key == pygame.K_RIGHT and snake.direction != LEFT:
-                snake.next_direction = RIGHT
-
-
-def main():
-    """Основная функция игры."""
-    pygame.init()  # Инициализация Pygame
-    snake = Snake()  # Создание змейки
-    apple = Apple(snake.positions)  # Передаем позиции змеи при создании яблока
+            direction = get_key_directions().get(event.key)
+            if direction is not None:
+                # Изменение направления
+                snake.input_queue.push(direction, snake.direction)
 
-    while True:
-        clock.tick(SPEED)  # Добавление вызова tick для управления скоростью
-        screen.fill(BOARD_BACKGROUND_COLOR)  # Отрисовка фона
-        handle_keys(snake)  # Обработка нажатий клавиш
-        snake.update_direction()  # Обновление направления змейки
-        snake.move()  # Движение змейки
-        # Проверка на укус
-        if snake.self_collection():
-            snake.reset()  # Сброс состояния змейки
-            apple.randomize_position(snake.positions)  # новая позиция яблока
-        # Проверка на поедание яблока
-        elif snake.get_head_position() == apple.position:
-            snake.length += 1  # Увеличиваем длину змейки
-            # Генерируем новую позицию яблока
-            apple.randomize_position(snake.positions)
-        # Отрисовка объектов
-        apple.draw()  # Отрисовка яблока
-        snake.draw()  # Отрисовка змейки
 
-        pygame.display.update()  # Обновление дисплея
+def run_tick(snake, apple, recorder=None, episodes=None):
+    """Выполняет игровой такт, записывая его при необходимости."""
+    direction = snake.next_turn()
+    if recorder is not None:
+        recorder.record(direction)
+    event = step(snake, apple, direction)  # Игровой такт
+    if episodes is not None:
+        episodes.record(snake, apple, event)
+    return event
+
+
+def main(rng=None, recorder=None, episodes=None, speed=SPEED,
+         profiler=None, world=None, autopilot=None):
+    """
+    Основная функция игры.
+
+    Параметры
+    ----------
+    rng : random.Random, optional
+            генератор случайных чисел змейки и яблока
+    recorder : snake_replay.ReplayWriter, optional
+            запись партии; закрывается при выходе из игры
+    episodes : snake_storage.EpisodeWriter, optional
+            хранилище тактов; закрывается при выходе из игры
+    speed : int
+            игровых тактов в секунду; 0 — так быстро, как получится
+    profiler : snake_profiler.Profiler, optional
+            замер времени кадров и их частей
+    world : World, optional
+            игровой мир; мир больше окна показывается с прокруткой
+    autopilot : callable, optional
+            autopilot(snake, apple) возвращает автопилот с методом steer,
+            например snake_autopilot.Autopilot
+    """
+    pygame.init()  # Инициализация Pygame
+    setup_input()  # Фильтрация событий
+    if world is None:
+        world = World()
+    snake = Snake(rng, world)  # Создание змейки
+    # Передаем позиции змеи при создании яблока
+    apple = Apple(snake.positions, rng, world)
+    renderer = make_renderer(world, get_screen())
+    pilot = None if autopilot is None else autopilot(snake, apple)
+    clock = get_clock()
+    scheduler = FixedTimestep(speed)
+
+    try:
+        while True:
+            # Вызов tick ограничивает частоту кадров и измеряет время кадра
+            elapsed = clock.tick(FPS)
+            if profiler is not None:
+                profiler.start_frame()
+            handle_keys(snake, renderer)  # Обработка нажатий клавиш
+            ticks = 0
+            for _ in scheduler.ticks(elapsed):
+                if pilot is not None:
+                    pilot.steer()  # Автопилот поворачивает, как игрок
+                run_tick(snake, apple, recorder, episodes)
+                ticks += 1
+            if ticks or renderer.full_redraw:
+                renderer.draw(apple, snake)  # Отрисовка объектов
+            if profiler is not None:
+                profiler.end_frame(renderer, apple, snake)
+    finally:
+        if recorder is not None:
+            recorder.close(snake, apple)
+        if episodes is not None:
+            episodes.close()
 
 
 if __name__ == '__main__':